@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+File Type Detection Benchmark
+比較逐文件libmagic檢測與擴展名優先+文件頭嗅探+緩存的每文件開銷
+
+用法:
+    python benchmarks/file_type_detection.py --files 100000 --ambiguous 0.05
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import mimetypes
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.file_parsers import ExtendedFileParser, MAGIC_AVAILABLE
+
+if MAGIC_AVAILABLE:
+    import magic
+
+SAMPLES = {
+    'txt': '這是一個測試文本。\n'.encode('utf-8'),
+    'md': '# 標題\n\n正文內容\n'.encode('utf-8'),
+    'html': '<!DOCTYPE html><html><body>內容</body></html>'.encode('utf-8'),
+    'json': '{"text": "內容"}'.encode('utf-8'),
+    'csv': 'id,text\n1,內容\n'.encode('utf-8'),
+    'pdf': b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n',
+}
+
+
+def create_corpus(root, count, ambiguous_ratio):
+    """生成測試文件，其中一部分沒有擴展名"""
+    random.seed(42)
+    paths = []
+    kinds = list(SAMPLES)
+    for i in range(count):
+        kind = random.choice(kinds)
+        subdir = os.path.join(root, f"{i // 1000:03d}")
+        os.makedirs(subdir, exist_ok=True)
+        suffix = '' if random.random() < ambiguous_ratio else f".{kind}"
+        path = os.path.join(subdir, f"file_{i}{suffix}")
+        with open(path, 'wb') as f:
+            f.write(SAMPLES[kind])
+        paths.append((path, kind))
+    return paths
+
+
+def legacy_detect(parser, file_path):
+    """舊的檢測方式：每個文件都先調用libmagic"""
+    if MAGIC_AVAILABLE:
+        try:
+            return parser._mime_to_extension(magic.from_file(file_path, mime=True))
+        except Exception:
+            pass
+    mime_type, _ = mimetypes.guess_type(file_path)
+    if mime_type:
+        return parser._mime_to_extension(mime_type)
+    return os.path.splitext(file_path)[1].lower().lstrip('.')
+
+
+def measure(label, func, paths):
+    """計時並統計檢測結果與實際類型一致的比例"""
+    correct = 0
+    start = time.perf_counter()
+    for path, kind in paths:
+        if func(path) == kind:
+            correct += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label}: 總計 {elapsed:.3f} 秒, 每文件 {elapsed / len(paths) * 1e6:.2f} 微秒, "
+          f"準確率 {correct / len(paths):.1%}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文件類型檢測基準測試')
+    parser.add_argument('--files', type=int, default=100000, help='文件數量')
+    parser.add_argument('--ambiguous', type=float, default=0.05, help='沒有擴展名的文件比例')
+    parser.add_argument('--dir', help='測試目錄（默認使用臨時目錄）')
+    args = parser.parse_args()
+
+    file_parser = ExtendedFileParser(verbose=False)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as root:
+        print(f"生成 {args.files} 個文件（{args.ambiguous:.0%} 無擴展名）...")
+        paths = create_corpus(root, args.files, args.ambiguous)
+        print(f"libmagic: {'可用' if MAGIC_AVAILABLE else '不可用（舊方式回退到mimetypes）'}")
+
+        legacy = measure('舊方式 (magic/mimetypes)', lambda p: legacy_detect(file_parser, p), paths)
+        cold = measure('擴展名優先（冷緩存）', file_parser.detect_file_type, paths)
+        warm = measure('擴展名優先（熱緩存）', file_parser.detect_file_type, paths)
+
+        if cold > 0:
+            print(f"加速比: 冷緩存 {legacy / cold:.1f}x, 熱緩存 {legacy / warm:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+HTML Extraction Benchmark
+比較BeautifulSoup(html.parser)舊路徑與流式HTMLParser提取器在大型中文新聞頁面上的耗時
+
+用法:
+    python benchmarks/html_extraction.py --paragraphs 2000 --repeat 5
+    python benchmarks/html_extraction.py --files page1.html page2.html
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.html_extractor import extract_text
+from src.utils.text_loader import load_text
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+SENTENCES = [
+    '記者今日從相關部門獲悉，新的政策將於下月正式實施。',
+    '專家表示，這一舉措有助於推動區域經濟的高質量發展。',
+    '據統計，今年前三季度全市生產總值同比增長百分之五點二。',
+    '市民對此普遍表示歡迎，認為將切實改善日常生活。',
+    '報道指出，相關項目的建設進度已經超過預期。',
+]
+
+
+def build_news_page(paragraphs):
+    """生成帶導航、腳本、側欄和頁腳的中文新聞頁面"""
+    random.seed(42)
+    nav = ''.join(f'<li><a href="/c{i}">頻道{i}</a></li>' for i in range(40))
+    body = ''.join(
+        f'<p>{"".join(random.choice(SENTENCES) for _ in range(4))}<a href="/t{i}">相關</a></p>'
+        for i in range(paragraphs)
+    )
+    sidebar = ''.join(f'<li><a href="/r{i}">推薦閱讀：熱門新聞標題{i}</a></li>' for i in range(100))
+    script = '<script>var config = {"ads": [' + ','.join(str(i) for i in range(2000)) + ']};</script>'
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>新聞標題 - 示例新聞網</title>'
+        f'<style>body{{font-size:14px}}</style>{script}</head><body>'
+        f'<nav class="main-nav"><ul>{nav}</ul></nav>'
+        f'<div class="container"><article><h1>重大新聞標題</h1>{body}</article>'
+        f'<aside class="sidebar"><ul>{sidebar}</ul></aside></div>'
+        f'<footer>版權所有 © 示例新聞網 聯繫我們 廣告服務</footer>{script}</body></html>'
+    )
+
+
+# 短段落正文（每段不足10字），檢查正文提取不會因長度丟棄
+SHORT_PARAGRAPH_PAGE = (
+    '<html><head><title>靜夜思</title></head><body>'
+    '<nav><a href="/">首頁</a><a href="/poems">詩詞</a></nav>'
+    '<div><h1>靜夜思</h1><p>李白</p><p>床前明月光，</p><p>疑是地上霜。</p>'
+    '<p>舉頭望明月，</p><p>低頭思故鄉。</p></div>'
+    '<footer>版權所有</footer></body></html>'
+)
+SHORT_PARAGRAPH_LINES = ['靜夜思', '李白', '床前明月光，', '疑是地上霜。', '舉頭望明月，', '低頭思故鄉。']
+
+# ASP.NET/CMS頁面常用<form>包裹整個頁面，正文容器不應被當作模板
+FORM_WRAPPED_PAGE = (
+    '<html><body><form id="form1" method="post">'
+    '<nav><a href="/">首頁</a><a href="/world">國際</a></nav>'
+    '<div class="article-content"><p>今天發生了一件大事。</p><p>記者報道如下。</p></div>'
+    '<footer>版權所有</footer></form></body></html>'
+)
+FORM_WRAPPED_LINES = ['今天發生了一件大事。', '記者報道如下。']
+
+
+def check_short_paragraphs():
+    """確認短段落被保留、導航和頁腳被去除"""
+    result = extract_text(SHORT_PARAGRAPH_PAGE)
+    lines = result['content'].split('\n')
+    assert lines == SHORT_PARAGRAPH_LINES, f"短段落提取錯誤: {lines}"
+    print("短段落檢查通過")
+
+
+def check_form_wrapped_page():
+    """確認被<form>包裹的頁面仍能檢測到正文"""
+    result = extract_text(FORM_WRAPPED_PAGE)
+    lines = result['content'].split('\n')
+    assert result['main_content_detected'] and lines == FORM_WRAPPED_LINES, f"表單包裹頁面提取錯誤: {lines}"
+    print("表單包裹頁面檢查通過")
+
+
+def bs4_extract(html):
+    """舊路徑：構建完整DOM，刪除script/style後清理文本"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def measure(label, func, pages, repeat):
+    """返回最佳一輪的耗時"""
+    best = None
+    output_size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_size = sum(len(func(page)) for page in pages)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label}: {best * 1000:.1f} 毫秒, 輸出 {output_size} 字符")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML文本提取基準測試')
+    parser.add_argument('--paragraphs', type=int, default=2000, help='生成頁面的段落數')
+    parser.add_argument('--repeat', type=int, default=5, help='重複次數（取最佳）')
+    parser.add_argument('--files', nargs='*', help='使用實際的HTML文件代替生成頁面')
+    args = parser.parse_args()
+
+    check_short_paragraphs()
+    check_form_wrapped_page()
+
+    if args.files:
+        pages = [load_text(path)[0] for path in args.files]
+    else:
+        pages = [build_news_page(args.paragraphs)]
+    total_size = sum(len(page.encode('utf-8')) for page in pages)
+    print(f"{len(pages)} 個頁面, 共 {total_size / 1024:.0f} KB")
+
+    results = {}
+    if BS4_AVAILABLE:
+        results['bs4'] = measure('BeautifulSoup (html.parser)', bs4_extract, pages, args.repeat)
+    else:
+        print("BeautifulSoup不可用，跳過舊路徑")
+    results['full'] = measure('流式提取（全部文本）', lambda page: extract_text(page, False)['content'],
+                              pages, args.repeat)
+    results['main'] = measure('流式提取（正文）', lambda page: extract_text(page)['content'],
+                              pages, args.repeat)
+
+    if 'bs4' in results:
+        print(f"加速比: 全部文本 {results['bs4'] / results['full']:.1f}x, "
+              f"正文 {results['bs4'] / results['main']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+URL Fetching Benchmark
+在本地HTTP樁服務器上檢查URLFetcher的按主機並發限制、ETag緩存和GBK解碼，並比較逐個requests.get的耗時
+
+用法:
+    python benchmarks/url_fetching.py --pages 40 --delay 0.05 --per-host 4
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.url_fetcher import URLFetcher
+from src.utils.file_parsers import ExtendedFileParser
+
+PAGE_TEXT = '床前明月光，疑是地上霜。舉頭望明月，低頭思故鄉。'
+
+
+class StubServer:
+    """本地樁服務器：每個請求延遲固定時間，記錄最大並發數和304響應數"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    etag = f'"{self.path}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        with stub.lock:
+                            stub.not_modified += 1
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    body = (f'<html><head><meta charset="gbk"><title>{self.path}</title></head>'
+                            f'<body><p>{PAGE_TEXT}</p></body></html>').encode('gbk')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='URL抓取基準測試')
+    parser.add_argument('--pages', type=int, default=40, help='每個主機的頁面數')
+    parser.add_argument('--delay', type=float, default=0.05, help='樁服務器每個請求的延遲（秒）')
+    parser.add_argument('--per-host', type=int, default=4, help='每個主機的最大並發請求數')
+    parser.add_argument('--workers', type=int, default=16, help='抓取線程數')
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='url_cache_')
+    try:
+        with StubServer(args.delay) as slow, StubServer(0) as fast:
+            slow_urls = [f"{slow.base_url}/page/{i}" for i in range(args.pages)]
+            fast_urls = [f"{fast.base_url}/page/{i}" for i in range(args.pages)]
+            # 慢主機的URL排在前面：按主機調度時快主機不應被阻塞
+            urls = slow_urls + fast_urls
+
+            start = time.perf_counter()
+            for url in urls:
+                requests.get(url, timeout=30).content
+            sequential = time.perf_counter() - start
+            print(f"逐個requests.get: {sequential * 1000:.0f} 毫秒")
+
+            fetcher = URLFetcher(cache_dir=cache_dir, per_host_limit=args.per_host)
+            slow.max_active = fast.max_active = 0
+            start = time.perf_counter()
+            fast_done_at = []
+            results = {}
+            for url, result in fetcher.fetch_many(iter(urls), max_workers=args.workers):
+                check(not isinstance(result, Exception), f"抓取失敗: {url}: {result}")
+                results[url] = result
+                if url.startswith(fast.base_url):
+                    fast_done_at.append(time.perf_counter() - start)
+            concurrent = time.perf_counter() - start
+            print(f"fetch_many（首次）: {concurrent * 1000:.0f} 毫秒, 加速比 {sequential / concurrent:.1f}x")
+
+            check(slow.max_active <= args.per_host, f"主機並發超出限制: {slow.max_active}")
+            check(all(PAGE_TEXT in result.text for result in results.values()), "GBK頁面解碼錯誤")
+            check(max(fast_done_at) < concurrent, "快主機的抓取被慢主機阻塞")
+            print(f"慢主機最大並發 {slow.max_active}/{args.per_host}, "
+                  f"快主機全部完成於 {max(fast_done_at) * 1000:.0f} 毫秒")
+
+            start = time.perf_counter()
+            cached = dict(fetcher.fetch_many(urls, max_workers=args.workers))
+            revalidated = time.perf_counter() - start
+            check(all(result.from_cache for result in cached.values()), "未使用ETag緩存")
+            check(slow.not_modified + fast.not_modified == len(urls), "未發送條件請求")
+            print(f"fetch_many（304重新驗證）: {revalidated * 1000:.0f} 毫秒")
+
+            file_parser = ExtendedFileParser(verbose=False, url_fetcher=fetcher)
+            slow.max_active = 0
+            parsed = file_parser.parse_urls(urls, max_workers=args.workers)
+            check(list(parsed) == urls, "parse_urls結果順序錯誤")
+            check(all(result['content'] == PAGE_TEXT for result in parsed.values()), "網頁正文提取錯誤")
+            check(slow.max_active <= args.per_host, f"parse_urls主機並發超出限制: {slow.max_active}")
+
+            slow.max_active = 0
+            parsed = dict(file_parser.iter_parse_files(urls, max_workers=args.workers))
+            check(all(result['content'] == PAGE_TEXT for result in parsed.values()), "iter_parse_files網頁解析錯誤")
+            check(slow.max_active <= args.per_host, f"iter_parse_files主機並發超出限制: {slow.max_active}")
+            print("按主機並發、ETag緩存和正文提取檢查通過")
+            fetcher.close()
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
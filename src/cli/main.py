@@ -1,103 +1,139 @@
 # -*- coding: utf-8 -*-
 import os
+import json
 import argparse
 import sys
+from collections import Counter
 
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from src.core.analyzer import ChineseTextAnalyzer
 from src.utils.file_utils import FileUtils
-from src.core.visualization import Visualizer
+from src.utils.file_parsers import ExtendedFileParser
+from src.utils.manifest import AnalysisManifest, compute_config_fingerprint
+from src.core.batch_pipeline import BatchOptions, columnar_formats, process_file, run_batch
+from src.core.render_scheduler import RenderScheduler, RenderStats
+from src.core.visualization import RENDER_PROFILES
+from src.utils.columnar_export import COLUMNAR_FORMATS, ColumnarWriter
 
-def analyze_single_file(file_path, analyzer, output_folder, export_formats, visualize=True, font_path=None, advanced_viz=None):
+# 支持逐條記錄分析的文件擴展名
+RECORD_EXTENSIONS = {'.csv', '.json', '.jsonl'}
+
+def analyze_single_file(file_path, analyzer, output_folder, export_formats, visualize=True, font_path=None, advanced_viz=None,
+                        profile=None):
     """分析單個文件並保存結果"""
+    options = BatchOptions(
+        output_dir=output_folder,
+        export_formats=export_formats,
+        visualize=visualize,
+        advanced_viz=advanced_viz,
+        font_path=font_path,
+        profile=profile
+    )
+    # 報告中的各個圖表在渲染進程池中並行生成
+    with RenderScheduler(font_path=font_path) as scheduler:
+        summary = process_file(analyzer, ExtendedFileParser(verbose=False), file_path, options, scheduler)
+        chart_paths = scheduler.join()
+    
+    # 列式格式：將本文件追加到輸出目錄的語料庫表
+    tables = summary.pop('tables', None)
+    if tables:
+        for fmt in columnar_formats(options):
+            try:
+                with ColumnarWriter(output_folder, fmt) as writer:
+                    writer.add_tables(tables)
+            except ImportError as e:
+                print(e)
+    
+    if 'error' in summary:
+        print(f"處理 {file_path} 時出錯: {summary['error']}")
+    else:
+        print(f"已分析 {os.path.basename(file_path)} 並保存結果")
+        for chart_path in chart_paths.values():
+            print(f"已生成圖表: {chart_path}")
+    return summary
+
+def analyze_records_file(file_path, analyzer, output_folder, export_formats, text_columns=None, per_record=False):
+    """逐條記錄流式分析CSV/JSON/JSON Lines文件並保存匯總結果
+    
+    per_record=True時另將每條記錄的結果逐行寫入 <文件名>_records.jsonl；
+    導出格式包含列式格式時，每條記錄作為一個文檔（ID為 <文件名>#<序號>）寫入語料庫表，不再導出匯總
+    """
     try:
-        # 讀取文件
-        text = FileUtils.read_file(file_path)
         filename = os.path.basename(file_path)
-        base_name = os.path.splitext(filename)[0]
-        
-        # 進行基本分析
-        results = analyzer.analyze_text(text)
+        base_name, extension = os.path.splitext(filename)
+        parser = ExtendedFileParser(verbose=False)
         
-        # 添加高級分析
-        # 情感分析
-        results['sentiment'] = analyzer.analyze_sentiment(text)
-        
-        # 關鍵詞提取
-        results['keywords'] = analyzer.keyword_extraction(text)
-        
-        # 命名實體識別
-        results['entities'] = analyzer.extract_entities(text)
-        
-        # N-gram分析
-        results['ngrams'] = analyzer.extract_ngrams(text)
+        if extension.lower() == '.csv':
+            records = parser.iter_csv_records(file_path, text_columns)
+        else:
+            records = parser.iter_json_records(file_path, text_columns)
         
-        # 文本摘要
-        results['summary'] = analyzer.generate_summary(text)
+        if per_record:
+            word_freq = Counter()
+            pos_freq = Counter()
+            sentiment_counts = Counter()
+            records_count = 0
+            total_words = 0
+            records_path = os.path.join(output_folder, f"{base_name}_records.jsonl")
+            table_writers = []
+            try:
+                for fmt in export_formats:
+                    if fmt in COLUMNAR_FORMATS:
+                        table_writers.append(ColumnarWriter(output_folder, fmt))
+                export_formats = [fmt for fmt in export_formats if fmt not in COLUMNAR_FORMATS]
+                with open(records_path, 'w', encoding='utf-8') as f:
+                    for item in analyzer.iter_analyze_records(records):
+                        result = item['result']
+                        for writer in table_writers:
+                            writer.add(f"{base_name}#{item['index']}", result, file_path)
+                        f.write(json.dumps({
+                            'index': item['index'],
+                            'total_words': result['total_words'],
+                            'sentiment': result['sentiment'],
+                            'top_words': dict(Counter(result['word_frequency']).most_common(10))
+                        }, ensure_ascii=False) + '\n')
+                        
+                        word_freq.update(result['word_frequency'])
+                        pos_freq.update(result['pos_frequency'])
+                        sentiment_counts[result['sentiment']['sentiment_label']] += 1
+                        total_words += result['total_words']
+                        records_count += 1
+                print(f"已保存逐條分析結果到: {records_path}")
+            finally:
+                # 出錯時也寫出已緩衝的行並關閉分片，不留下臨時文件
+                for writer in table_writers:
+                    writer.close()
+                    print(f"已導出{writer.fmt}列式表: {writer.documents} 條記錄")
+            
+            results = {
+                'word_frequency': dict(word_freq.most_common()),
+                'pos_frequency': dict(pos_freq.most_common()),
+                'total_words': total_words,
+                'records_count': records_count,
+                'sentiment_distribution': dict(sentiment_counts)
+            }
+        else:
+            results = analyzer.analyze_records(records)
         
-        # 導出結果
         output_path = os.path.join(output_folder, base_name)
         FileUtils.export_results(results, output_path, export_formats)
-        print(f"已分析 {filename} 並保存結果")
-        
-        # 可視化
-        if visualize:
-            viz_folder = os.path.join(output_folder, 'visualizations')
-            Visualizer.create_visualization_report(
-                results, 
-                output_dir=viz_folder, 
-                prefix=base_name,
-                font_path=font_path
-            )
-            
-            # 進階詞頻可視化
-            if advanced_viz and 'word_frequency' in results:
-                # 創建高級詞頻視覺化目錄
-                advanced_viz_folder = os.path.join(viz_folder, 'advanced')
-                os.makedirs(advanced_viz_folder, exist_ok=True)
-                
-                # 詞頻統計餅圖
-                if 'pie' in advanced_viz:
-                    pie_path = os.path.join(advanced_viz_folder, f"{base_name}_word_freq_pie.png")
-                    Visualizer.plot_advanced_word_frequency(
-                        results['word_frequency'],
-                        top_n=15,
-                        title='詞頻分布餅圖',
-                        save_path=pie_path,
-                        plot_type='pie'
-                    )
-                    print(f"已生成詞頻餅圖: {pie_path}")
-                
-                # 詞頻垂直條形圖
-                if 'vertical' in advanced_viz:
-                    vert_path = os.path.join(advanced_viz_folder, f"{base_name}_word_freq_vertical.png")
-                    Visualizer.plot_advanced_word_frequency(
-                        results['word_frequency'],
-                        title='詞頻垂直條形圖',
-                        save_path=vert_path,
-                        plot_type='vertical',
-                        color_map='plasma'
-                    )
-                    print(f"已生成詞頻垂直條形圖: {vert_path}")
-                
-                # 按詞長度排序的詞頻圖
-                if 'length' in advanced_viz:
-                    len_path = os.path.join(advanced_viz_folder, f"{base_name}_word_by_length.png")
-                    Visualizer.plot_advanced_word_frequency(
-                        results['word_frequency'],
-                        title='按詞長度排序的詞頻圖',
-                        save_path=len_path,
-                        sort_by='length',
-                        color_map='magma'
-                    )
-                    print(f"已生成按詞長度排序的詞頻圖: {len_path}")
-        
+        print(f"已分析 {filename} 的 {results['records_count']} 條記錄並保存結果")
         return results
     except Exception as e:
         print(f"處理 {file_path} 時出錯: {str(e)}")
         return {"error": str(e)}
 
+def parse_shard(value):
+    """解析分片參數 i/N（i從0開始）"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"無效的分片參數: {value}，應為 i/N，例如 0/4")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"無效的分片參數: {value}，要求 0 <= i < N")
+    return index, count
+
 def main():
     # 解析命令行參數
     parser = argparse.ArgumentParser(description='中文文本分析工具')
@@ -105,7 +141,7 @@ def main():
     parser.add_argument('--output', '-o', default='results', help='輸出目錄路徑')
     parser.add_argument('--dict', '-d', help='自定義詞典路徑')
     parser.add_argument('--stopwords', '-s', help='停用詞表路徑')
-    parser.add_argument('--formats', '-f', default='json', help='輸出格式，逗號分隔 (json,csv,excel)')
+    parser.add_argument('--formats', '-f', default='json', help='輸出格式，逗號分隔 (json,csv,excel,parquet,arrow,jsonl)；parquet/arrow/jsonl將詞頻、詞性和命名實體寫入輸出目錄下的語料庫表 tables/')
     parser.add_argument('--no-viz', action='store_true', help='不生成可視化圖表')
     parser.add_argument('--batch', '-b', action='store_true', help='批量處理模式')
     parser.add_argument('--parallel', '-p', action='store_true', help='使用並行處理（對於大量文件）')
@@ -113,6 +149,14 @@ def main():
     parser.add_argument('--font', help='中文字體路徑 (用於詞雲圖生成)')
     parser.add_argument('--debug', action='store_true', help='啟用調試模式，顯示詳細錯誤信息')
     parser.add_argument('--advanced-viz', '-av', help='進階詞頻可視化選項，逗號分隔 (pie,vertical,length)')
+    parser.add_argument('--profile', choices=list(RENDER_PROFILES), help='圖表輸出配置：preview (72dpi WebP), web (110dpi PNG), print (300dpi PNG，默認), svg (矢量圖)')
+    parser.add_argument('--records', choices=['aggregate', 'each'], help='CSV/JSON/JSON Lines文件逐條記錄流式分析：aggregate只輸出匯總，each另輸出每條記錄的結果')
+    parser.add_argument('--recursive', '-r', action='store_true', help='批量模式下遞歸處理子目錄')
+    parser.add_argument('--include', help='批量模式下只處理匹配的文件，逗號分隔的glob模式（匹配相對路徑或文件名），例如 2024/*/*.txt')
+    parser.add_argument('--exclude', help='批量模式下跳過匹配的文件或目錄，逗號分隔的glob模式，例如 drafts,*.bak')
+    parser.add_argument('--shard', type=parse_shard, help='只處理第i個分片（共N個，按相對路徑哈希確定性分配），格式 i/N，例如 0/4')
+    parser.add_argument('--incremental', action='store_true', help='增量批量分析：跳過輸出目錄清單中未變更的文件，並更新語料庫匯總')
+    parser.add_argument('--text-columns', help='逐條記錄分析時使用的文本列或字段，逗號分隔（默認自動選擇）')
     
     # 顯示幫助
     if len(sys.argv) == 1:
@@ -139,71 +183,94 @@ def main():
     # 解析進階詞頻可視化選項
     advanced_viz = args.advanced_viz.split(',') if args.advanced_viz else None
     
+    # 解析文本列
+    text_columns = args.text_columns.split(',') if args.text_columns else None
+    
     # 判斷輸入是文件還是目錄
-    if os.path.isfile(args.input):
+    if os.path.isfile(args.input) and args.records and \
+            os.path.splitext(args.input)[1].lower() in RECORD_EXTENSIONS:
+        # 逐條記錄流式分析
+        analyze_records_file(args.input, analyzer, args.output, export_formats,
+                             text_columns, per_record=args.records == 'each')
+    elif os.path.isfile(args.input):
         # 處理單個文件
-        results = analyze_single_file(args.input, analyzer, args.output, export_formats, not args.no_viz, args.font, advanced_viz)
-        
-        # 可視化（如果需要）
-        if not args.no_viz and 'error' not in results:
-            viz_folder = os.path.join(args.output, 'visualizations')
-            # 使用用戶指定的字體（如果有）
-            Visualizer.create_visualization_report(
-                results, 
-                output_dir=viz_folder, 
-                prefix=os.path.basename(os.path.splitext(args.input)[0]),
-                font_path=args.font
-            )
+        analyze_single_file(args.input, analyzer, args.output, export_formats, not args.no_viz, args.font, advanced_viz,
+                            args.profile)
     elif os.path.isdir(args.input) and args.batch:
-        # 批量處理目錄中的文件
-        file_list = FileUtils.get_file_list(args.input, extensions=file_extensions)
+        # 批量處理目錄中的文件：邊遍歷目錄邊分析，無需等待遍歷完成
+        file_iter = FileUtils.iter_files(
+            args.input,
+            extensions=file_extensions,
+            include=args.include.split(',') if args.include else None,
+            exclude=args.exclude.split(',') if args.exclude else None,
+            recursive=args.recursive,
+            shard=args.shard
+        )
         
-        if not file_list:
-            print(f"在 {args.input} 中未找到可分析的文本文件")
-            return
+        # 增量模式：只分析新增或修改過的文件
+        manifest = None
+        seen_files = []
+        if args.incremental:
+            manifest = AnalysisManifest(args.output, compute_config_fingerprint(analyzer))
+            
+            def changed_files(paths):
+                for path in paths:
+                    seen_files.append(path)
+                    if manifest.needs_analysis(path):
+                        yield path
+            
+            file_iter = changed_files(file_iter)
         
-        print(f"找到 {len(file_list)} 個待分析的文件")
+        # 解析、分析、導出和圖表生成都在工作進程中完成，每個文件只讀取和分析一次
+        options = BatchOptions(
+            output_dir=args.output,
+            export_formats=export_formats,
+            visualize=not args.no_viz,
+            advanced_viz=advanced_viz,
+            font_path=args.font,
+            profile=args.profile,
+            custom_dict_path=args.dict,
+            stopwords_path=args.stopwords,
+            input_root=args.input
+        )
+        processes = None if args.parallel else 1
         
-        # 根據參數選擇串行或並行處理
-        if args.parallel:
-            results = analyzer.analyze_files_parallel(file_list)
-        else:
-            results = analyzer.analyze_files(file_list)
+        # 串行分析時圖表交給渲染進程池，與後續文件的分析同時進行；並行分析時圖表在各工作進程中渲染
+        scheduler = RenderScheduler(font_path=args.font) if options.visualize and not args.parallel else None
+        render_stats = scheduler.stats if scheduler else RenderStats()
         
-        # 保存結果
-        for file_path, result in results.items():
-            filename = os.path.basename(file_path)
-            base_name = os.path.splitext(filename)[0]
-            output_path = os.path.join(args.output, base_name)
-            
-            # 添加高級分析結果（如果沒有錯誤）
-            if 'error' not in result:
-                try:
-                    # 讀取文件
-                    text = FileUtils.read_file(file_path)
-                    
-                    # 添加高級分析
-                    result['sentiment'] = analyzer.analyze_sentiment(text)
-                    result['keywords'] = analyzer.keyword_extraction(text)
-                    result['entities'] = analyzer.extract_entities(text)
-                    result['ngrams'] = analyzer.extract_ngrams(text)
-                    result['summary'] = analyzer.generate_summary(text)
-                except Exception as e:
-                    print(f"為 {file_path} 添加高級分析時出錯: {str(e)}")
+        processed_count = 0
+        for summary in run_batch(file_iter, options, processes=processes, analyzer=analyzer, scheduler=scheduler):
+            processed_count += 1
+            render_stats.merge(summary.get('chart_timings', []))
+            if 'error' in summary:
+                print(f"處理 {summary['file_path']} 時出錯: {summary['error']}")
+            else:
+                print(f"已保存分析結果到: {summary['output_path']} ({summary['elapsed']:.2f} 秒)")
             
-            # 導出結果
-            FileUtils.export_results(result, output_path, export_formats)
-            print(f"已保存分析結果到: {output_path}")
-            
-            # 生成可視化
-            if not args.no_viz and 'error' not in result:
-                viz_folder = os.path.join(args.output, 'visualizations')
-                Visualizer.create_visualization_report(
-                    result, 
-                    output_dir=viz_folder, 
-                    prefix=base_name,
-                    font_path=args.font
-                )
+            if manifest:
+                manifest.record(summary['file_path'], summary, summary['output_path'])
+        
+        if scheduler:
+            scheduler.close()
+        if options.visualize and processed_count:
+            print("圖表渲染耗時:")
+            print(render_stats.format())
+        
+        if manifest:
+            # 只移除磁盤上已刪除的文件，過濾或分片時未掃描到的文件記錄保留
+            removed = manifest.prune(seen_files)
+            if removed:
+                print(f"從清單中移除 {len(removed)} 個已刪除的文件")
+            print(f"增量模式: {len(seen_files) - processed_count} 個文件未變更已跳過")
+            summary_path = manifest.write_corpus_summary()
+            manifest.close()
+            print(f"語料庫匯總已更新: {summary_path}")
+        
+        if processed_count == 0 and not seen_files:
+            print(f"在 {args.input} 中未找到可分析的文本文件")
+        else:
+            print(f"共分析 {processed_count} 個文件")
     else:
         print(f"錯誤: 輸入路徑 {args.input} 不存在或不是有效的文件/目錄，或者未指定批量處理模式")
 
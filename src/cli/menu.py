@@ -9,6 +9,9 @@ from src.core.analyzer import ChineseTextAnalyzer
 from src.utils.file_utils import FileUtils
 from src.core.visualization import Visualizer
 from src.utils.convert_chinese import convert_text
+from src.utils.manifest import AnalysisManifest, compute_config_fingerprint
+from src.core.batch_pipeline import BatchOptions, run_batch
+from src.core.render_scheduler import RenderScheduler, RenderStats
 
 class TextAnalyzerMenu:
     def __init__(self):
@@ -410,13 +413,16 @@ class TextAnalyzerMenu:
             if self.visualize:
                 print("\n正在生成視覺化圖表...")
                 viz_folder = os.path.join(self.output_dir, 'visualizations')
-                viz_path = Visualizer.create_visualization_report(
-                    results, 
-                    output_dir=viz_folder, 
-                    prefix=base_name,
-                    font_path=self.font_path,
-                    dpi=self.dpi
-                )
+                # 報告中的各個圖表在渲染進程池中並行生成
+                with RenderScheduler(font_path=self.font_path) as scheduler:
+                    viz_path = Visualizer.create_visualization_report(
+                        results, 
+                        output_dir=viz_folder, 
+                        prefix=base_name,
+                        font_path=self.font_path,
+                        dpi=self.dpi,
+                        scheduler=scheduler
+                    )
                 print(f"已將視覺化圖表保存至: {viz_folder}")
                 
                 # 進階詞頻可視化
@@ -499,8 +505,11 @@ class TextAnalyzerMenu:
         
         file_extensions = [ext if ext.startswith('.') else f'.{ext}' for ext in extensions.split(',')]
         
+        # 詢問是否包含子目錄
+        recursive = input("是否包含子目錄中的文件？(y/n，默認: n): ").strip().lower() == 'y'
+        
         # 獲取文件列表
-        file_list = FileUtils.get_file_list(dir_path, extensions=file_extensions)
+        file_list = list(FileUtils.iter_files(dir_path, extensions=file_extensions, recursive=recursive))
         
         if not file_list:
             print(f"在 {dir_path} 中未找到可分析的文本文件")
@@ -509,11 +518,27 @@ class TextAnalyzerMenu:
             
         print(f"\n找到 {len(file_list)} 個待分析的文件:")
         for i, file_path in enumerate(file_list[:10], 1):
-            print(f"{i}. {os.path.basename(file_path)}")
+            print(f"{i}. {os.path.relpath(file_path, dir_path)}")
         
         if len(file_list) > 10:
             print(f"... 以及 {len(file_list) - 10} 個其他文件")
             
+        # 詢問是否增量分析
+        use_incremental = input("\n是否增量分析（跳過上次分析後未變更的文件）？(y/n，默認: n): ").strip().lower()
+        manifest = None
+        if use_incremental == 'y':
+            manifest = AnalysisManifest(self.output_dir, compute_config_fingerprint(self.analyzer))
+            manifest.prune(file_list)
+            total_count = len(file_list)
+            file_list = manifest.filter_changed(file_list)
+            print(f"{total_count - len(file_list)} 個文件未變更已跳過，{len(file_list)} 個文件待分析")
+            if not file_list:
+                summary_path = manifest.write_corpus_summary()
+                manifest.close()
+                print(f"語料庫匯總已更新: {summary_path}")
+                input("按Enter返回主菜單...")
+                return
+        
         # 詢問是否使用並行處理
         use_parallel = input("\n是否使用並行處理以加快大量文件的處理速度？(y/n，默認: n): ").strip().lower()
         use_parallel = use_parallel == 'y'
@@ -524,105 +549,59 @@ class TextAnalyzerMenu:
         # 創建輸出目錄
         os.makedirs(self.output_dir, exist_ok=True)
         
-        # 根據參數選擇串行或並行處理
+        # 解析、分析、導出和圖表生成都在工作進程中完成，每個文件只讀取和分析一次
+        options = BatchOptions(
+            output_dir=self.output_dir,
+            export_formats=self.export_formats,
+            visualize=self.visualize,
+            advanced_viz=self.advanced_viz,
+            font_path=self.font_path,
+            dpi=self.dpi,
+            custom_dict_path=self.analyzer.custom_dict_path,
+            stopwords_path=self.analyzer.stopwords_path,
+            input_root=dir_path
+        )
+        
         start_time = time.time()
         if use_parallel:
             print("使用並行處理模式...")
-            results = self.analyzer.analyze_files_parallel(file_list)
+            processes = None
         else:
             print("使用串行處理模式...")
-            results = self.analyzer.analyze_files(file_list)
-        
-        # 保存結果
-        for file_path, result in results.items():
-            filename = os.path.basename(file_path)
-            base_name = os.path.splitext(filename)[0]
-            output_path = os.path.join(self.output_dir, base_name)
-            
-            # 添加高級分析結果（如果沒有錯誤）
-            if 'error' not in result:
-                try:
-                    # 讀取文件
-                    text = FileUtils.read_file(file_path)
-                    
-                    # 計算文本字符統計信息
-                    total_chars = len(text)
-                    chinese_chars = self.analyzer.count_chinese_characters(text)
-                    result['total_characters'] = total_chars
-                    result['chinese_characters'] = chinese_chars
-                    result['chinese_character_ratio'] = round(chinese_chars/total_chars*100, 2)
-                    
-                    print(f"{filename}: 總字符 {total_chars}, 中文字符 {chinese_chars} ({result['chinese_character_ratio']}%)")
-                    
-                    # 添加高級分析
-                    result['sentiment'] = self.analyzer.analyze_sentiment(text)
-                    result['keywords'] = self.analyzer.keyword_extraction(text)
-                    result['entities'] = self.analyzer.extract_entities(text)
-                    result['ngrams'] = self.analyzer.extract_ngrams(text)
-                    result['summary'] = self.analyzer.generate_summary(text)
-                except Exception as e:
-                    print(f"為 {filename} 添加高級分析時出錯: {str(e)}")
-            
-            # 導出結果
-            FileUtils.export_results(result, output_path, self.export_formats)
-            print(f"已保存 {filename} 分析結果")
+            processes = 1
+        
+        # 串行分析時圖表交給渲染進程池，與後續文件的分析同時進行；並行分析時圖表在各工作進程中渲染
+        scheduler = RenderScheduler(font_path=self.font_path) if self.visualize and not use_parallel else None
+        render_stats = scheduler.stats if scheduler else RenderStats()
+        
+        for summary in run_batch(file_list, options, processes=processes, analyzer=self.analyzer,
+                                 scheduler=scheduler):
+            render_stats.merge(summary.get('chart_timings', []))
+            filename = os.path.basename(summary['file_path'])
+            if 'error' in summary:
+                print(f"處理 {filename} 時出錯: {summary['error']}")
+            else:
+                print(f"{filename}: 總字符 {summary['total_characters']}, 中文字符 {summary['chinese_characters']} "
+                      f"({summary['chinese_character_ratio']}%)")
+                print(f"已保存 {filename} 分析結果")
             
-            # 生成可視化
-            if self.visualize and 'error' not in result:
-                viz_folder = os.path.join(self.output_dir, 'visualizations')
-                Visualizer.create_visualization_report(
-                    result, 
-                    output_dir=viz_folder, 
-                    prefix=base_name,
-                    font_path=self.font_path,
-                    dpi=self.dpi
-                )
-                
-                # 進階詞頻可視化
-                if self.advanced_viz and 'word_frequency' in result:
-                    # 創建高級詞頻視覺化目錄
-                    advanced_viz_folder = os.path.join(viz_folder, 'advanced')
-                    os.makedirs(advanced_viz_folder, exist_ok=True)
-                    
-                    # 詞頻統計餅圖
-                    if 'pie' in self.advanced_viz:
-                        pie_path = os.path.join(advanced_viz_folder, f"{base_name}_word_freq_pie.png")
-                        Visualizer.plot_advanced_word_frequency(
-                            result['word_frequency'],
-                            top_n=15,
-                            title='詞頻分布餅圖',
-                            save_path=pie_path,
-                            plot_type='pie',
-                            dpi=self.dpi
-                        )
-                    
-                    # 詞頻垂直條形圖
-                    if 'vertical' in self.advanced_viz:
-                        vert_path = os.path.join(advanced_viz_folder, f"{base_name}_word_freq_vertical.png")
-                        Visualizer.plot_advanced_word_frequency(
-                            result['word_frequency'],
-                            title='詞頻垂直條形圖',
-                            save_path=vert_path,
-                            plot_type='vertical',
-                            color_map='plasma',
-                            dpi=self.dpi
-                        )
-                    
-                    # 按詞長度排序的詞頻圖
-                    if 'length' in self.advanced_viz:
-                        len_path = os.path.join(advanced_viz_folder, f"{base_name}_word_by_length.png")
-                        Visualizer.plot_advanced_word_frequency(
-                            result['word_frequency'],
-                            title='按詞長度排序的詞頻圖',
-                            save_path=len_path,
-                            sort_by='length',
-                            color_map='magma',
-                            dpi=self.dpi
-                        )
+            if manifest:
+                manifest.record(summary['file_path'], summary, summary['output_path'])
+        
+        if scheduler:
+            scheduler.close()
+        if self.visualize:
+            print("\n圖表渲染耗時:")
+            print(render_stats.format())
         
         end_time = time.time()
         duration = end_time - start_time
         
+        if manifest:
+            summary_path = manifest.write_corpus_summary()
+            manifest.close()
+            print(f"語料庫匯總已更新: {summary_path}")
+        
         print("\n" + "-" * 50)
         print(f"批量分析完成！共處理了 {len(file_list)} 個文件")
         print(f"總耗時: {duration:.2f} 秒")
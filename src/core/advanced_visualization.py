@@ -11,6 +11,12 @@ import numpy as np
 import pandas as pd
 import os
 import sys
+import re
+import json
+import html
+import base64
+from pathlib import Path
+from collections import Counter
 
 # Interactive visualizations
 try:
@@ -18,6 +24,8 @@ try:
     import plotly.express as px
     import plotly.figure_factory as ff
     from plotly.subplots import make_subplots
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+    from plotly.utils import PlotlyJSONEncoder
     PLOTLY_AVAILABLE = True
 except ImportError:
     PLOTLY_AVAILABLE = False
@@ -40,6 +48,132 @@ except ImportError:
     COLOR_MANAGER_AVAILABLE = False
     print("顏色管理器不可用，使用默認顏色")
 
+from src.core.cooccurrence import CooccurrenceCounter, network_layout
+from src.core.similarity_reduction import (similarity_edges, similarity_embedding, cluster_order, aggregate_matrix,
+                                           SCIPY_AVAILABLE)
+
+# 本地提供的plotly.js，所有交互式HTML共用同一文件，瀏覽器只需下載一次
+PLOTLY_ASSET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'src', 'web', 'static', 'js', 'vendor'
+)
+
+# 數值數組達到此長度時以base64二進制編碼（typed array）寫入圖表JSON；plotly.js 2.28起支持
+TYPED_ARRAY_MIN_LENGTH = 8
+TYPED_ARRAY_MIN_PLOTLYJS = (2, 28)
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+# 相似度熱力圖：超過此文本數時不標注數值，並按聚類重排
+HEATMAP_ANNOTATION_MAX = 30
+# 熱力圖的最大邊長（超出時分塊聚合），靜態圖受像素限制，交互圖受瀏覽器內存限制
+STATIC_HEATMAP_MAX_SIZE = 120
+INTERACTIVE_HEATMAP_MAX_SIZE = 400
+
+# 相似度網絡圖：超過此文本數時每個文本只連接最相似的NETWORK_TOP_K個鄰居，並隱藏文字標籤
+LARGE_NETWORK_THRESHOLD = 100
+NETWORK_TOP_K = 5
+# 超過此文本數時直接使用相似度嵌入作為佈局，不再做力導向迭代；
+# networkx對500個以上節點的力導向佈局依賴scipy稀疏矩陣
+SPRING_LAYOUT_MAX_NODES = 1000 if SCIPY_AVAILABLE else 500
+# 交互式網絡圖達到此文本數時使用WebGL（Scattergl）渲染
+WEBGL_MIN_NODES = 300
+
+
+def plotly_js_path(asset_dir=PLOTLY_ASSET_DIR):
+    """返回本地plotly.js文件路徑，首次調用時從plotly包中導出
+
+    文件名包含版本號，內容不變，可以長期緩存
+    """
+    path = os.path.join(asset_dir, f"plotly-{get_plotlyjs_version()}.min.js")
+    if not os.path.exists(path):
+        os.makedirs(asset_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+        os.replace(tmp_path, path)
+    return path
+
+
+def _typed_arrays_supported():
+    """當前plotly.js是否支持typed array編碼"""
+    try:
+        version = tuple(int(part) for part in get_plotlyjs_version().split('.')[:2])
+    except ValueError:
+        return False
+    return version >= TYPED_ARRAY_MIN_PLOTLYJS
+
+
+def _encode_typed_array(values):
+    """把一維或二維數值數組編碼為 {'dtype', 'bdata', 'shape'}，不是數值數組時返回None"""
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        # 不規則的嵌套列表
+        return None
+    if array.dtype.kind not in 'iuf' or array.ndim not in (1, 2) or array.size < TYPED_ARRAY_MIN_LENGTH:
+        return None
+
+    if array.dtype.kind in 'iu' and (array.size == 0 or (array.min() >= INT32_MIN and array.max() <= INT32_MAX)):
+        dtype, array = 'i4', array.astype('<i4')
+    else:
+        dtype, array = 'f8', array.astype('<f8')
+
+    encoded = {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+    if array.ndim == 2:
+        encoded['shape'] = f"{array.shape[0]}, {array.shape[1]}"
+    return encoded
+
+
+def _compact_arrays(value):
+    """遞歸地把圖表數據中的數值數組替換為typed array編碼"""
+    if isinstance(value, dict):
+        return {key: _compact_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        encoded = _encode_typed_array(value)
+        if encoded is not None:
+            return encoded
+        return [_compact_arrays(item) for item in value]
+    return value
+
+
+def figure_to_json(fig):
+    """序列化圖表為緊湊JSON：無多餘空白，數值數組使用二進制編碼"""
+    spec = fig.to_plotly_json()
+    data = spec.get('data', [])
+    if _typed_arrays_supported():
+        data = [_compact_arrays(trace) for trace in data]
+    compact = {'data': data, 'layout': spec.get('layout', {})}
+    text = json.dumps(compact, cls=PlotlyJSONEncoder, separators=(',', ':'), ensure_ascii=False)
+    # 防止數據中的 </script> 提前結束腳本
+    return text.replace('</', '<\\/')
+
+
+def _script_src(output_path):
+    """HTML文件引用本地plotly.js的相對路徑（Web服務和本地直接打開都可用）"""
+    asset_path = plotly_js_path()
+    try:
+        return Path(os.path.relpath(asset_path, os.path.dirname(os.path.abspath(output_path)))).as_posix()
+    except ValueError:
+        # Windows下不在同一磁盤時無法使用相對路徑
+        return Path(asset_path).as_uri()
+
+
+# 頁面中引用本地plotly.js的script標籤
+PLOTLY_SCRIPT_PATTERN = re.compile(rb'<script src="[^"]*plotly-[0-9A-Za-z.+\-]+\.min\.js"></script>')
+
+
+def bundle_html(output_path):
+    """返回用於下載打包的頁面內容：plotly.js改為引用同目錄下的文件
+
+    本地頁面通過相對路徑引用static目錄中的plotly.js，離開服務器後無法加載；
+    打包時把plotly_js_path()導出的文件放在壓縮包根目錄，並改寫頁面中的引用
+    """
+    with open(output_path, 'rb') as f:
+        content = f.read()
+    script = f'<script src="{html.escape(os.path.basename(plotly_js_path()))}"></script>'.encode('utf-8')
+    return PLOTLY_SCRIPT_PATTERN.sub(lambda _: script, content, count=1)
+
+
 class AdvancedVisualizer:
     """高級視覺化器"""
     
@@ -68,10 +202,15 @@ class AdvancedVisualizer:
         print(f"NetworkX支持: {'✓' if NETWORKX_AVAILABLE else '✗'}")
     
     def plot_similarity_heatmap(self, similarity_matrix, labels=None, title='文本相似度熱力圖', save_path=None):
-        """繪製相似度熱力圖"""
+        """繪製相似度熱力圖
+        
+        文本較多時按聚類重排、分塊聚合到STATIC_HEATMAP_MAX_SIZE以內，並省略數值標注
+        """
         if labels is None:
             labels = [f"文本{i+1}" for i in range(len(similarity_matrix))]
         
+        similarity_matrix, labels, large = self._prepare_heatmap(similarity_matrix, labels, STATIC_HEATMAP_MAX_SIZE)
+        
         plt.figure(figsize=(12, 10))
         
         # 創建熱力圖
@@ -84,24 +223,25 @@ class AdvancedVisualizer:
             colormap = 'RdYlBu_r'
         
         sns.heatmap(
-            similarity_matrix,
+            # 大矩陣時seaborn根據DataFrame索引自動抽樣顯示刻度標籤
+            pd.DataFrame(similarity_matrix, index=labels, columns=labels),
             mask=mask,
-            annot=True,
+            annot=not large,
             fmt='.3f',
             cmap=colormap,
             vmin=0,
             vmax=1,
             center=0.5,
             square=True,
-            linewidths=0.5,
+            linewidths=0 if large else 0.5,
             cbar_kws={"shrink": .8},
-            xticklabels=labels,
-            yticklabels=labels
+            xticklabels='auto',
+            yticklabels='auto'
         )
         
         plt.title(title, fontsize=16, pad=20)
-        plt.xlabel('文本')
-        plt.ylabel('文本')
+        plt.xlabel('文本（按聚類排序）' if large else '文本')
+        plt.ylabel('文本（按聚類排序）' if large else '文本')
         plt.xticks(rotation=45, ha='right')
         plt.yticks(rotation=0)
         plt.tight_layout()
@@ -113,7 +253,10 @@ class AdvancedVisualizer:
             plt.show()
     
     def plot_interactive_similarity_heatmap(self, similarity_matrix, labels=None, title='交互式相似度熱力圖'):
-        """繪製交互式相似度熱力圖"""
+        """繪製交互式相似度熱力圖
+        
+        文本較多時按聚類重排、分塊聚合到INTERACTIVE_HEATMAP_MAX_SIZE以內，並省略單元格文字
+        """
         if not PLOTLY_AVAILABLE:
             print("Plotly不可用，使用靜態熱力圖")
             return self.plot_similarity_heatmap(similarity_matrix, labels, title)
@@ -121,42 +264,67 @@ class AdvancedVisualizer:
         if labels is None:
             labels = [f"文本{i+1}" for i in range(len(similarity_matrix))]
         
+        similarity_matrix, labels, large = self._prepare_heatmap(similarity_matrix, labels, INTERACTIVE_HEATMAP_MAX_SIZE)
+        
         # 獲取統一的熱力圖顏色
         if COLOR_MANAGER_AVAILABLE:
             colorscale = color_manager.get_heatmap_colormap('plotly')
         else:
             colorscale = 'RdYlBu_r'
         
-        fig = go.Figure(data=go.Heatmap(
+        heatmap_options = dict(
             z=similarity_matrix,
             x=labels,
             y=labels,
             colorscale=colorscale,
             zmin=0,
             zmax=1,
-            text=np.round(similarity_matrix, 3),
-            texttemplate="%{text}",
-            textfont={"size": 10},
             hoverongaps=False
-        ))
+        )
+        if not large:
+            heatmap_options.update(
+                text=np.round(similarity_matrix, 3),
+                texttemplate="%{text}",
+                textfont={"size": 10}
+            )
+        fig = go.Figure(data=go.Heatmap(**heatmap_options))
         
         fig.update_layout(
             title=title,
-            xaxis_title="文本",
-            yaxis_title="文本",
+            xaxis_title="文本（按聚類排序）" if large else "文本",
+            yaxis_title="文本（按聚類排序）" if large else "文本",
             width=800,
             height=600
         )
+        if large:
+            fig.update_xaxes(showticklabels=False)
+            fig.update_yaxes(showticklabels=False)
         
         return fig
     
-    def plot_text_network(self, similarity_matrix, labels=None, threshold=0.5, title='文本相似度網絡圖', save_path=None):
-        """繪製文本相似度網絡圖"""
-        if not NETWORKX_AVAILABLE:
-            raise ImportError("NetworkX不可用，請安裝networkx")
+    @staticmethod
+    def _prepare_heatmap(similarity_matrix, labels, max_size):
+        """大矩陣按聚類重排並分塊聚合，返回 (矩陣, 標籤, 是否為大矩陣模式)"""
+        similarity_matrix = np.asarray(similarity_matrix, dtype=float)
+        if len(similarity_matrix) <= HEATMAP_ANNOTATION_MAX:
+            return similarity_matrix, labels, False
+        
+        order = cluster_order(similarity_matrix)
+        reordered = similarity_matrix[np.ix_(order, order)]
+        matrix, block_labels = aggregate_matrix(reordered, [labels[i] for i in order], max_size)
+        return matrix, block_labels, True
+    
+    def _build_similarity_graph(self, similarity_matrix, labels, threshold, top_k):
+        """構建相似度網絡，返回 (圖, 佈局, 是否為大網絡模式)
         
-        if labels is None:
-            labels = [f"文本{i+1}" for i in range(len(similarity_matrix))]
+        大網絡只保留每個文本的top-k近鄰邊，佈局以相似度嵌入為初始位置（固定種子），
+        節點很多時直接使用嵌入坐標
+        """
+        similarity_matrix = np.asarray(similarity_matrix, dtype=float)
+        count = len(similarity_matrix)
+        large = count > LARGE_NETWORK_THRESHOLD
+        if top_k is None and large:
+            top_k = NETWORK_TOP_K
         
         # 創建網絡圖
         G = nx.Graph()
@@ -166,17 +334,34 @@ class AdvancedVisualizer:
             G.add_node(i, label=label)
         
         # 添加邊（相似度超過閾值）
-        for i in range(len(similarity_matrix)):
-            for j in range(i + 1, len(similarity_matrix)):
-                if similarity_matrix[i][j] > threshold:
-                    G.add_edge(i, j, weight=similarity_matrix[i][j])
+        G.add_weighted_edges_from(similarity_edges(similarity_matrix, threshold, top_k))
+        
+        # 計算佈局
+        embedding = similarity_embedding(similarity_matrix)
+        initial = {i: tuple(embedding[i]) for i in range(count)}
+        if G.number_of_edges() and count <= SPRING_LAYOUT_MAX_NODES:
+            pos = nx.spring_layout(G, pos=initial, k=3 / np.sqrt(max(count, 1)), iterations=50, seed=42)
+        else:
+            pos = initial
+        return G, pos, large
+    
+    def plot_text_network(self, similarity_matrix, labels=None, threshold=0.5, title='文本相似度網絡圖', save_path=None,
+                          top_k=None):
+        """繪製文本相似度網絡圖
+        
+        top_k指定每個文本最多連接的近鄰數；文本數超過LARGE_NETWORK_THRESHOLD時默認為NETWORK_TOP_K
+        """
+        if not NETWORKX_AVAILABLE:
+            raise ImportError("NetworkX不可用，請安裝networkx")
+        
+        if labels is None:
+            labels = [f"文本{i+1}" for i in range(len(similarity_matrix))]
+        
+        G, pos, large = self._build_similarity_graph(similarity_matrix, labels, threshold, top_k)
         
         # 繪製網絡圖
         plt.figure(figsize=(12, 8))
         
-        # 計算佈局
-        pos = nx.spring_layout(G, k=3, iterations=50)
-        
         # 獲取網絡圖顏色
         if COLOR_MANAGER_AVAILABLE:
             network_colors = color_manager.get_network_colors()
@@ -188,17 +373,18 @@ class AdvancedVisualizer:
         
         # 繪製節點
         nx.draw_networkx_nodes(G, pos, node_color=node_color, 
-                              node_size=1000, alpha=0.7)
+                              node_size=30 if large else 1000, alpha=0.7)
         
         # 繪製邊，線寬根據相似度權重調整
         edges = G.edges()
         weights = [G[u][v]['weight'] for u, v in edges]
-        nx.draw_networkx_edges(G, pos, width=[w*5 for w in weights], 
-                              alpha=0.6, edge_color=edge_color)
+        nx.draw_networkx_edges(G, pos, width=[w * (1 if large else 5) for w in weights], 
+                              alpha=0.3 if large else 0.6, edge_color=edge_color)
         
-        # 添加標籤
-        labels_dict = {i: labels[i] for i in range(len(labels))}
-        nx.draw_networkx_labels(G, pos, labels_dict, font_size=8)
+        # 添加標籤（大網絡中標籤互相遮擋，省略）
+        if not large:
+            labels_dict = {i: labels[i] for i in range(len(labels))}
+            nx.draw_networkx_labels(G, pos, labels_dict, font_size=8)
         
         plt.title(title)
         plt.axis('off')
@@ -210,40 +396,30 @@ class AdvancedVisualizer:
         else:
             plt.show()
     
-    def plot_interactive_network(self, similarity_matrix, labels=None, threshold=0.5, title='交互式文本網絡圖'):
-        """繪製交互式網絡圖"""
+    def plot_interactive_network(self, similarity_matrix, labels=None, threshold=0.5, title='交互式文本網絡圖',
+                                 top_k=None):
+        """繪製交互式網絡圖
+        
+        大網絡使用top-k近鄰邊並隱藏節點文字（懸停顯示），節點很多時使用WebGL渲染
+        """
         if not PLOTLY_AVAILABLE or not NETWORKX_AVAILABLE:
             print("所需庫不可用，使用靜態網絡圖")
-            return self.plot_text_network(similarity_matrix, labels, threshold, title)
+            return self.plot_text_network(similarity_matrix, labels, threshold, title, top_k=top_k)
         
         if labels is None:
             labels = [f"文本{i+1}" for i in range(len(similarity_matrix))]
         
-        # 創建網絡圖
-        G = nx.Graph()
-        
-        for i, label in enumerate(labels):
-            G.add_node(i, label=label)
-        
-        for i in range(len(similarity_matrix)):
-            for j in range(i + 1, len(similarity_matrix)):
-                if similarity_matrix[i][j] > threshold:
-                    G.add_edge(i, j, weight=similarity_matrix[i][j])
-        
-        # 計算佈局
-        pos = nx.spring_layout(G)
+        G, pos, large = self._build_similarity_graph(similarity_matrix, labels, threshold, top_k)
         
         # 準備繪圖數據
         edge_x = []
         edge_y = []
-        edge_weights = []
         
         for edge in G.edges():
             x0, y0 = pos[edge[0]]
             x1, y1 = pos[edge[1]]
             edge_x.extend([x0, x1, None])
             edge_y.extend([y0, y1, None])
-            edge_weights.append(G[edge[0]][edge[1]]['weight'])
         
         node_x = []
         node_y = []
@@ -257,6 +433,7 @@ class AdvancedVisualizer:
         
         # 創建圖形
         fig = go.Figure()
+        scatter = go.Scattergl if G.number_of_nodes() >= WEBGL_MIN_NODES else go.Scatter
         
         # 獲取網絡圖顏色
         if COLOR_MANAGER_AVAILABLE:
@@ -268,36 +445,50 @@ class AdvancedVisualizer:
             edge_color = 'gray'
         
         # 添加邊
-        fig.add_trace(go.Scatter(
+        fig.add_trace(scatter(
             x=edge_x, y=edge_y,
-            line=dict(width=2, color=edge_color),
+            line=dict(width=1 if large else 2, color=edge_color),
+            opacity=0.4 if large else 1,
             hoverinfo='none',
             mode='lines',
             name='連接'
         ))
         
         # 添加節點
-        fig.add_trace(go.Scatter(
-            x=node_x, y=node_y,
-            mode='markers+text',
-            hoverinfo='text',
-            text=node_text,
-            textposition="middle center",
-            marker=dict(
-                size=30,
-                color=node_color,
-                line=dict(width=2, color='DarkSlateGrey')
-            ),
-            name='文本節點'
-        ))
+        if large:
+            fig.add_trace(scatter(
+                x=node_x, y=node_y,
+                mode='markers',
+                hoverinfo='text',
+                text=node_text,
+                marker=dict(size=8, color=node_color, line=dict(width=1, color='DarkSlateGrey')),
+                name='文本節點'
+            ))
+        else:
+            fig.add_trace(scatter(
+                x=node_x, y=node_y,
+                mode='markers+text',
+                hoverinfo='text',
+                text=node_text,
+                textposition="middle center",
+                marker=dict(
+                    size=30,
+                    color=node_color,
+                    line=dict(width=2, color='DarkSlateGrey')
+                ),
+                name='文本節點'
+            ))
         
+        annotation = "節點表示文本，邊的存在表示相似度超過閾值"
+        if large:
+            annotation += f"（每個文本最多連接{top_k or NETWORK_TOP_K}個最相似的文本）"
         fig.update_layout(
             title=dict(text=title, font=dict(size=16)),
             showlegend=False,
             hovermode='closest',
             margin=dict(b=20,l=5,r=5,t=40),
             annotations=[ dict(
-                text="節點大小表示文本，邊的存在表示相似度超過閾值",
+                text=annotation,
                 showarrow=False,
                 xref="paper", yref="paper",
                 x=0.005, y=-0.002,
@@ -370,83 +561,63 @@ class AdvancedVisualizer:
         
         return fig
     
-    def plot_single_text_network(self, analysis_data, title='詞語關聯網絡圖'):
-        """為單個文本生成詞語關聯交互式網絡圖"""
+    def plot_single_text_network(self, analysis_data, title='詞語關聯網絡圖', top_n=15, method='pmi',
+                                 min_count=2, max_edges=None, label_top_n=40):
+        """為單個文本生成詞語關聯交互式網絡圖
+
+        邊來自分析時統計的滑動窗口詞語共現（cooccurrence），按PMI或共現次數篩選；
+        舊結果沒有共現數據時從N-gram統計推導。佈局固定種子並緩存，節點可達數百個
+        """
         if not PLOTLY_AVAILABLE or not NETWORKX_AVAILABLE:
             print("所需庫不可用，無法生成交互式網絡圖")
             return None
         
-        # 獲取詞頻和N-gram數據
+        # 獲取詞頻和共現數據
         word_freq = analysis_data.get('word_frequency', {})
-        ngrams = analysis_data.get('ngrams', {})
         
         if not word_freq:
             print("缺少詞頻數據")
             return None
         
-        # 獲取前15個高頻詞
-        top_words = dict(sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:15])
-        words = list(top_words.keys())
+        if analysis_data.get('cooccurrence'):
+            counter = CooccurrenceCounter.from_dict(analysis_data['cooccurrence'])
+        else:
+            counter = self._cooccurrence_from_ngrams(word_freq, analysis_data.get('ngrams', {}), top_n)
         
-        # 創建網絡圖
-        G = nx.Graph()
+        # 獲取前N個高頻詞
+        top_words = dict(sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:top_n])
+        words = list(top_words.keys())
         
-        # 添加節點（詞語）
-        for i, word in enumerate(words):
-            G.add_node(i, label=word, weight=top_words[word])
-        
-        # 基於N-gram和詞頻添加邊
-        for i, word1 in enumerate(words):
-            for j, word2 in enumerate(words):
-                if i < j:  # 避免重複邊
-                    # 檢查是否在N-gram中共現
-                    cooccurrence = 0
-                    for ngram in ngrams:
-                        if word1 in ngram and word2 in ngram:
-                            cooccurrence += ngrams[ngram]
-                    
-                    # 或者基於詞頻相似性添加邊
-                    freq_similarity = min(top_words[word1], top_words[word2]) / max(top_words[word1], top_words[word2])
-                    
-                    # 如果有共現或詞頻相似，添加邊
-                    if cooccurrence > 0 or freq_similarity > 0.5:
-                        weight = cooccurrence if cooccurrence > 0 else freq_similarity
-                        G.add_edge(i, j, weight=weight)
-        
-        # 如果沒有邊，基於詞頻創建一些連接
-        if len(G.edges()) == 0:
-            for i in range(min(5, len(words))):
-                for j in range(i+1, min(i+3, len(words))):
-                    if j < len(words):
-                        weight = (top_words[words[i]] + top_words[words[j]]) / 2
-                        G.add_edge(i, j, weight=weight)
+        # 按PMI或共現次數選邊；短文本中詞對很少重複出現，此時放寬到共現一次
+        max_edges = max_edges or len(words) * 3
+        edges = counter.select_edges(words, method=method, min_count=min_count, max_edges=max_edges)
+        if not edges and min_count > 1:
+            edges = counter.select_edges(words, method=method, min_count=1, max_edges=max_edges)
         
-        # 計算佈局
-        pos = nx.spring_layout(G, k=2, iterations=50)
+        # 計算佈局（確定性，相同數據直接使用緩存）
+        pos = network_layout(words, edges)
         
-        # 準備繪圖數據
+        # 所有邊合併為一條折線（以None分隔）
         edge_x = []
         edge_y = []
         
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
+        for source, target, _ in edges:
+            x0, y0 = pos[source]
+            x1, y1 = pos[target]
             edge_x.extend([x0, x1, None])
             edge_y.extend([y0, y1, None])
         
-        node_x = []
-        node_y = []
-        node_text = []
-        node_size = []
-        
-        for node in G.nodes():
-            x, y = pos[node]
-            node_x.append(x)
-            node_y.append(y)
-            node_text.append(words[node])
-            # 節點大小根據詞頻調整
-            size = 20 + (top_words[words[node]] / max(top_words.values())) * 30
-            node_size.append(size)
+        max_freq = max(top_words.values())
+        node_x = [pos[word][0] for word in words]
+        node_y = [pos[word][1] for word in words]
+        # 節點大小根據詞頻調整；節點很多時只標注高頻詞，其餘懸停顯示
+        node_size = [(20 if len(words) <= label_top_n else 8) + (top_words[word] / max_freq) * 30 for word in words]
+        node_text = [word if rank < label_top_n else '' for rank, word in enumerate(words)]
+        degree = Counter()
+        for source, target, _ in edges:
+            degree[source] += 1
+            degree[target] += 1
+        hover_text = [f"{word}<br>詞頻: {top_words[word]}<br>關聯詞數: {degree[word]}" for word in words]
         
         # 創建圖形
         fig = go.Figure()
@@ -467,6 +638,7 @@ class AdvancedVisualizer:
             x=node_x, y=node_y,
             mode='markers+text',
             hoverinfo='text',
+            hovertext=hover_text,
             text=node_text,
             textposition="middle center",
             marker=dict(
@@ -477,13 +649,14 @@ class AdvancedVisualizer:
             name='詞語節點'
         ))
         
+        edge_label = 'PMI' if method == 'pmi' else '共現次數'
         fig.update_layout(
             title=dict(text=title, font=dict(size=16)),
             showlegend=False,
             hovermode='closest',
             margin=dict(b=20,l=5,r=5,t=40),
             annotations=[ dict(
-                text="節點大小表示詞頻，邊表示詞語關聯",
+                text=f"節點大小表示詞頻，邊表示詞語共現（按{edge_label}篩選）",
                 showarrow=False,
                 xref="paper", yref="paper",
                 x=0.005, y=-0.002,
@@ -496,6 +669,23 @@ class AdvancedVisualizer:
         
         return fig
 
+    @staticmethod
+    def _cooccurrence_from_ngrams(word_freq, ngrams, top_n):
+        """從N-gram統計推導高頻詞之間的共現（用於沒有共現數據的舊分析結果）"""
+        counter = CooccurrenceCounter(window=2)
+        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:top_n]
+        for word, freq in top_words:
+            counter.word_counts[counter._word_id(word)] = freq
+        counter.total_tokens = sum(word_freq.values())
+        
+        # 每個N-gram只掃描一次，找出其中包含的高頻詞
+        for ngram, count in ngrams.items():
+            contained = sorted({counter.vocabulary[word] for word, _ in top_words if word in ngram})
+            for a in range(len(contained)):
+                for b in range(a + 1, len(contained)):
+                    counter.pair_counts[(contained[a], contained[b])] += count
+        return counter
+
     def plot_word_frequency_treemap(self, word_freq, title='詞頻樹狀圖', top_n=30):
         """繪製詞頻樹狀圖"""
         if not PLOTLY_AVAILABLE:
@@ -632,46 +822,54 @@ class AdvancedVisualizer:
         
         return fig
     
+    def write_figure_html(self, fig, output_path):
+        """將單個圖表寫入HTML文件（代替fig.write_html，不內嵌plotly.js）"""
+        self.create_dashboard_html({None: fig}, output_path, title=fig.layout.title.text or '交互式圖表')
+    
     def create_dashboard_html(self, figures, output_path, title="文本分析儀表板"):
-        """創建包含多個圖表的HTML儀表板"""
+        """創建包含多個圖表的HTML儀表板
+        
+        figures為 {標題: 圖表}，標題為None時不顯示小標題；圖表只序列化一次，
+        plotly.js從本地共享文件加載，不依賴CDN
+        """
         if not PLOTLY_AVAILABLE:
             raise ImportError("Plotly不可用，請安裝plotly")
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>{title}</title>
-            <script src="https://cdn.plot.ly/plotly-3.0.1.min.js"></script>
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .chart-container {{ margin: 20px 0; }}
-                h1 {{ text-align: center; color: #333; }}
-                h2 {{ color: #666; border-bottom: 2px solid #eee; padding-bottom: 10px; }}
-            </style>
-        </head>
-        <body>
-            <h1>{title}</h1>
-        """
+        title = html.escape(title)
+        parts = [f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <script src="{html.escape(_script_src(output_path))}"></script>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        .chart-container {{ margin: 20px 0; }}
+        h1 {{ text-align: center; color: #333; }}
+        h2 {{ color: #666; border-bottom: 2px solid #eee; padding-bottom: 10px; }}
+    </style>
+</head>
+<body>
+"""]
+        if list(figures) != [None]:
+            parts.append(f"    <h1>{title}</h1>\n")
         
         for i, (fig_title, fig) in enumerate(figures.items()):
             div_id = f"chart_{i}"
-            html_content += f"""
-            <div class="chart-container">
-                <h2>{fig_title}</h2>
-                <div id="{div_id}"></div>
-                <script>
-                    Plotly.newPlot('{div_id}', {fig.to_json()});
-                </script>
-            </div>
-            """
-        
-        html_content += """
-        </body>
-        </html>
-        """
+            heading = f"<h2>{html.escape(fig_title)}</h2>" if fig_title else ''
+            parts.append(f"""    <div class="chart-container">
+        {heading}
+        <div id="{div_id}"></div>
+        <script>
+            (function() {{
+                var spec = {figure_to_json(fig)};
+                Plotly.newPlot('{div_id}', spec.data, spec.layout, {{responsive: true}});
+            }})();
+        </script>
+    </div>
+""")
+        
+        parts.append("</body>\n</html>\n")
         
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        return output_path 
\ No newline at end of file
+            f.writelines(parts)
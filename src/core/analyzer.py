@@ -11,10 +11,14 @@ import multiprocessing as mp
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from src.utils.file_utils import FileUtils
+from src.core.cooccurrence import CooccurrenceCounter, DEFAULT_WINDOW
 
 class ChineseTextAnalyzer:
-    def __init__(self, custom_dict_path=None, stopwords_path=None):
+    def __init__(self, custom_dict_path=None, stopwords_path=None, cooccurrence_window=DEFAULT_WINDOW):
         """初始化分析器"""
+        # 詞語共現統計的窗口大小
+        self.cooccurrence_window = cooccurrence_window
+        
         # 設置資源文件的基礎路徑
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self.resources_path = os.path.join(project_root, 'config')
@@ -105,33 +109,93 @@ class ChineseTextAnalyzer:
         ]
         return filtered
     
-    def analyze_text(self, text):
-        """分析文本並返回統計結果"""
-        processed = self.preprocess_text(text)
+    def analyze_text(self, text, cooccurrence=False):
+        """分析文本並返回統計結果，cooccurrence見analyze_chunks"""
+        return self.analyze_chunks([text], cooccurrence)
+    
+    def analyze_chunks(self, chunks, cooccurrence=False):
+        """分塊分析文本並合併統計結果
         
+        chunks可以是生成器（例如逐頁產出的PDF文本），每塊處理完即可釋放，
+        無需將整個文檔載入內存；返回結構與analyze_text相同。
+        cooccurrence為True時同時按滑動窗口統計詞語共現（窗口不跨塊），結果在cooccurrence鍵中；
+        只有需要繪製詞語關聯網絡時才開啟，避免額外的統計開銷
+        """
         # 詞頻統計
-        word_freq = Counter([word for word, _ in processed])
+        word_freq = Counter()
         
         # 詞性統計
-        pos_freq = Counter([flag for _, flag in processed])
+        pos_freq = Counter()
         
         # 詞性-詞對應關係
         pos_word_mapping = {}
-        for word, pos in processed:
-            if pos not in pos_word_mapping:
-                pos_word_mapping[pos] = set()
-            pos_word_mapping[pos].add(word)
+        
+        total_words = 0
+        total_word_len = 0
+        
+        # 詞語共現（只保存出現過的詞對）
+        cooccurrence_counter = CooccurrenceCounter(self.cooccurrence_window) if cooccurrence else None
+        
+        for chunk in chunks:
+            if not chunk:
+                continue
+            processed = self.preprocess_text(chunk)
+            for word, pos in processed:
+                word_freq[word] += 1
+                pos_freq[pos] += 1
+                if pos not in pos_word_mapping:
+                    pos_word_mapping[pos] = set()
+                pos_word_mapping[pos].add(word)
+                total_word_len += len(word)
+            total_words += len(processed)
+            if cooccurrence_counter is not None:
+                cooccurrence_counter.update([word for word, _ in processed])
         
         # 計算平均詞長
-        avg_word_len = sum(len(word) for word, _ in processed) / len(processed) if processed else 0
+        avg_word_len = total_word_len / total_words if total_words else 0
         
-        return {
+        result = {
             'word_frequency': dict(word_freq.most_common()),
             'pos_frequency': dict(pos_freq.most_common()),
             'pos_word_mapping': {k: list(v) for k, v in pos_word_mapping.items()},
             'avg_word_length': round(avg_word_len, 2),
-            'total_words': len(processed)
+            'total_words': total_words
         }
+        if cooccurrence_counter is not None:
+            result['cooccurrence'] = cooccurrence_counter.to_dict()
+        return result
+    
+    def iter_analyze_records(self, records, include_sentiment=True):
+        """逐條分析記錄（例如iter_csv_records/iter_json_records的輸出），產出每條記錄的結果"""
+        for record in records:
+            text = record.get('text', '')
+            # 逐條結果不附帶共現統計，避免輸出膨脹
+            result = self.analyze_text(text, cooccurrence=False)
+            if include_sentiment:
+                result['sentiment'] = self.analyze_sentiment(text)
+            yield {'index': record.get('index'), 'text': text, 'result': result}
+    
+    def analyze_records(self, records, include_sentiment=True):
+        """流式分析記錄並返回匯總結果，另附記錄數和情感分布"""
+        sentiment_counts = Counter()
+        records_count = 0
+        
+        def texts():
+            nonlocal records_count
+            for record in records:
+                text = record.get('text', '')
+                if not text:
+                    continue
+                records_count += 1
+                if include_sentiment:
+                    sentiment_counts[self.analyze_sentiment(text)['sentiment_label']] += 1
+                yield text
+        
+        result = self.analyze_chunks(texts())
+        result['records_count'] = records_count
+        if include_sentiment:
+            result['sentiment_distribution'] = dict(sentiment_counts)
+        return result
     
     def analyze_files(self, file_paths):
         """批量分析多個文件"""
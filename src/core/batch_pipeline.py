@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Batch Analysis Pipeline
+批量分析流水線：每個文件的解析、分析、導出和圖表生成全部在工作進程中完成，父進程只匯總結果
+"""
+
+import os
+import sys
+import time
+import queue
+import multiprocessing as mp
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.core.analyzer import ChineseTextAnalyzer
+from src.utils.file_utils import FileUtils
+from src.utils.file_parsers import ExtendedFileParser
+from src.core.render_scheduler import ChartJob, RenderScheduler
+from src.utils.columnar_export import COLUMNAR_FORMATS, TABLES_DIRNAME, ColumnarWriter, document_tables
+
+# 每個工作進程的最大在途文件數
+MAX_IN_FLIGHT_PER_PROCESS = 2
+
+
+@dataclass
+class BatchOptions:
+    output_dir: str = 'results'
+    export_formats: List[str] = field(default_factory=lambda: ['json'])
+    visualize: bool = True
+    advanced_viz: Optional[List[str]] = None
+    font_path: Optional[str] = None
+    dpi: int = 300
+    # 圖表輸出配置（preview、web、print、svg），指定時覆蓋dpi並決定圖片格式
+    profile: Optional[str] = None
+    custom_dict_path: Optional[str] = None
+    stopwords_path: Optional[str] = None
+    # 批量輸入的根目錄，用於保留相對目錄結構
+    input_root: Optional[str] = None
+
+
+def output_names(file_path: str, input_root: Optional[str] = None):
+    """返回 (相對輸出路徑, 圖表文件前綴)
+
+    保留相對目錄結構，避免不同目錄中的同名文件互相覆蓋
+    """
+    if input_root:
+        relative_name = os.path.splitext(os.path.relpath(file_path, input_root))[0]
+    else:
+        relative_name = os.path.splitext(os.path.basename(file_path))[0]
+    return relative_name, relative_name.replace(os.sep, '_')
+
+
+def columnar_formats(options: BatchOptions) -> List[str]:
+    """要寫入語料庫級列式表的導出格式"""
+    return [fmt for fmt in (fmt.lower() for fmt in options.export_formats) if fmt in COLUMNAR_FORMATS]
+
+
+def file_formats(options: BatchOptions) -> List[str]:
+    """每個文件單獨導出的格式"""
+    return [fmt for fmt in options.export_formats if fmt.lower() not in COLUMNAR_FORMATS]
+
+
+def analyze_document(analyzer: ChineseTextAnalyzer, text: str) -> Dict[str, Any]:
+    """對文本進行完整分析（基礎統計和全部高級分析）"""
+    results = analyzer.analyze_text(text)
+
+    # 文本字符統計信息
+    total_chars = len(text)
+    chinese_chars = analyzer.count_chinese_characters(text)
+    results['total_characters'] = total_chars
+    results['chinese_characters'] = chinese_chars
+    results['chinese_character_ratio'] = round(chinese_chars / total_chars * 100, 2) if total_chars else 0
+
+    # 高級分析
+    results['sentiment'] = analyzer.analyze_sentiment(text)
+    results['keywords'] = analyzer.keyword_extraction(text)
+    results['entities'] = analyzer.extract_entities(text)
+    results['ngrams'] = analyzer.extract_ngrams(text)
+    results['summary'] = analyzer.generate_summary(text)
+    return results
+
+
+def render_charts(results: Dict[str, Any], options: BatchOptions, base_name: str,
+                  scheduler: RenderScheduler) -> Dict[str, str]:
+    """提交可視化報告和進階詞頻圖表的渲染任務，返回 {圖表鍵: 保存路徑}"""
+    # 延遲導入：不生成圖表時無需加載matplotlib
+    from src.core.visualization import Visualizer, resolve_render_profile
+
+    dpi, file_format = resolve_render_profile(options.profile, options.dpi)
+    viz_folder = os.path.join(options.output_dir, 'visualizations')
+    jobs = Visualizer.report_chart_jobs(
+        results,
+        output_dir=viz_folder,
+        prefix=base_name,
+        font_path=options.font_path,
+        dpi=options.dpi,
+        include_advanced=False,
+        profile=options.profile
+    )
+
+    # 進階詞頻可視化
+    if options.advanced_viz and 'word_frequency' in results:
+        advanced_viz_folder = os.path.join(viz_folder, 'advanced')
+
+        # 詞頻統計餅圖
+        if 'pie' in options.advanced_viz:
+            jobs.append(ChartJob('advanced_pie', 'plot_advanced_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'top_n': 15,
+                'title': '詞頻分布餅圖',
+                'save_path': os.path.join(advanced_viz_folder, f"{base_name}_word_freq_pie.{file_format}"),
+                'plot_type': 'pie',
+                'dpi': dpi
+            }))
+
+        # 詞頻垂直條形圖
+        if 'vertical' in options.advanced_viz:
+            jobs.append(ChartJob('advanced_vertical', 'plot_advanced_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'title': '詞頻垂直條形圖',
+                'save_path': os.path.join(advanced_viz_folder, f"{base_name}_word_freq_vertical.{file_format}"),
+                'plot_type': 'vertical',
+                'color_map': 'plasma',
+                'dpi': dpi
+            }))
+
+        # 按詞長度排序的詞頻圖
+        if 'length' in options.advanced_viz:
+            jobs.append(ChartJob('advanced_length', 'plot_advanced_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'title': '按詞長度排序的詞頻圖',
+                'save_path': os.path.join(advanced_viz_folder, f"{base_name}_word_by_length.{file_format}"),
+                'sort_by': 'length',
+                'color_map': 'magma',
+                'dpi': dpi
+            }))
+
+    return scheduler.submit(jobs)
+
+
+def process_file(analyzer: ChineseTextAnalyzer, parser: ExtendedFileParser, file_path: str,
+                 options: BatchOptions, scheduler: Optional[RenderScheduler] = None) -> Dict[str, Any]:
+    """處理單個文件：解析、分析、導出、生成圖表
+
+    提供scheduler時圖表提交到其進程池異步渲染；否則在當前進程中渲染，耗時記錄在摘要的chart_timings中。
+    返回精簡的摘要（不含完整分析結果），供父進程顯示進度和更新清單
+    """
+    start = time.time()
+    relative_name, base_name = output_names(file_path, options.input_root)
+    output_path = os.path.join(options.output_dir, relative_name)
+    summary = {'file_path': file_path, 'output_path': output_path}
+
+    try:
+        # 文件只讀取和解析一次
+        text = parser.parse_file(file_path)['content']
+        results = analyze_document(analyzer, text)
+
+        FileUtils.export_results(results, output_path, file_formats(options))
+        if columnar_formats(options):
+            # 列式表由父進程統一追加寫入，工作進程只返回本文檔的列數據
+            summary['tables'] = document_tables(relative_name, results, file_path)
+
+        if options.visualize:
+            if scheduler is not None:
+                summary['charts'] = render_charts(results, options, base_name, scheduler)
+            else:
+                local_scheduler = RenderScheduler(processes=1)
+                summary['charts'] = render_charts(results, options, base_name, local_scheduler)
+                summary['chart_timings'] = local_scheduler.stats.records()
+
+        summary.update({
+            'total_words': results['total_words'],
+            'word_frequency': results['word_frequency'],
+            'total_characters': results['total_characters'],
+            'chinese_characters': results['chinese_characters'],
+            'chinese_character_ratio': results['chinese_character_ratio']
+        })
+    except Exception as e:
+        summary['error'] = str(e)
+
+    summary['elapsed'] = round(time.time() - start, 3)
+    return summary
+
+
+# 工作進程中的分析器和解析器，由進程池初始化函數創建一次
+_worker_state = {}
+
+
+def _init_worker(options: BatchOptions):
+    """工作進程初始化：載入詞典和停用詞，只執行一次"""
+    _worker_state['options'] = options
+    _worker_state['analyzer'] = ChineseTextAnalyzer(
+        custom_dict_path=options.custom_dict_path,
+        stopwords_path=options.stopwords_path
+    )
+    _worker_state['parser'] = ExtendedFileParser(verbose=False)
+
+
+def _process_in_worker(file_path: str) -> Dict[str, Any]:
+    return process_file(_worker_state['analyzer'], _worker_state['parser'], file_path,
+                        _worker_state['options'])
+
+
+def run_batch(file_paths: Iterable[str], options: BatchOptions, processes: Optional[int] = 1,
+              analyzer: Optional[ChineseTextAnalyzer] = None,
+              scheduler: Optional[RenderScheduler] = None) -> Iterator[Dict[str, Any]]:
+    """批量處理文件，按完成順序產出每個文件的摘要
+
+    Args:
+        file_paths: 文件路徑（可以是生成器，邊遍歷邊處理）
+        processes: 工作進程數，1表示在當前進程串行處理，None表示使用全部CPU核心
+        analyzer: 串行處理時使用的分析器（避免重新載入詞典）
+        scheduler: 串行處理時的圖表渲染調度器，分析下一個文件的同時並行渲染本文件的圖表；
+            多進程處理時圖表在各工作進程中渲染，不使用調度器
+    """
+    os.makedirs(options.output_dir, exist_ok=True)
+
+    # 每個列式格式一個寫入器，按完成順序逐文件追加
+    writers = []
+    for fmt in columnar_formats(options):
+        try:
+            writers.append(ColumnarWriter(options.output_dir, fmt))
+        except ImportError as e:
+            print(e)
+
+    def collect(summary):
+        tables = summary.pop('tables', None)
+        if tables:
+            for writer in writers:
+                writer.add_tables(tables)
+        return summary
+
+    try:
+        yield from (collect(summary) for summary in
+                    _run_batch(file_paths, options, processes, analyzer, scheduler))
+    finally:
+        for writer in writers:
+            paths = writer.close()
+            if paths:
+                print(f"已導出{writer.fmt}列式表 ({writer.documents} 個文檔): "
+                      f"{os.path.join(options.output_dir, TABLES_DIRNAME)}")
+
+
+def _run_batch(file_paths: Iterable[str], options: BatchOptions, processes: Optional[int],
+               analyzer: Optional[ChineseTextAnalyzer],
+               scheduler: Optional[RenderScheduler]) -> Iterator[Dict[str, Any]]:
+    if processes == 1:
+        analyzer = analyzer or ChineseTextAnalyzer(
+            custom_dict_path=options.custom_dict_path,
+            stopwords_path=options.stopwords_path
+        )
+        parser = ExtendedFileParser(verbose=False)
+        for file_path in file_paths:
+            yield process_file(analyzer, parser, file_path, options, scheduler)
+        return
+
+    processes = processes or mp.cpu_count()
+    done = queue.Queue()
+    with mp.Pool(processes=processes, initializer=_init_worker, initargs=(options,)) as pool:
+        # 在調用方線程中遍歷文件並逐個提交（文件迭代器可能依賴只能在當前線程使用的資源，如增量清單），
+        # 在途任務數有上限，不會一次性展開整個目錄；每個文件獨立分派，慢文件不會拖住其他文件
+        in_flight = 0
+        for file_path in file_paths:
+            pool.apply_async(
+                _process_in_worker, (file_path,),
+                callback=done.put,
+                error_callback=lambda e, path=file_path: done.put(
+                    {'file_path': path, 'output_path': None, 'error': str(e), 'elapsed': 0})
+            )
+            in_flight += 1
+            if in_flight >= processes * MAX_IN_FLIGHT_PER_PROCESS:
+                yield done.get()
+                in_flight -= 1
+
+        for _ in range(in_flight):
+            yield done.get()
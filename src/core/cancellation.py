@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Cooperative Cancellation
+協作式任務取消與時間預算：在分析循環的安全點檢查，及時停止並釋放CPU
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TaskCancelledError(Exception):
+    """任務已被取消"""
+
+
+class TaskTimeoutError(Exception):
+    """任務超出時間預算"""
+
+
+class CancellationToken:
+    """取消令牌
+
+    Args:
+        time_budget: 時間預算（秒），None表示不限時
+        external_check: 可選的外部取消檢查函數（例如查詢Redis取消標記），
+            用於跨進程取消；按poll_interval節流調用
+        poll_interval: 外部檢查的最小間隔（秒）
+    """
+
+    def __init__(self, time_budget: Optional[float] = None,
+                 external_check: Optional[Callable[[], bool]] = None,
+                 poll_interval: float = 0.5):
+        self._event = threading.Event()
+        self.time_budget = time_budget
+        self.deadline = time.monotonic() + time_budget if time_budget else None
+        self._external_check = external_check
+        self._poll_interval = poll_interval
+        self._last_poll = 0.0
+
+    def cancel(self):
+        """標記為已取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消（包括外部取消標記）"""
+        if self._event.is_set():
+            return True
+
+        if self._external_check is not None:
+            now = time.monotonic()
+            if now - self._last_poll >= self._poll_interval:
+                self._last_poll = now
+                try:
+                    if self._external_check():
+                        self._event.set()
+                except Exception as e:
+                    print(f"檢查取消標記失敗: {e}")
+
+        return self._event.is_set()
+
+    @property
+    def expired(self) -> bool:
+        """是否超出時間預算"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """剩餘時間（秒）"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """在安全點調用：已取消或超時則拋出異常"""
+        if self.cancelled:
+            raise TaskCancelledError("任務已被取消")
+        if self.expired:
+            raise TaskTimeoutError(f"任務超出時間預算 ({self.time_budget} 秒)")
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Word Co-occurrence
+詞語共現統計：分析時按滑動窗口累計詞對共現次數（稀疏存儲），按PMI或次數篩選網絡邊，
+並提供確定性、帶緩存的網絡佈局，供詞語關聯網絡圖等功能復用
+"""
+
+import math
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    import networkx as nx
+    NETWORKX_AVAILABLE = True
+except ImportError:
+    NETWORKX_AVAILABLE = False
+
+# 默認共現窗口：一個詞與其後4個詞構成詞對
+DEFAULT_WINDOW = 5
+
+# 導出到分析結果中的最大詞彙數（按詞頻取前N個詞之間的共現）
+EXPORT_VOCABULARY_SIZE = 200
+
+# networkx對更多節點的力導向佈局依賴scipy稀疏矩陣，沒有scipy時超出部分使用圓形佈局
+DENSE_SPRING_LAYOUT_MAX_NODES = 500
+
+# 佈局緩存的最大條目數
+LAYOUT_CACHE_SIZE = 128
+LAYOUT_SEED = 42
+
+_layout_cache = OrderedDict()
+
+
+class CooccurrenceCounter:
+    """滑動窗口詞語共現計數器
+
+    詞語映射為整數ID，詞對 (i, j)（i < j）的共現次數以字典形式稀疏存儲；
+    同一窗口內重複出現的詞對只計一次
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        if window < 2:
+            raise ValueError("共現窗口至少為2")
+        self.window = window
+        self.vocabulary = {}
+        self.words = []
+        self.word_counts = Counter()
+        self.pair_counts = Counter()
+        self.total_tokens = 0
+        # 從導出數據恢復時的原始總詞對數
+        self._total_pairs = None
+
+    def _word_id(self, word: str) -> int:
+        word_id = self.vocabulary.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.vocabulary[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def update(self, tokens: Sequence[str]):
+        """累計一段文本（已分詞、已過濾停用詞）的共現；窗口不跨越段落"""
+        ids = [self._word_id(token) for token in tokens]
+        self.word_counts.update(ids)
+        self.total_tokens += len(ids)
+
+        span = self.window - 1
+        pair_counts = self.pair_counts
+        for position, word_id in enumerate(ids):
+            seen = set()
+            for other in ids[position + 1:position + 1 + span]:
+                if other == word_id or other in seen:
+                    continue
+                seen.add(other)
+                pair_counts[(word_id, other) if word_id < other else (other, word_id)] += 1
+
+    @property
+    def total_pairs(self) -> int:
+        if self._total_pairs:
+            return self._total_pairs
+        return sum(self.pair_counts.values())
+
+    def count(self, word1: str, word2: str) -> int:
+        """兩個詞的共現次數"""
+        i, j = self.vocabulary.get(word1), self.vocabulary.get(word2)
+        if i is None or j is None or i == j:
+            return 0
+        return self.pair_counts.get((i, j) if i < j else (j, i), 0)
+
+    def pmi(self, word1: str, word2: str) -> float:
+        """點互信息 log(P(w1,w2) / (P(w1)P(w2)))，未共現時返回 -inf"""
+        i, j = self.vocabulary.get(word1), self.vocabulary.get(word2)
+        if i is None or j is None:
+            return float('-inf')
+        return self._pmi(i, j, self.count(word1, word2), self.total_pairs)
+
+    def _pmi(self, i: int, j: int, pair_count: int, total_pairs: int) -> float:
+        if not pair_count or not total_pairs:
+            return float('-inf')
+        p_pair = pair_count / total_pairs
+        p_i = self.word_counts[i] / self.total_tokens
+        p_j = self.word_counts[j] / self.total_tokens
+        return math.log(p_pair / (p_i * p_j))
+
+    def to_sparse_matrix(self):
+        """返回對稱的scipy.sparse CSR共現矩陣（行列順序與words一致）"""
+        if not SCIPY_AVAILABLE:
+            raise ImportError("需要安裝scipy才能導出稀疏矩陣")
+        size = len(self.words)
+        if not self.pair_counts:
+            return sparse.csr_matrix((size, size), dtype=np.int64)
+        rows, cols = zip(*self.pair_counts.keys())
+        counts = list(self.pair_counts.values())
+        matrix = sparse.coo_matrix((counts, (rows, cols)), shape=(size, size), dtype=np.int64)
+        return (matrix + matrix.T).tocsr()
+
+    def top_words(self, top_n: int) -> List[str]:
+        """按詞頻排序的前N個詞"""
+        return [self.words[word_id] for word_id, _ in self.word_counts.most_common(top_n)]
+
+    def select_edges(self, words: Optional[Iterable[str]] = None, method: str = 'pmi', min_count: int = 2,
+                     min_pmi: float = 0.0, max_edges: Optional[int] = None) -> List[Tuple[str, str, float]]:
+        """篩選網絡邊，返回按權重降序的 [(詞1, 詞2, 權重)]
+
+        Args:
+            words: 只在這些詞之間選邊，None表示全部詞
+            method: 'pmi' 以點互信息為權重並過濾低於min_pmi的邊；'count' 以共現次數為權重
+            min_count: 最少共現次數（過濾偶然共現，PMI對低頻詞對偏高）
+            max_edges: 最多保留的邊數
+        """
+        if method not in ('pmi', 'count'):
+            raise ValueError(f"不支持的邊篩選方法: {method}")
+
+        allowed = None
+        if words is not None:
+            allowed = {self.vocabulary[word] for word in words if word in self.vocabulary}
+
+        total_pairs = self.total_pairs
+        edges = []
+        for (i, j), pair_count in self.pair_counts.items():
+            if pair_count < min_count:
+                continue
+            if allowed is not None and (i not in allowed or j not in allowed):
+                continue
+            if method == 'pmi':
+                weight = self._pmi(i, j, pair_count, total_pairs)
+                if weight < min_pmi:
+                    continue
+            else:
+                weight = pair_count
+            edges.append((self.words[i], self.words[j], weight))
+
+        # 權重相同時按詞語排序，保證結果確定
+        edges.sort(key=lambda edge: (-edge[2], edge[0], edge[1]))
+        return edges[:max_edges] if max_edges else edges
+
+    def to_dict(self, vocabulary_size: int = EXPORT_VOCABULARY_SIZE) -> Dict:
+        """導出為可JSON序列化的字典，只保留高頻詞之間的共現"""
+        top_ids = [word_id for word_id, _ in self.word_counts.most_common(vocabulary_size)]
+        index = {word_id: position for position, word_id in enumerate(top_ids)}
+        pairs = []
+        for (i, j), pair_count in self.pair_counts.items():
+            if i in index and j in index:
+                a, b = sorted((index[i], index[j]))
+                pairs.append([a, b, pair_count])
+        pairs.sort()
+        return {
+            'window': self.window,
+            'total_tokens': self.total_tokens,
+            'total_pairs': self.total_pairs,
+            'words': [self.words[word_id] for word_id in top_ids],
+            'word_counts': [self.word_counts[word_id] for word_id in top_ids],
+            'pairs': pairs
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CooccurrenceCounter':
+        """從to_dict的輸出恢復（只包含導出的詞彙）"""
+        counter = cls(window=data.get('window', DEFAULT_WINDOW))
+        for word, word_count in zip(data.get('words', []), data.get('word_counts', [])):
+            counter.word_counts[counter._word_id(word)] = word_count
+        for i, j, pair_count in data.get('pairs', []):
+            counter.pair_counts[(i, j)] = pair_count
+        counter.total_tokens = data.get('total_tokens', sum(counter.word_counts.values()))
+        # 保留原始總詞對數，使PMI與完整統計一致
+        counter._total_pairs = data.get('total_pairs')
+        return counter
+
+
+def network_layout(nodes: Sequence[str], edges: Sequence[Tuple[str, str, float]],
+                   iterations: int = 50) -> Dict[str, Tuple[float, float]]:
+    """計算網絡佈局，返回 {節點: (x, y)}
+
+    以圓形佈局為初始位置、固定隨機種子，相同的節點和邊總是得到相同的佈局；
+    結果按節點和邊的哈希緩存，重複請求（例如同一結果的多個視圖）無需重新計算
+    """
+    digest = hashlib.sha1()
+    for node in nodes:
+        digest.update(node.encode('utf-8') + b'\0')
+    digest.update(b'\1')
+    for source, target, weight in edges:
+        digest.update(f"{source}\0{target}\0{weight:.6g}\0".encode('utf-8'))
+    key = (digest.hexdigest(), iterations)
+
+    cached = _layout_cache.get(key)
+    if cached is not None:
+        _layout_cache.move_to_end(key)
+        return cached
+
+    count = len(nodes)
+    angles = np.linspace(0, 2 * np.pi, count, endpoint=False) if count else np.array([])
+    initial = {node: (float(np.cos(angle)), float(np.sin(angle))) for node, angle in zip(nodes, angles)}
+
+    if NETWORKX_AVAILABLE and edges and count > 2 and (SCIPY_AVAILABLE or count <= DENSE_SPRING_LAYOUT_MAX_NODES):
+        graph = nx.Graph()
+        graph.add_nodes_from(nodes)
+        # PMI可能為負或接近0，佈局使用正的吸引權重
+        min_weight = min(weight for _, _, weight in edges)
+        offset = 1 - min_weight if min_weight <= 0 else 0
+        graph.add_weighted_edges_from((source, target, weight + offset) for source, target, weight in edges)
+        positions = nx.spring_layout(graph, pos=initial, k=2 / math.sqrt(count), iterations=iterations,
+                                     weight='weight', seed=LAYOUT_SEED)
+        layout = {node: (float(x), float(y)) for node, (x, y) in positions.items()}
+    else:
+        layout = initial
+
+    _layout_cache[key] = layout
+    if len(_layout_cache) > LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+    return layout
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Render Scheduler
+圖表渲染調度：在Agg後端的進程池中並行渲染同一報告的多個圖表以及多個文件的報告，
+工作進程預先完成字體和樣式配置，並記錄每個圖表的渲染耗時
+"""
+
+import io
+import os
+import sys
+import time
+import multiprocessing as mp
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# 每個渲染進程的最大在途圖表數，超出時先等待最早提交的圖表完成
+MAX_PENDING_PER_PROCESS = 8
+
+# 等待圖表完成時檢查取消的間隔（秒）
+CANCEL_POLL_INTERVAL = 0.2
+
+
+@dataclass
+class ChartJob:
+    """單個圖表的渲染任務：Visualizer靜態方法名和參數"""
+    key: str
+    method: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def save_path(self) -> Optional[str]:
+        return self.kwargs.get('save_path')
+
+
+def render_chart(job: ChartJob) -> Tuple[str, Optional[str], float, int, Optional[str]]:
+    """渲染單個圖表，返回 (圖表鍵, 保存路徑, 耗時秒數, 文件字節數, 錯誤信息)"""
+    from src.core.visualization import Visualizer
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    error = None
+    size = 0
+    try:
+        if job.save_path:
+            os.makedirs(os.path.dirname(os.path.abspath(job.save_path)), exist_ok=True)
+        # generate_wordcloud失敗時返回False而不拋出異常
+        if getattr(Visualizer, job.method)(**job.kwargs) is False:
+            error = '圖表生成失敗'
+        elif job.save_path and os.path.exists(job.save_path):
+            size = os.path.getsize(job.save_path)
+    except Exception as e:
+        error = str(e)
+    finally:
+        # 圖表方法出錯時可能留下未關閉的圖形
+        plt.close('all')
+    return job.key, job.save_path, time.perf_counter() - start, size, error
+
+
+def _init_render_worker(font_path: Optional[str] = None):
+    """渲染進程初始化：選擇Agg後端、載入字體和樣式，並渲染一個小圖預熱字體緩存"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    # 導入時完成中文字體和顏色配置
+    from src.core.visualization import DEFAULT_CHINESE_FONT
+
+    try:
+        fig = plt.figure(figsize=(2, 1))
+        plt.bar(['預熱'], [1])
+        plt.title('圖表預熱')
+        fig.savefig(io.BytesIO(), format='png')
+        plt.close(fig)
+
+        from wordcloud import WordCloud
+        font_path = font_path if font_path and os.path.exists(font_path) else DEFAULT_CHINESE_FONT
+        wc_kwargs = {'width': 64, 'height': 64}
+        if font_path:
+            wc_kwargs['font_path'] = font_path
+        WordCloud(**wc_kwargs).generate_from_frequencies({'預熱': 1})
+    except Exception as e:
+        print(f"渲染進程預熱失敗: {e}")
+
+
+class RenderStats:
+    """按圖表類型匯總渲染耗時和文件大小"""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.sizes = defaultdict(list)
+        self.errors = []
+
+    def add(self, key: str, seconds: float, size: int = 0, error: Optional[str] = None,
+            save_path: Optional[str] = None):
+        self.timings[key].append(seconds)
+        self.sizes[key].append(size)
+        if error:
+            self.errors.append((key, save_path, error))
+
+    def records(self) -> List[Tuple[str, float, int]]:
+        """導出 (圖表鍵, 耗時, 字節數) 記錄，用於跨進程匯總"""
+        return [(key, seconds, size) for key in self.timings
+                for seconds, size in zip(self.timings[key], self.sizes[key])]
+
+    def merge(self, records: Iterable[Tuple[str, float, int]]):
+        """合併其他進程返回的 (圖表鍵, 耗時, 字節數) 記錄"""
+        for key, seconds, size in records:
+            self.timings[key].append(seconds)
+            self.sizes[key].append(size)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            key: {
+                'count': len(values),
+                'total': round(sum(values), 3),
+                'mean': round(sum(values) / len(values), 3),
+                'max': round(max(values), 3),
+                'bytes': sum(self.sizes[key])
+            }
+            for key, values in self.timings.items() if values
+        }
+
+    def format(self) -> str:
+        """格式化為按總耗時排序的表格"""
+        rows = sorted(self.summary().items(), key=lambda item: item[1]['total'], reverse=True)
+        if not rows:
+            return "未渲染任何圖表"
+        lines = [f"{'圖表':<20}{'數量':>6}{'總耗時(秒)':>12}{'平均(秒)':>10}{'最長(秒)':>10}{'總大小(KB)':>12}"]
+        for key, stat in rows:
+            lines.append(f"{key:<20}{stat['count']:>6}{stat['total']:>12.2f}{stat['mean']:>10.3f}"
+                         f"{stat['max']:>10.3f}{stat['bytes'] / 1024:>12.1f}")
+        if self.errors:
+            lines.append(f"失敗的圖表: {len(self.errors)} 個")
+        return '\n'.join(lines)
+
+
+class RenderScheduler:
+    """圖表渲染調度器
+
+    Args:
+        processes: 渲染進程數，1表示在當前進程中直接渲染，None表示使用全部CPU核心
+        font_path: 預熱渲染進程時使用的中文字體
+    """
+
+    def __init__(self, processes: Optional[int] = None, font_path: Optional[str] = None):
+        self.processes = processes or mp.cpu_count()
+        self.font_path = font_path
+        self.stats = RenderStats()
+        self._pool = None
+        self._pending = []
+        # 自上次join以來在當前進程中直接渲染完成的圖表
+        self._completed = {}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = mp.Pool(processes=self.processes, initializer=_init_render_worker,
+                                 initargs=(self.font_path,))
+        return self._pool
+
+    def submit(self, jobs: List[ChartJob]) -> Dict[str, str]:
+        """提交圖表，不等待渲染完成，返回 {圖表鍵: 保存路徑}
+
+        用於批量處理：下一個文件的分析與本文件的圖表渲染同時進行
+        """
+        if self.processes == 1:
+            paths = self.render(jobs)
+            self._completed.update(paths)
+            return paths
+
+        pool = self._get_pool()
+        for job in jobs:
+            self._pending.append((job, pool.apply_async(render_chart, (job,))))
+        # 限制在途圖表數，避免大批量時積壓過多的圖表數據
+        while len(self._pending) > self.processes * MAX_PENDING_PER_PROCESS:
+            self._collect([self._pending.pop(0)])
+        return {job.key: job.save_path for job in jobs}
+
+    def render(self, jobs: List[ChartJob], cancel_token=None) -> Dict[str, str]:
+        """並行渲染圖表並等待完成，返回成功生成的 {圖表鍵: 保存路徑}
+
+        提供cancel_token時，提交每個圖表前和等待期間檢查取消和時間預算
+        """
+        if self.processes == 1:
+            results = []
+            for job in jobs:
+                if cancel_token:
+                    cancel_token.check()
+                results.append(render_chart(job))
+            return self._record(results)
+
+        pool = self._get_pool()
+        entries = []
+        for job in jobs:
+            if cancel_token:
+                cancel_token.check()
+            entries.append((job, pool.apply_async(render_chart, (job,))))
+        return self._collect(entries, cancel_token)
+
+    def join(self) -> Dict[str, str]:
+        """等待所有已提交的圖表完成，返回自上次join以來成功生成的 {圖表鍵: 保存路徑}"""
+        entries, self._pending = self._pending, []
+        paths, self._completed = self._completed, {}
+        paths.update(self._collect(entries))
+        return paths
+
+    def close(self):
+        """等待未完成的圖表並關閉進程池"""
+        self.join()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        return False
+
+    def _collect(self, entries, cancel_token=None) -> Dict[str, str]:
+        results = []
+        for job, async_result in entries:
+            while not async_result.ready():
+                if cancel_token:
+                    cancel_token.check()
+                async_result.wait(CANCEL_POLL_INTERVAL)
+            try:
+                results.append(async_result.get())
+            except Exception as e:
+                results.append((job.key, job.save_path, 0.0, 0, str(e)))
+        return self._record(results)
+
+    def _record(self, results) -> Dict[str, str]:
+        paths = {}
+        for key, save_path, seconds, size, error in results:
+            self.stats.add(key, seconds, size, error, save_path)
+            if error:
+                print(f"生成圖表 {key} 失敗: {error}")
+            else:
+                paths[key] = save_path
+        return paths
@@ -111,7 +111,7 @@ class TextSimilarityAnalyzer:
             print(f"語義相似度計算錯誤: {e}")
             return self.cosine_similarity_tfidf(texts)
     
-    def edit_distance_similarity(self, text1, text2):
+    def edit_distance_similarity(self, text1, text2, cancel_token=None):
         """計算編輯距離相似度（字符級別）"""
         def levenshtein_distance(s1, s2):
             if len(s1) < len(s2):
@@ -122,6 +122,9 @@ class TextSimilarityAnalyzer:
             
             previous_row = list(range(len(s2) + 1))
             for i, c1 in enumerate(s1):
+                # 長文本的編輯距離耗時較長，定期檢查取消
+                if cancel_token and i % 256 == 0:
+                    cancel_token.check()
                 current_row = [i + 1]
                 for j, c2 in enumerate(s2):
                     insertions = previous_row[j + 1] + 1
@@ -152,13 +155,14 @@ class TextSimilarityAnalyzer:
             return 0.0
         return (2 * overlap) / total
     
-    def comprehensive_similarity_analysis(self, texts, labels=None):
+    def comprehensive_similarity_analysis(self, texts, labels=None, cancel_token=None):
         """
         綜合相似度分析
         
         Args:
             texts (list): 文本列表
             labels (list): 文本標籤列表（可選）
+            cancel_token (CancellationToken): 取消令牌（可選），在每對文本之間檢查
             
         Returns:
             dict: 包含各種相似度指標的結果
@@ -176,6 +180,9 @@ class TextSimilarityAnalyzer:
         tfidf_sim = self.cosine_similarity_tfidf(texts)
         results['similarities']['tfidf_cosine'] = tfidf_sim.tolist()
         
+        if cancel_token:
+            cancel_token.check()
+        
         # 語義相似度
         semantic_sim = self.semantic_similarity(texts)
         results['similarities']['semantic'] = semantic_sim.tolist()
@@ -184,13 +191,16 @@ class TextSimilarityAnalyzer:
         pairwise_results = []
         for i in range(len(texts)):
             for j in range(i + 1, len(texts)):
+                if cancel_token:
+                    cancel_token.check()
+                
                 pair_result = {
                     'text1_index': i,
                     'text2_index': j,
                     'text1_label': labels[i],
                     'text2_label': labels[j],
                     'jaccard_similarity': self.jaccard_similarity(texts[i], texts[j]),
-                    'edit_distance_similarity': self.edit_distance_similarity(texts[i], texts[j]),
+                    'edit_distance_similarity': self.edit_distance_similarity(texts[i], texts[j], cancel_token),
                     'word_overlap_similarity': self.word_overlap_similarity(texts[i], texts[j]),
                     'tfidf_cosine_similarity': tfidf_sim[i][j],
                     'semantic_similarity': semantic_sim[i][j]
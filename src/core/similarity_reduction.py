@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Similarity Matrix Reduction
+大規模相似度矩陣的可視化預處理：向量化選取top-k近鄰稀疏邊、聚類重排與分塊聚合降採樣、
+以及基於矩陣本身的二維嵌入佈局，使熱力圖和網絡圖在數千個文本時仍可繪製
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy.cluster.hierarchy import linkage, leaves_list
+    from scipy.spatial.distance import squareform
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# 嵌入和重排使用的子空間迭代次數
+SUBSPACE_ITERATIONS = 30
+EMBEDDING_SEED = 42
+
+
+def similarity_edges(matrix, threshold: float = 0.5,
+                     top_k: Optional[int] = None) -> List[Tuple[int, int, float]]:
+    """選取相似度超過閾值的邊，返回按 (i, j) 排序的 [(i, j, 相似度)]，i < j
+
+    指定top_k時每個文本只保留最相似的k個鄰居（任一端入選即保留），邊數為O(n·k)而非O(n²)
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    if n < 2:
+        return []
+
+    if top_k and top_k < n - 1:
+        # 排除自身後按行取前k個鄰居
+        scores = matrix.copy()
+        np.fill_diagonal(scores, -np.inf)
+        neighbours = np.argpartition(-scores, top_k, axis=1)[:, :top_k]
+        rows = np.repeat(np.arange(n), top_k)
+        cols = neighbours.ravel()
+        keep = scores[rows, cols] > threshold
+        rows, cols = rows[keep], cols[keep]
+        pairs = np.unique(np.stack([np.minimum(rows, cols), np.maximum(rows, cols)], axis=1), axis=0)
+        if not len(pairs):
+            return []
+        rows, cols = pairs[:, 0], pairs[:, 1]
+    else:
+        rows, cols = np.nonzero(np.triu(matrix > threshold, k=1))
+
+    return [(int(i), int(j), float(matrix[i, j])) for i, j in zip(rows, cols)]
+
+
+def _top_eigenvectors(matrix, components: int):
+    """用子空間迭代求對稱矩陣的前幾個特徵向量（只需矩陣乘法，適用於大矩陣）"""
+    rng = np.random.default_rng(EMBEDDING_SEED)
+    basis = rng.standard_normal((len(matrix), components))
+    for _ in range(SUBSPACE_ITERATIONS):
+        basis, _ = np.linalg.qr(matrix @ basis)
+    # 固定符號，保證結果確定
+    signs = np.sign(basis[np.abs(basis).argmax(axis=0), np.arange(components)])
+    return basis * np.where(signs == 0, 1, signs)
+
+
+def similarity_embedding(matrix, components: int = 2) -> np.ndarray:
+    """將相似度矩陣嵌入到低維空間（雙中心化後的主成分，即經典MDS），返回 n×components 坐標"""
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    if n <= components:
+        return np.eye(n, components)
+    centered = matrix - matrix.mean(axis=0) - matrix.mean(axis=1)[:, None] + matrix.mean()
+    coordinates = _top_eigenvectors(centered, components)
+    # 縮放到[-1, 1]
+    span = np.abs(coordinates).max(axis=0)
+    return coordinates / np.where(span == 0, 1, span)
+
+
+def cluster_order(matrix) -> np.ndarray:
+    """返回使相似文本相鄰的行列順序
+
+    scipy可用時使用平均連結層次聚類的葉節點順序，否則按一維譜嵌入排序
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    if n < 3:
+        return np.arange(n)
+
+    if SCIPY_AVAILABLE:
+        distances = np.clip(1 - matrix, 0, None)
+        distances = (distances + distances.T) / 2
+        np.fill_diagonal(distances, 0)
+        return leaves_list(linkage(squareform(distances, checks=False), method='average'))
+
+    return np.argsort(similarity_embedding(matrix, components=1)[:, 0], kind='stable')
+
+
+def aggregate_matrix(matrix, labels: Sequence[str], max_size: int) -> Tuple[np.ndarray, List[str]]:
+    """將矩陣分塊取平均降採樣到不超過max_size×max_size，返回 (聚合矩陣, 分塊標籤)
+
+    應在cluster_order重排之後調用，使每個分塊包含相似的文本
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    if n <= max_size:
+        return matrix, list(labels)
+
+    bounds = np.linspace(0, n, max_size + 1).round().astype(int)
+    # 先按行分塊求和再按列分塊求和，除以塊大小得到平均值
+    sums = np.add.reduceat(np.add.reduceat(matrix, bounds[:-1], axis=0), bounds[:-1], axis=1)
+    sizes = np.diff(bounds)
+    aggregated = sums / np.outer(sizes, sizes)
+
+    block_labels = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start == 1:
+            block_labels.append(labels[start])
+        else:
+            block_labels.append(f"{labels[start]} … {labels[end - 1]}（{end - start}個）")
+    return aggregated, block_labels
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Task Event Broadcasting
+任務進度事件推送：有Redis時使用pub/sub，否則使用進程內廣播器
+"""
+
+import json
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# 任務結束事件，收到後事件流即可關閉
+TERMINAL_EVENTS = {'completed', 'failed', 'cancelled'}
+
+
+def build_event(task_id: str, event_type: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """構建事件字典"""
+    return {
+        'event': event_type,
+        'task_id': task_id,
+        'data': data or {},
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """將事件格式化為Server-Sent Events文本"""
+    if event.get('event') == 'heartbeat':
+        # 註釋行只用於保持連接，不會觸發前端事件
+        return ": keepalive\n\n"
+    payload = json.dumps(event, ensure_ascii=False)
+    return f"event: {event['event']}\ndata: {payload}\n\n"
+
+
+class _LocalSubscription:
+    """進程內訂閱"""
+
+    def __init__(self, broadcaster, task_id):
+        self._broadcaster = broadcaster
+        self.task_id = task_id
+        self.queue = queue.Queue(maxsize=1000)
+
+    def get(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broadcaster._unsubscribe(self)
+
+
+class LocalEventBroadcaster:
+    """進程內事件廣播器（Redis不可用時使用）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, task_id: str, event: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, []))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # 消費過慢的訂閱者丟棄事件，避免阻塞任務線程
+                pass
+
+    def subscribe(self, task_id: str) -> _LocalSubscription:
+        subscription = _LocalSubscription(self, task_id)
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: _LocalSubscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.task_id, None)
+
+
+class _RedisSubscription:
+    """Redis pub/sub訂閱"""
+
+    def __init__(self, redis_client, channel):
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def get(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        message = self._pubsub.get_message(timeout=timeout)
+        if not message or message.get('type') != 'message':
+            return None
+        try:
+            return json.loads(message['data'])
+        except (TypeError, ValueError):
+            return None
+
+    def close(self):
+        try:
+            self._pubsub.close()
+        except Exception:
+            pass
+
+
+class RedisEventBroadcaster:
+    """基於Redis pub/sub的事件廣播器，可跨進程（例如Celery worker）推送"""
+
+    CHANNEL_PREFIX = 'task_events:'
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    def publish(self, task_id: str, event: Dict[str, Any]):
+        self.redis_client.publish(self.CHANNEL_PREFIX + task_id, json.dumps(event, ensure_ascii=False))
+
+    def subscribe(self, task_id: str) -> _RedisSubscription:
+        return _RedisSubscription(self.redis_client, self.CHANNEL_PREFIX + task_id)
+
+
+def create_event_broadcaster(redis_client=None):
+    """根據Redis可用性創建事件廣播器"""
+    if redis_client is not None:
+        return RedisEventBroadcaster(redis_client)
+    return LocalEventBroadcaster()
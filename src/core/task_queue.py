@@ -9,6 +9,8 @@ import sys
 import uuid
 import json
 import time
+import hashlib
+import threading
 from datetime import datetime
 from pathlib import Path
 from dataclasses import dataclass, asdict
@@ -34,6 +36,9 @@ except ImportError:
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.core.analyzer import ChineseTextAnalyzer
+from src.core.task_events import build_event, create_event_broadcaster, TERMINAL_EVENTS
+from src.core.cancellation import CancellationToken, TaskCancelledError, TaskTimeoutError
+from src.core.task_routing import TaskRouter
 from src.utils.file_parsers import ExtendedFileParser
 
 class TaskStatus(Enum):
@@ -50,6 +55,15 @@ class TaskType(Enum):
     VISUALIZATION_GENERATION = "visualization_generation"
     FORMAT_CONVERSION = "format_conversion"
 
+# 任務類型對應的Celery任務名稱
+CELERY_TASK_NAMES = {
+    TaskType.TEXT_ANALYSIS: 'analyze_text',
+    TaskType.SIMILARITY_ANALYSIS: 'analyze_similarity',
+    TaskType.BATCH_FILE_PROCESSING: 'process_batch_files',
+    TaskType.VISUALIZATION_GENERATION: 'generate_visualizations',
+    TaskType.FORMAT_CONVERSION: 'convert_format',
+}
+
 @dataclass
 class Task:
     id: str
@@ -63,13 +77,23 @@ class Task:
     result: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
     estimated_duration: Optional[int] = None
+    idempotency_key: Optional[str] = None
+    time_budget: Optional[int] = None
+    priority: Optional[int] = None
+    queue: Optional[str] = None
 
 class TaskQueue:
     """任務隊列管理器"""
     
-    def __init__(self, redis_url='redis://localhost:6379/0', enable_celery=True):
+    # 任務在Redis中的保存時間
+    TASK_TTL = 7 * 24 * 3600
+    
+    def __init__(self, redis_url='redis://localhost:6379/0', enable_celery=True,
+                 result_freshness_window=3600, queue_config_path=None):
         self.redis_url = redis_url
         self.enable_celery = enable_celery and CELERY_AVAILABLE
+        # 已完成任務結果可被重用的時間窗口（秒），0表示只合併進行中的任務
+        self.result_freshness_window = result_freshness_window
         
         # 初始化Redis連接
         if REDIS_AVAILABLE:
@@ -84,6 +108,9 @@ class TaskQueue:
         else:
             self.redis_available = False
         
+        # 任務路由：每種任務類型使用獨立隊列和默認優先級
+        self.router = TaskRouter(queue_config_path)
+        
         # 初始化Celery
         if self.enable_celery:
             self.celery_app = Celery('text_analyzer_tasks', broker=redis_url, backend=redis_url)
@@ -96,6 +123,22 @@ class TaskQueue:
                 task_track_started=True,
                 task_time_limit=30 * 60,  # 30分鐘超時
                 task_soft_time_limit=25 * 60,  # 25分鐘軟超時
+                # worker異常退出時重新投遞任務，配合批量任務檢查點續跑
+                task_acks_late=True,
+                task_reject_on_worker_lost=True,
+                worker_prefetch_multiplier=1,
+                # 按任務類型路由到命名隊列，並啟用隊列內優先級
+                task_routes=self.router.celery_routes(
+                    {task_type.value: name for task_type, name in CELERY_TASK_NAMES.items()}
+                ),
+                task_create_missing_queues=True,
+                task_queue_max_priority=10,
+                task_default_priority=self.router.default_priority,
+                broker_transport_options={
+                    'priority_steps': list(range(10)),
+                    'sep': ':',
+                    'queue_order_strategy': 'priority',
+                },
             )
             print("Celery配置完成")
         else:
@@ -104,14 +147,59 @@ class TaskQueue:
         
         # 內存任務存儲（如果Redis不可用）
         self.local_tasks = {}
+        self.local_idempotency_index = {}
+        self.local_checkpoints = {}
+        self._cancel_tokens = {}
+        self._idempotency_lock = threading.Lock()
+        
+        # 本地處理時按隊列限制並發，避免重任務佔滿交互式任務的處理能力
+        self._lane_semaphores = {
+            lane.name: threading.BoundedSemaphore(lane.concurrency)
+            for lane in self.router.lanes.values()
+        }
+        
+        # 任務事件廣播（SSE進度推送）
+        self.events = create_event_broadcaster(self.redis_client if self.redis_available else None)
         
         # 初始化分析器
         self.analyzer = ChineseTextAnalyzer()
         self.file_parser = ExtendedFileParser()
     
     def create_task(self, task_type: TaskType, parameters: Dict[str, Any], 
-                   estimated_duration: Optional[int] = None) -> str:
-        """創建新任務"""
+                   estimated_duration: Optional[int] = None,
+                   idempotency_key: Optional[str] = None, dedupe: bool = False,
+                   freshness_window: Optional[int] = None,
+                   time_budget: Optional[int] = None,
+                   priority: Optional[int] = None) -> str:
+        """創建新任務
+        
+        提供idempotency_key（或dedupe=True按任務類型和參數自動生成）時，
+        相同請求會合併到進行中的任務，或直接返回新鮮窗口內已完成任務的結果；
+        time_budget（秒）限制任務的最長執行時間；
+        priority（0-9，越大越優先）默認使用任務類型所屬隊列的優先級
+        """
+        return self.submit_task(task_type, parameters, estimated_duration,
+                                idempotency_key, dedupe, freshness_window,
+                                time_budget, priority)['task_id']
+    
+    def submit_task(self, task_type: TaskType, parameters: Dict[str, Any],
+                    estimated_duration: Optional[int] = None,
+                    idempotency_key: Optional[str] = None, dedupe: bool = False,
+                    freshness_window: Optional[int] = None,
+                    time_budget: Optional[int] = None,
+                    priority: Optional[int] = None) -> Dict[str, Any]:
+        """創建或重用任務，返回任務ID及其來源（created / attached / cached）"""
+        if isinstance(task_type, str):
+            task_type = TaskType(task_type)
+        
+        if idempotency_key is None and dedupe:
+            idempotency_key = self.compute_idempotency_key(task_type, parameters)
+        
+        if idempotency_key:
+            reused = self._find_reusable_task(idempotency_key, freshness_window)
+            if reused:
+                return reused
+        
         task_id = str(uuid.uuid4())
         
         task = Task(
@@ -120,9 +208,19 @@ class TaskQueue:
             status=TaskStatus.PENDING,
             created_at=datetime.now(),
             parameters=parameters,
-            estimated_duration=estimated_duration
+            estimated_duration=estimated_duration,
+            idempotency_key=idempotency_key,
+            time_budget=time_budget,
+            priority=self.router.priority_for(task_type, priority),
+            queue=self.router.queue_for(task_type)
         )
         
+        if idempotency_key and not self._claim_idempotency_key(idempotency_key, task_id):
+            # 並發請求已搶先創建相同任務，直接附加到該任務
+            winner_id = self._get_idempotency_target(idempotency_key)
+            if winner_id:
+                return {'task_id': winner_id, 'disposition': 'attached'}
+        
         # 保存任務
         self._save_task(task)
         
@@ -138,7 +236,80 @@ class TaskQueue:
             # 本地處理
             self._process_task_locally(task_id)
         
-        return task_id
+        return {'task_id': task_id, 'disposition': 'created'}
+    
+    @staticmethod
+    def compute_idempotency_key(task_type: TaskType, parameters: Dict[str, Any]) -> str:
+        """根據任務類型和參數計算冪等鍵"""
+        if isinstance(task_type, TaskType):
+            task_type = task_type.value
+        params = {k: v for k, v in (parameters or {}).items() if k != 'task_id'}
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha256(f"{task_type}:{canonical}".encode('utf-8')).hexdigest()
+        return f"{task_type}:{digest}"
+    
+    def _find_reusable_task(self, idempotency_key: str,
+                            freshness_window: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """查找可重用的任務"""
+        task_id = self._get_idempotency_target(idempotency_key)
+        if not task_id:
+            return None
+        
+        task = self.get_task_status(task_id)
+        if task:
+            if task.status in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
+                return {'task_id': task_id, 'disposition': 'attached'}
+            
+            if freshness_window is None:
+                freshness_window = self.result_freshness_window
+            if task.status == TaskStatus.SUCCESS and task.completed_at:
+                age = (datetime.now() - task.completed_at).total_seconds()
+                if age <= freshness_window:
+                    return {'task_id': task_id, 'disposition': 'cached'}
+        
+        # 任務已過期、失敗或被取消，釋放冪等鍵
+        self._release_idempotency_key(idempotency_key, task_id)
+        return None
+    
+    def _get_idempotency_target(self, idempotency_key: str) -> Optional[str]:
+        """獲取冪等鍵對應的任務ID"""
+        if self.redis_available:
+            try:
+                value = self.redis_client.get(f"task_idem:{idempotency_key}")
+                return value.decode('utf-8') if isinstance(value, bytes) else value
+            except Exception as e:
+                print(f"從Redis讀取冪等鍵失敗: {e}")
+        with self._idempotency_lock:
+            return self.local_idempotency_index.get(idempotency_key)
+    
+    def _claim_idempotency_key(self, idempotency_key: str, task_id: str) -> bool:
+        """原子地佔用冪等鍵，已被佔用時返回False"""
+        if self.redis_available:
+            try:
+                return bool(self.redis_client.set(
+                    f"task_idem:{idempotency_key}", task_id, nx=True, ex=self.TASK_TTL
+                ))
+            except Exception as e:
+                print(f"保存冪等鍵到Redis失敗: {e}")
+        with self._idempotency_lock:
+            if idempotency_key in self.local_idempotency_index:
+                return False
+            self.local_idempotency_index[idempotency_key] = task_id
+            return True
+    
+    def _release_idempotency_key(self, idempotency_key: str, task_id: str):
+        """釋放仍指向指定任務的冪等鍵"""
+        if self.redis_available:
+            try:
+                key = f"task_idem:{idempotency_key}"
+                if self._get_idempotency_target(idempotency_key) == task_id:
+                    self.redis_client.delete(key)
+                return
+            except Exception as e:
+                print(f"刪除Redis冪等鍵失敗: {e}")
+        with self._idempotency_lock:
+            if self.local_idempotency_index.get(idempotency_key) == task_id:
+                del self.local_idempotency_index[idempotency_key]
     
     def get_task_status(self, task_id: str) -> Optional[Task]:
         """獲取任務狀態"""
@@ -212,16 +383,125 @@ class TaskQueue:
         task.status = TaskStatus.CANCELLED
         task.completed_at = datetime.now()
         self._save_task(task)
+        self.publish_event(task_id, 'cancelled', {'status': task.status.value})
+        
+        # 通知正在執行的任務協作式停止（本地線程直接設置令牌，其他進程通過Redis標記）
+        token = self._cancel_tokens.get(task_id)
+        if token:
+            token.cancel()
+        if self.redis_available:
+            try:
+                self.redis_client.setex(f"task_cancel:{task_id}", self.TASK_TTL, 1)
+            except Exception as e:
+                print(f"保存取消標記到Redis失敗: {e}")
         
-        # 如果使用Celery，撤銷任務
+        # 如果使用Celery，撤銷尚未開始的任務；執行中的任務在下一個檢查點自行停止，
+        # 不終止整個worker進程
         if self.enable_celery and self.celery_app:
             try:
-                self.celery_app.control.revoke(task_id, terminate=True)
+                self.celery_app.control.revoke(task_id)
             except Exception as e:
                 print(f"撤銷Celery任務失敗: {e}")
         
         return True
     
+    def resume_task(self, task_id: str) -> bool:
+        """續跑失敗或已取消的任務，批量任務只處理檢查點之後剩餘的文件"""
+        task = self.get_task_status(task_id)
+        if not task:
+            return False
+        
+        if task.status not in [TaskStatus.FAILURE, TaskStatus.CANCELLED]:
+            return False
+        
+        task.status = TaskStatus.PENDING
+        task.error_message = None
+        task.completed_at = None
+        self._save_task(task)
+        self._clear_cancel_flag(task_id)
+        self.publish_event(task_id, 'status', {'status': task.status.value, 'progress': task.progress})
+        
+        if self.enable_celery and self.celery_app:
+            try:
+                self._submit_celery_task(task)
+                return True
+            except Exception as e:
+                print(f"提交Celery任務失敗: {e}")
+        
+        self._process_task_locally(task_id)
+        return True
+    
+    def _is_cancel_requested(self, task_id: str) -> bool:
+        """查詢跨進程的取消標記"""
+        if not self.redis_available:
+            return False
+        return bool(self.redis_client.exists(f"task_cancel:{task_id}"))
+    
+    def _clear_cancel_flag(self, task_id: str):
+        """清除取消標記"""
+        if self.redis_available:
+            try:
+                self.redis_client.delete(f"task_cancel:{task_id}")
+            except Exception as e:
+                print(f"刪除Redis取消標記失敗: {e}")
+    
+    def _create_cancel_token(self, task: Task) -> CancellationToken:
+        """為任務創建取消令牌"""
+        time_budget = task.time_budget or (task.parameters or {}).get('time_budget')
+        token = CancellationToken(
+            time_budget=float(time_budget) if time_budget else None,
+            external_check=(lambda: self._is_cancel_requested(task.id)) if self.redis_available else None
+        )
+        self._cancel_tokens[task.id] = token
+        return token
+    
+    def _load_checkpoint(self, task_id: Optional[str]) -> Dict[str, Any]:
+        """載入批量任務的已完成文件結果"""
+        if not task_id:
+            return {}
+        
+        if self.redis_available:
+            try:
+                entries = self.redis_client.hgetall(f"task_checkpoint:{task_id}")
+                return {
+                    (k.decode('utf-8') if isinstance(k, bytes) else k): json.loads(v)
+                    for k, v in entries.items()
+                }
+            except Exception as e:
+                print(f"從Redis載入檢查點失敗: {e}")
+        
+        return dict(self.local_checkpoints.get(task_id, {}))
+    
+    def _save_checkpoint_entry(self, task_id: Optional[str], file_path: str, result: Dict[str, Any]):
+        """保存單個文件的處理結果作為檢查點"""
+        if not task_id:
+            return
+        
+        if self.redis_available:
+            try:
+                key = f"task_checkpoint:{task_id}"
+                pipe = self.redis_client.pipeline()
+                pipe.hset(key, file_path, json.dumps(result, ensure_ascii=False, default=str))
+                pipe.expire(key, self.TASK_TTL)
+                pipe.execute()
+                return
+            except Exception as e:
+                print(f"保存檢查點到Redis失敗: {e}")
+        
+        self.local_checkpoints.setdefault(task_id, {})[file_path] = result
+    
+    def _clear_checkpoint(self, task_id: Optional[str]):
+        """清除檢查點（結果已保存到任務中）"""
+        if not task_id:
+            return
+        
+        if self.redis_available:
+            try:
+                self.redis_client.delete(f"task_checkpoint:{task_id}")
+            except Exception as e:
+                print(f"刪除Redis檢查點失敗: {e}")
+        self.local_checkpoints.pop(task_id, None)
+    
     def _save_task(self, task: Task):
         """保存任務"""
         task_dict = asdict(task)
@@ -239,7 +519,7 @@ class TaskQueue:
             try:
                 self.redis_client.setex(
                     f"task:{task.id}", 
-                    7 * 24 * 3600,  # 7天過期
+                    self.TASK_TTL,  # 7天過期
                     json.dumps(task_dict, ensure_ascii=False)
                 )
             except Exception as e:
@@ -250,74 +530,182 @@ class TaskQueue:
     
     def _submit_celery_task(self, task: Task):
         """提交任務到Celery"""
-        # 根據任務類型選擇處理函數
-        if task.type == TaskType.TEXT_ANALYSIS:
-            self.celery_app.send_task('analyze_text', args=[task.id, task.parameters])
-        elif task.type == TaskType.SIMILARITY_ANALYSIS:
-            self.celery_app.send_task('analyze_similarity', args=[task.id, task.parameters])
-        elif task.type == TaskType.BATCH_FILE_PROCESSING:
-            self.celery_app.send_task('process_batch_files', args=[task.id, task.parameters])
-        elif task.type == TaskType.VISUALIZATION_GENERATION:
-            self.celery_app.send_task('generate_visualizations', args=[task.id, task.parameters])
-        elif task.type == TaskType.FORMAT_CONVERSION:
-            self.celery_app.send_task('convert_format', args=[task.id, task.parameters])
+        # 根據任務類型選擇處理函數和隊列
+        task_name = CELERY_TASK_NAMES.get(task.type)
+        if not task_name:
+            return
+        
+        queue = task.queue or self.router.queue_for(task.type)
+        priority = self.router.priority_for(task.type, task.priority)
+        self.celery_app.send_task(
+            task_name,
+            args=[task.id, task.parameters],
+            queue=queue,
+            priority=self.router.broker_priority(priority, self.redis_url)
+        )
     
-    def _process_task_locally(self, task_id: str):
-        """本地處理任務"""
-        import threading
+    def publish_event(self, task_id: Optional[str], event_type: str, data: Optional[Dict[str, Any]] = None):
+        """推送任務事件"""
+        if not task_id:
+            return
+        try:
+            self.events.publish(task_id, build_event(task_id, event_type, data))
+        except Exception as e:
+            print(f"推送任務事件失敗: {e}")
+    
+    def get_task_summary(self, task: Task) -> Dict[str, Any]:
+        """任務摘要（不含結果內容）"""
+        return {
+            'task_id': task.id,
+            'type': task.type.value,
+            'status': task.status.value,
+            'progress': task.progress,
+            'created_at': task.created_at.isoformat() if task.created_at else None,
+            'started_at': task.started_at.isoformat() if task.started_at else None,
+            'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+            'error_message': task.error_message,
+            'queue': task.queue,
+            'priority': task.priority,
+            'result_url': f"/api/tasks/{task.id}/result" if task.status == TaskStatus.SUCCESS else None
+        }
+    
+    def iter_task_events(self, task_id: str, heartbeat_interval: float = 15.0):
+        """迭代任務事件，直到任務結束
         
-        def process():
+        先訂閱再讀取一次狀態快照，避免遺漏訂閱前發生的事件
+        """
+        subscription = self.events.subscribe(task_id)
+        try:
             task = self.get_task_status(task_id)
             if not task:
                 return
             
-            try:
-                # 更新任務狀態
-                task.status = TaskStatus.PROCESSING
-                task.started_at = datetime.now()
-                self._save_task(task)
-                
-                # 根據任務類型處理
-                if task.type == TaskType.TEXT_ANALYSIS:
-                    result = self._analyze_text_local(task.parameters)
-                elif task.type == TaskType.SIMILARITY_ANALYSIS:
-                    result = self._analyze_similarity_local(task.parameters)
-                elif task.type == TaskType.BATCH_FILE_PROCESSING:
-                    result = self._process_batch_files_local(task.parameters)
-                elif task.type == TaskType.VISUALIZATION_GENERATION:
-                    result = self._generate_visualizations_local(task.parameters)
-                elif task.type == TaskType.FORMAT_CONVERSION:
-                    result = self._convert_format_local(task.parameters)
-                else:
-                    raise ValueError(f"不支持的任務類型: {task.type}")
-                
-                # 任務成功完成
-                task.status = TaskStatus.SUCCESS
-                task.result = result
-                task.progress = 100
-                task.completed_at = datetime.now()
-                
-            except Exception as e:
-                # 任務失敗
-                task.status = TaskStatus.FAILURE
-                task.error_message = str(e)
-                task.completed_at = datetime.now()
-                print(f"任務 {task_id} 處理失敗: {e}")
+            snapshot = self.get_task_summary(task)
+            yield build_event(task_id, 'status', snapshot)
+            if task.status in [TaskStatus.SUCCESS, TaskStatus.FAILURE, TaskStatus.CANCELLED]:
+                return
             
-            finally:
-                self._save_task(task)
+            idle = 0.0
+            while True:
+                event = subscription.get(timeout=1.0)
+                if event is None:
+                    idle += 1.0
+                    if idle >= heartbeat_interval:
+                        idle = 0.0
+                        yield build_event(task_id, 'heartbeat')
+                    continue
+                
+                idle = 0.0
+                yield event
+                if event.get('event') in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscription.close()
+    
+    def _execute_task(self, task_id: str):
+        """執行任務並更新狀態（本地線程與Celery worker共用）"""
+        task = self.get_task_status(task_id)
+        if not task:
+            return None
+        
+        if task.status == TaskStatus.CANCELLED:
+            # 任務在開始前已被取消
+            return None
+        
+        cancel_token = self._create_cancel_token(task)
         
+        try:
+            # 更新任務狀態
+            task.status = TaskStatus.PROCESSING
+            task.started_at = datetime.now()
+            self._save_task(task)
+            self.publish_event(task_id, 'status', {'status': task.status.value, 'progress': task.progress})
+            
+            # 根據任務類型處理
+            if task.type == TaskType.TEXT_ANALYSIS:
+                result = self._analyze_text_local(task.parameters)
+            elif task.type == TaskType.SIMILARITY_ANALYSIS:
+                result = self._analyze_similarity_local(task.parameters, cancel_token=cancel_token)
+            elif task.type == TaskType.BATCH_FILE_PROCESSING:
+                result = self._process_batch_files_local(task.parameters, task_id=task_id,
+                                                         cancel_token=cancel_token)
+            elif task.type == TaskType.VISUALIZATION_GENERATION:
+                result = self._generate_visualizations_local(task.parameters, cancel_token=cancel_token)
+            elif task.type == TaskType.FORMAT_CONVERSION:
+                result = self._convert_format_local(task.parameters)
+            else:
+                raise ValueError(f"不支持的任務類型: {task.type}")
+            
+            # 完成前最後檢查一次，避免覆蓋已取消的狀態
+            if cancel_token.cancelled:
+                raise TaskCancelledError("任務已被取消")
+            
+            # 任務成功完成
+            task.status = TaskStatus.SUCCESS
+            task.result = result
+            task.progress = 100
+            task.completed_at = datetime.now()
+            
+        except TaskCancelledError:
+            # 任務被取消（cancel_task已推送取消事件）
+            task.status = TaskStatus.CANCELLED
+            task.completed_at = task.completed_at or datetime.now()
+            print(f"任務 {task_id} 已取消")
+            
+        except Exception as e:
+            # 任務失敗（包括超出時間預算）
+            task.status = TaskStatus.FAILURE
+            task.error_message = str(e)
+            task.completed_at = datetime.now()
+            print(f"任務 {task_id} 處理失敗: {e}")
+        
+        finally:
+            self._cancel_tokens.pop(task_id, None)
+            self._save_task(task)
+        
+        if task.status == TaskStatus.SUCCESS:
+            # 結果已保存，不再需要逐文件的檢查點；失敗或取消時保留以便resume_task續跑
+            self._clear_checkpoint(task_id)
+            self.publish_event(task_id, 'completed', {
+                'status': task.status.value,
+                'progress': 100,
+                'result_url': f"/api/tasks/{task_id}/result"
+            })
+        elif task.status == TaskStatus.FAILURE:
+            self.publish_event(task_id, 'failed', {
+                'status': task.status.value,
+                'error': task.error_message
+            })
+        
+        return task.result
+    
+    def _process_task_locally(self, task_id: str):
+        """本地處理任務"""
         # 在新線程中處理任務
-        thread = threading.Thread(target=process)
+        thread = threading.Thread(target=self._execute_task_in_lane, args=(task_id,))
         thread.daemon = True
         thread.start()
     
+    def _execute_task_in_lane(self, task_id: str):
+        """在任務所屬隊列的並發限制內執行任務（本地模式）"""
+        task = self.get_task_status(task_id)
+        semaphore = None
+        if task:
+            semaphore = self._lane_semaphores.get(task.queue or self.router.queue_for(task.type))
+        
+        if semaphore is None:
+            return self._execute_task(task_id)
+        
+        with semaphore:
+            return self._execute_task(task_id)
+    
     def _analyze_text_local(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """本地文本分析"""
         text = parameters.get('text', '')
         options = parameters.get('options', {})
         
-        result = self.analyzer.analyze_text(text)
+        # 詞語共現只在需要繪製關聯網絡時統計
+        result = self.analyzer.analyze_text(text, cooccurrence=options.get('include_cooccurrence', False))
         
         if options.get('include_sentiment', True):
             sentiment = self.analyzer.analyze_sentiment(text)
@@ -337,7 +725,8 @@ class TaskQueue:
         
         return result
     
-    def _analyze_similarity_local(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    def _analyze_similarity_local(self, parameters: Dict[str, Any],
+                                  cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """本地相似度分析"""
         from src.core.similarity import TextSimilarityAnalyzer
         
@@ -346,18 +735,34 @@ class TaskQueue:
         method = parameters.get('method', 'semantic')
         
         similarity_analyzer = TextSimilarityAnalyzer()
-        result = similarity_analyzer.comprehensive_similarity_analysis(texts, labels)
+        result = similarity_analyzer.comprehensive_similarity_analysis(texts, labels, cancel_token=cancel_token)
         
         return result
     
-    def _process_batch_files_local(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """本地批量文件處理"""
+    def _process_batch_files_local(self, parameters: Dict[str, Any], task_id: Optional[str] = None,
+                                   cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """本地批量文件處理
+        
+        每個文件處理完成後寫入檢查點；重試或續跑時跳過已成功的文件
+        """
+        task_id = task_id or parameters.get('task_id')
         file_paths = parameters.get('file_paths', [])
         analysis_options = parameters.get('analysis_options', {})
         
-        results = {}
+        # 已成功處理的文件直接使用檢查點結果，失敗的文件重新處理
+        checkpoint = self._load_checkpoint(task_id)
+        results = {path: result for path, result in checkpoint.items() if 'error' not in result}
+        if results:
+            print(f"任務 {task_id} 從檢查點恢復，已完成 {len(results)}/{len(file_paths)} 個文件")
         
         for i, file_path in enumerate(file_paths):
+            if file_path in results:
+                continue
+            
+            # 文件之間檢查取消和時間預算（已完成部分保留在檢查點中，可續跑）
+            if cancel_token:
+                cancel_token.check()
+            
             try:
                 # 解析文件
                 parsed = self.file_parser.parse_file(file_path)
@@ -372,37 +777,56 @@ class TaskQueue:
                 analysis_result['file_metadata'] = parsed['metadata']
                 results[file_path] = analysis_result
                 
-                # 更新進度
-                progress = int((i + 1) / len(file_paths) * 100)
-                task = self.get_task_status(parameters.get('task_id'))
-                if task:
-                    task.progress = progress
-                    self._save_task(task)
-                
             except Exception as e:
                 results[file_path] = {'error': str(e)}
-        
-        return results
+            
+            self._save_checkpoint_entry(task_id, file_path, results[file_path])
+            
+            # 更新進度
+            progress = int(len(results) / len(file_paths) * 100)
+            task = self.get_task_status(task_id) if task_id else None
+            if task:
+                task.progress = progress
+                self._save_task(task)
+            
+            self.publish_event(task_id, 'file_completed', {
+                'file_path': file_path,
+                'index': i,
+                'total': len(file_paths),
+                'success': 'error' not in results[file_path]
+            })
+            self.publish_event(task_id, 'progress', {'progress': progress})
+        
+        # 按輸入順序返回結果
+        # 檢查點在_execute_task保存成功結果後才清除
+        return {path: results[path] for path in file_paths if path in results}
     
-    def _generate_visualizations_local(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_visualizations_local(self, parameters: Dict[str, Any],
+                                       cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
         """本地生成視覺化"""
-        from src.core.visualization import Visualizer
+        from src.core.visualization import Visualizer, DEFAULT_RENDER_PROFILE
         from src.core.advanced_visualization import AdvancedVisualizer
+        from src.core.render_scheduler import RenderScheduler
         
         analysis_results = parameters.get('analysis_results', {})
         output_dir = parameters.get('output_dir', 'visualizations')
         viz_types = parameters.get('visualization_types', ['basic'])
+        # 圖表輸出配置（preview、web、print、svg），默認為print
+        render_profile = parameters.get('render_profile')
         
         os.makedirs(output_dir, exist_ok=True)
         
         generated_files = []
+        # 任務本身已在工作進程中執行，圖表在當前進程中依次渲染
+        scheduler = RenderScheduler(processes=1)
         
         if 'basic' in viz_types:
             # 基本視覺化
             report_files = Visualizer.create_visualization_report(
-                analysis_results, output_dir, prefix='basic_'
+                analysis_results, output_dir, prefix='basic_', include_advanced=True,
+                cancel_token=cancel_token, scheduler=scheduler, profile=render_profile
             )
-            generated_files.extend(report_files)
+            generated_files.extend(report_files.values())
         
         if 'advanced' in viz_types:
             # 高級視覺化
@@ -411,7 +835,9 @@ class TaskQueue:
         
         return {
             'generated_files': generated_files,
-            'output_directory': output_dir
+            'output_directory': output_dir,
+            'render_profile': render_profile or DEFAULT_RENDER_PROFILE,
+            'render_stats': scheduler.stats.summary()
         }
     
     def _convert_format_local(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -450,24 +876,24 @@ if CELERY_AVAILABLE:
     @get_task_queue().celery_app.task(bind=True, name='analyze_text')
     def analyze_text_celery(self, task_id, parameters):
         tq = get_task_queue()
-        return tq._analyze_text_local(parameters)
+        return tq._execute_task(task_id)
     
     @get_task_queue().celery_app.task(bind=True, name='analyze_similarity')
     def analyze_similarity_celery(self, task_id, parameters):
         tq = get_task_queue()
-        return tq._analyze_similarity_local(parameters)
+        return tq._execute_task(task_id)
     
     @get_task_queue().celery_app.task(bind=True, name='process_batch_files')
     def process_batch_files_celery(self, task_id, parameters):
         tq = get_task_queue()
-        return tq._process_batch_files_local(parameters)
+        return tq._execute_task(task_id)
     
     @get_task_queue().celery_app.task(bind=True, name='generate_visualizations')
     def generate_visualizations_celery(self, task_id, parameters):
         tq = get_task_queue()
-        return tq._generate_visualizations_local(parameters)
+        return tq._execute_task(task_id)
     
     @get_task_queue().celery_app.task(bind=True, name='convert_format')
     def convert_format_celery(self, task_id, parameters):
         tq = get_task_queue()
-        return tq._convert_format_local(parameters) 
\ No newline at end of file
+        return tq._execute_task(task_id) 
\ No newline at end of file
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Task Routing
+任務路由：按任務類型分配命名隊列、優先級和每個隊列的並發數，
+避免耗時的相似度/批量任務阻塞交互式任務
+"""
+
+import os
+import sys
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# 優先級範圍：數值越大越優先
+PRIORITY_MIN = 0
+PRIORITY_MAX = 9
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'config', 'task_queues.json'
+)
+
+# 配置文件缺失時使用的默認隊列
+DEFAULT_QUEUE_CONFIG = {
+    'default_priority': 5,
+    'queues': {
+        'text_analysis': {'task_types': ['text_analysis'], 'concurrency': 4, 'priority': 7},
+        'format_conversion': {'task_types': ['format_conversion'], 'concurrency': 2, 'priority': 8},
+        'visualization_generation': {'task_types': ['visualization_generation'], 'concurrency': 2, 'priority': 5},
+        'batch_file_processing': {'task_types': ['batch_file_processing'], 'concurrency': 2, 'priority': 3},
+        'similarity_analysis': {'task_types': ['similarity_analysis'], 'concurrency': 1, 'priority': 2},
+    }
+}
+
+
+@dataclass
+class QueueLane:
+    name: str
+    task_types: List[str] = field(default_factory=list)
+    concurrency: int = 1
+    priority: int = 5
+
+
+def clamp_priority(priority: int) -> int:
+    """將優先級限制在有效範圍內"""
+    return max(PRIORITY_MIN, min(PRIORITY_MAX, int(priority)))
+
+
+def load_queue_config(config_path: Optional[str] = None) -> Dict[str, Any]:
+    """加載隊列配置
+
+    環境變量CELERY_CONCURRENCY_<QUEUE>可覆蓋單個隊列的並發數，
+    例如CELERY_CONCURRENCY_SIMILARITY_ANALYSIS=2
+    """
+    config_path = config_path or DEFAULT_CONFIG_PATH
+    config = DEFAULT_QUEUE_CONFIG
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"加載隊列配置失敗，使用默認配置: {e}")
+
+    default_priority = clamp_priority(config.get('default_priority', 5))
+    lanes = {}
+    for name, options in config.get('queues', {}).items():
+        concurrency = options.get('concurrency', 1)
+        env_value = os.environ.get(f"CELERY_CONCURRENCY_{name.upper()}")
+        if env_value:
+            try:
+                concurrency = int(env_value)
+            except ValueError:
+                print(f"無效的並發數設置 {name}: {env_value}")
+        lanes[name] = QueueLane(
+            name=name,
+            task_types=list(options.get('task_types', [])),
+            concurrency=max(1, int(concurrency)),
+            priority=clamp_priority(options.get('priority', default_priority))
+        )
+
+    return {'default_priority': default_priority, 'lanes': lanes}
+
+
+class TaskRouter:
+    """任務路由器"""
+
+    def __init__(self, config_path: Optional[str] = None, default_queue: str = 'celery'):
+        config = load_queue_config(config_path)
+        self.default_priority = config['default_priority']
+        self.lanes: Dict[str, QueueLane] = config['lanes']
+        self.default_queue = default_queue
+
+        self._lane_by_type = {}
+        for lane in self.lanes.values():
+            for task_type in lane.task_types:
+                self._lane_by_type[task_type] = lane
+
+    def lane_for(self, task_type) -> Optional[QueueLane]:
+        """獲取任務類型所屬的隊列"""
+        task_type = getattr(task_type, 'value', task_type)
+        return self._lane_by_type.get(task_type)
+
+    def queue_for(self, task_type) -> str:
+        """獲取任務類型對應的隊列名稱"""
+        lane = self.lane_for(task_type)
+        return lane.name if lane else self.default_queue
+
+    def priority_for(self, task_type, priority: Optional[int] = None) -> int:
+        """獲取任務優先級：顯式指定優先，否則使用隊列默認值"""
+        if priority is not None:
+            return clamp_priority(priority)
+        lane = self.lane_for(task_type)
+        return lane.priority if lane else self.default_priority
+
+    @staticmethod
+    def broker_priority(priority: int, broker_url: str) -> int:
+        """轉換為消息代理的優先級表示
+
+        Redis傳輸中0為最高優先級，與RabbitMQ相反
+        """
+        priority = clamp_priority(priority)
+        if broker_url and broker_url.startswith(('redis://', 'rediss://', 'unix://')):
+            return PRIORITY_MAX - priority
+        return priority
+
+    def celery_routes(self, task_names: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+        """生成Celery task_routes配置
+
+        Args:
+            task_names: 任務類型值到Celery任務名稱的映射
+        """
+        return {
+            name: {'queue': self.queue_for(task_type)}
+            for task_type, name in task_names.items()
+        }
+
+    def queue_names(self) -> List[str]:
+        """所有隊列名稱"""
+        return list(self.lanes.keys())
+
+
+if __name__ == '__main__':
+    # 供start_celery.sh讀取：每行輸出「隊列名稱 並發數」
+    for lane in TaskRouter().lanes.values():
+        print(f"{lane.name} {lane.concurrency}")
@@ -90,9 +90,46 @@ POS_MAPPING = load_mapping_from_json('pos_mapping.json')
 ENTITY_MAPPING = load_mapping_from_json('entity_mapping.json')
 SENTIMENT_MAPPING = load_mapping_from_json('sentiment_mapping.json')
 
+# 圖表輸出配置：preview用於交互預覽，web用於網頁顯示，print用於打印和存檔（默認），svg為矢量圖
+RENDER_PROFILES = {
+    'preview': {'dpi': 72, 'format': 'webp'},
+    'web': {'dpi': 110, 'format': 'png'},
+    'print': {'dpi': 300, 'format': 'png'},
+    'svg': {'dpi': 300, 'format': 'svg'},
+}
+DEFAULT_RENDER_PROFILE = 'print'
+WEBP_QUALITY = 80
+
+try:
+    from PIL import features as pil_features
+    WEBP_AVAILABLE = bool(pil_features.check('webp'))
+except ImportError:
+    WEBP_AVAILABLE = False
+
+def resolve_render_profile(profile=None, dpi=None):
+    """返回輸出配置的 (dpi, 文件格式)
+    
+    未指定配置時使用dpi參數（默認300）並輸出PNG；Pillow不支持WebP時回退為PNG
+    """
+    if profile is None:
+        return dpi or RENDER_PROFILES[DEFAULT_RENDER_PROFILE]['dpi'], 'png'
+    if profile not in RENDER_PROFILES:
+        raise ValueError(f"未知的圖表輸出配置: {profile}，可選: {', '.join(RENDER_PROFILES)}")
+    settings = RENDER_PROFILES[profile]
+    if settings['format'] == 'webp' and not WEBP_AVAILABLE:
+        return settings['dpi'], 'png'
+    return settings['dpi'], settings['format']
+
+def save_figure(save_path, dpi=300):
+    """保存當前圖表，文件格式由擴展名決定（png、webp、svg等）"""
+    kwargs = {'dpi': dpi, 'bbox_inches': 'tight'}
+    if save_path.lower().endswith('.webp'):
+        kwargs['pil_kwargs'] = {'quality': WEBP_QUALITY}
+    plt.savefig(save_path, **kwargs)
+
 class Visualizer:
     @staticmethod
-    def plot_word_frequency(word_freq, top_n=20, title='詞頻統計', save_path=None, figsize=(12, 6)):
+    def plot_word_frequency(word_freq, top_n=20, title='詞頻統計', save_path=None, figsize=(12, 6), dpi=300):
         """繪製詞頻條形圖"""
         top_words = dict(sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:top_n])
         
@@ -119,13 +156,13 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
         
         plt.close()
     
     @staticmethod
     def generate_wordcloud(word_freq, title='詞雲圖', save_path=None, figsize=(10, 8), 
-                          font_path=None, background_color='white', max_words=200):
+                          font_path=None, background_color='white', max_words=200, dpi=300):
         """生成詞雲"""
         # 使用全局中文字體設置，除非指定了其他字體
         if font_path is None:
@@ -179,7 +216,7 @@ class Visualizer:
             
             if save_path:
                 os.makedirs(os.path.dirname(os.path.abspath(save_path)), exist_ok=True)
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return True
@@ -196,7 +233,7 @@ class Visualizer:
                 plt.title("詞雲圖 (簡化版)")
                 
                 if save_path:
-                    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                    save_figure(save_path, dpi)
                 
                 plt.close()
                 return True
@@ -205,7 +242,7 @@ class Visualizer:
                 return False
     
     @staticmethod
-    def plot_pos_distribution(pos_freq, title='詞性分布', save_path=None, figsize=(10, 6)):
+    def plot_pos_distribution(pos_freq, title='詞性分布', save_path=None, figsize=(10, 6), dpi=300):
         """繪製詞性分布圖"""
         # 將詞性標籤轉換為繁體中文
         pos_freq_translated = {}
@@ -235,12 +272,12 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_sentiment_analysis(sentiment_data, title='情感分析', save_path=None, figsize=(8, 5)):
+    def plot_sentiment_analysis(sentiment_data, title='情感分析', save_path=None, figsize=(8, 5), dpi=300):
         """繪製情感分析結果圖表"""
         # 從情感分析結果中提取數據
         positive = sentiment_data.get('positive_count', 0)
@@ -278,12 +315,12 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_ngrams(ngrams, top_n=15, title='常見詞組', save_path=None, figsize=(12, 6)):
+    def plot_ngrams(ngrams, top_n=15, title='常見詞組', save_path=None, figsize=(12, 6), dpi=300):
         """繪製n-gram頻率圖"""
         top_ngrams = dict(sorted(ngrams.items(), key=lambda x: x[1], reverse=True)[:top_n])
         
@@ -309,12 +346,12 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_entities(entities, title='命名實體統計', save_path=None, figsize=(12, 8)):
+    def plot_entities(entities, title='命名實體統計', save_path=None, figsize=(12, 8), dpi=300):
         """繪製命名實體統計圖"""
         # 轉換實體類型名稱為繁體中文
         entity_counts = {}
@@ -355,12 +392,12 @@ class Visualizer:
         plt.axis('equal')  # 使餅圖為正圓形
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_keyword_weights(keywords, top_n=15, title='關鍵詞權重', save_path=None, figsize=(12, 6)):
+    def plot_keyword_weights(keywords, top_n=15, title='關鍵詞權重', save_path=None, figsize=(12, 6), dpi=300):
         """繪製關鍵詞權重圖"""
         top_keywords = dict(sorted(keywords.items(), key=lambda x: x[1], reverse=True)[:top_n])
         
@@ -386,92 +423,139 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def create_visualization_report(results, output_dir='visualization', prefix='', font_path=None, dpi=300):
-        """創建完整的可視化報告
+    def report_chart_jobs(results, output_dir='visualization', prefix='', font_path=None, dpi=300,
+                          include_advanced=True, profile=None):
+        """列出可視化報告中的圖表渲染任務（不執行渲染）
         
-        將所有分析結果圖表保存到指定目錄
+        profile為RENDER_PROFILES中的配置名稱，指定時覆蓋dpi並決定文件格式
         """
-        # 創建輸出目錄
-        os.makedirs(output_dir, exist_ok=True)
+        from src.core.render_scheduler import ChartJob
+        
+        dpi, file_format = resolve_render_profile(profile, dpi)
         
         # 為避免文件名衝突，添加前綴（例如，文件名）
         if prefix and not prefix.endswith('_'):
             prefix = prefix + '_'
         
-        # 詞頻分析
-        if 'word_frequency' in results:
-            word_freq_path = os.path.join(output_dir, f"{prefix}word_frequency.png")
-            Visualizer.plot_word_frequency(
-                results['word_frequency'], 
-                title='詞頻統計', 
-                save_path=word_freq_path
-            )
+        def chart_path(name):
+            return os.path.join(output_dir, f"{prefix}{name}.{file_format}")
+        
+        jobs = []
         
-        # 詞雲
         if 'word_frequency' in results:
-            wordcloud_path = os.path.join(output_dir, f"{prefix}wordcloud.png")
-            Visualizer.generate_wordcloud(
-                results['word_frequency'], 
-                title='詞雲圖', 
-                save_path=wordcloud_path,
-                font_path=font_path
-            )
+            # 詞雲
+            jobs.append(ChartJob('wordcloud', 'generate_wordcloud', {
+                'word_freq': results['word_frequency'],
+                'title': '詞雲圖',
+                'save_path': chart_path('wordcloud'),
+                'font_path': font_path,
+                'dpi': dpi
+            }))
+            # 詞頻分析
+            jobs.append(ChartJob('word_frequency', 'plot_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'top_n': 15,
+                'title': '詞頻統計',
+                'save_path': chart_path('word_frequency'),
+                'dpi': dpi
+            }))
         
         # 詞性分布
-        if 'pos_frequency' in results:
-            pos_path = os.path.join(output_dir, f"{prefix}pos_distribution.png")
-            Visualizer.plot_pos_distribution(
-                results['pos_frequency'], 
-                title='詞性分布', 
-                save_path=pos_path
-            )
+        if 'pos_frequency' in results or 'pos_distribution' in results:
+            jobs.append(ChartJob('pos_distribution', 'plot_pos_distribution', {
+                'pos_freq': results.get('pos_distribution', results.get('pos_frequency', {})),
+                'title': '詞性分布',
+                'save_path': chart_path('pos_distribution'),
+                'dpi': dpi
+            }))
         
         # 情感分析
         if 'sentiment' in results:
-            sentiment_path = os.path.join(output_dir, f"{prefix}sentiment.png")
-            Visualizer.plot_sentiment_analysis(
-                results['sentiment'], 
-                title='情感分析結果', 
-                save_path=sentiment_path
-            )
-        
-        # N-gram分析
-        if 'ngrams' in results:
-            ngrams_path = os.path.join(output_dir, f"{prefix}ngrams.png")
-            Visualizer.plot_ngrams(
-                results['ngrams'], 
-                title='常見詞組', 
-                save_path=ngrams_path
-            )
+            jobs.append(ChartJob('sentiment', 'plot_sentiment_analysis', {
+                'sentiment_data': results['sentiment'],
+                'title': '情感分析結果',
+                'save_path': chart_path('sentiment'),
+                'dpi': dpi
+            }))
         
         # 命名實體分析
         if 'entities' in results:
-            entities_path = os.path.join(output_dir, f"{prefix}entities.png")
-            Visualizer.plot_entities(
-                results['entities'], 
-                title='命名實體統計', 
-                save_path=entities_path
-            )
+            jobs.append(ChartJob('entities', 'plot_entities', {
+                'entity_data': results['entities'],
+                'title': '命名實體統計',
+                'save_path': chart_path('entities'),
+                'dpi': dpi
+            }))
+        
+        # N-gram分析
+        if 'ngrams' in results:
+            jobs.append(ChartJob('ngrams', 'plot_ngrams', {
+                'ngram_freq': results['ngrams'],
+                'title': '常見詞組',
+                'save_path': chart_path('ngrams'),
+                'dpi': dpi
+            }))
         
         # 關鍵詞分析
         if 'keywords' in results:
-            keywords_path = os.path.join(output_dir, f"{prefix}keywords.png")
-            Visualizer.plot_keyword_weights(
-                results['keywords'], 
-                title='關鍵詞權重', 
-                save_path=keywords_path
-            )
+            jobs.append(ChartJob('keywords', 'plot_keyword_weights', {
+                'keywords': results['keywords'],
+                'title': '關鍵詞權重',
+                'save_path': chart_path('keywords'),
+                'dpi': dpi
+            }))
+        
+        # 進階詞頻可視化
+        if include_advanced and 'word_frequency' in results:
+            jobs.append(ChartJob('word_freq_vertical', 'plot_advanced_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'top_n': 15,
+                'title': '詞頻垂直分布',
+                'save_path': chart_path('word_freq_vertical'),
+                'plot_type': 'vertical',
+                'dpi': dpi
+            }))
+            jobs.append(ChartJob('word_freq_pie', 'plot_advanced_word_frequency', {
+                'word_freq': results['word_frequency'],
+                'top_n': 10,
+                'title': '詞頻餅圖',
+                'save_path': chart_path('word_freq_pie'),
+                'plot_type': 'pie',
+                'dpi': dpi
+            }))
+        
+        return jobs
+    
+    @staticmethod
+    def create_visualization_report(results, output_dir='visualization', prefix='', font_path=None, dpi=300,
+                                    include_advanced=False, cancel_token=None, scheduler=None, profile=None):
+        """創建完整的可視化報告
         
-        return output_dir
+        將所有分析結果圖表保存到指定目錄，返回 {圖表鍵: 保存路徑}。
+        提供scheduler（RenderScheduler）時在其進程池中並行渲染；
+        提供cancel_token時，在每個圖表之間檢查取消和時間預算；
+        profile指定輸出配置（preview、web、print、svg）
+        """
+        from src.core.render_scheduler import RenderScheduler
+        
+        # 創建輸出目錄
+        os.makedirs(output_dir, exist_ok=True)
+        
+        jobs = Visualizer.report_chart_jobs(results, output_dir, prefix, font_path, dpi, include_advanced, profile)
+        
+        if scheduler is None:
+            scheduler = RenderScheduler(processes=1)
+        return scheduler.render(jobs, cancel_token)
     
     @staticmethod
     def plot_advanced_word_frequency(word_freq, top_n=20, title='詞頻統計', save_path=None, 
-                                    figsize=(12, 6), plot_type='horizontal', sort_by='frequency'):
+                                    figsize=(12, 6), plot_type='horizontal', sort_by='frequency', dpi=300,
+                                    color_map=None):
         """
         繪製進階詞頻條形圖
         
@@ -481,6 +565,8 @@ class Visualizer:
         - title: 圖表標題
         - save_path: 保存路徑
         - figsize: 圖表尺寸
+        - dpi: 保存圖片的解析度
+        - color_map: matplotlib顏色映射名稱（例如 'viridis'、'plasma'），None時使用默認顏色
         - plot_type: 圖表類型 ('horizontal', 'vertical', 'pie')
         - sort_by: 排序方式 ('frequency', 'alphabetical', 'length')
         """
@@ -497,11 +583,15 @@ class Visualizer:
         words = [item[0] for item in sorted_items]
         freqs = [item[1] for item in sorted_items]
         
+        colors = None
+        if color_map:
+            colors = matplotlib.colormaps[color_map](np.linspace(0.15, 0.85, max(len(words), 1)))
+        
         plt.figure(figsize=figsize)
         
         if plot_type == 'horizontal':
             # 使用Seaborn繪製水平條形圖
-            plt.barh(words, freqs)
+            plt.barh(words, freqs, color=colors)
             plt.xlabel('頻率')
             plt.ylabel('詞語')
             
@@ -511,7 +601,7 @@ class Visualizer:
                 
         elif plot_type == 'vertical':
             # 繪製垂直條形圖
-            plt.bar(words, freqs)
+            plt.bar(words, freqs, color=colors)
             plt.xlabel('詞語')
             plt.ylabel('頻率')
             plt.xticks(rotation=45, ha='right')  # 旋轉x軸標籤
@@ -526,6 +616,7 @@ class Visualizer:
                 freqs, 
                 labels=words, 
                 autopct='%1.1f%%',
+                colors=colors,
                 shadow=False, 
                 startangle=90,
                 wedgeprops={'edgecolor': 'w', 'linewidth': 1}
@@ -536,12 +627,12 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_entities(entity_data, title='命名實體分析', save_path=None, figsize=(10, 6)):
+    def plot_entities(entity_data, title='命名實體分析', save_path=None, figsize=(10, 6), dpi=300):
         """繪製命名實體分析圖表"""
         # 計算每種實體類型的數量
         entity_counts = {}
@@ -557,7 +648,7 @@ class Visualizer:
             plt.axis('off')
             
             if save_path:
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return
@@ -598,12 +689,12 @@ class Visualizer:
         plt.title(title)
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_ngrams(ngram_freq, title='N-gram分析', save_path=None, figsize=(12, 6)):
+    def plot_ngrams(ngram_freq, title='N-gram分析', save_path=None, figsize=(12, 6), dpi=300):
         """繪製N-gram分析條形圖"""
         if not ngram_freq:
             # 如果沒有N-gram數據，創建一個空圖表
@@ -613,7 +704,7 @@ class Visualizer:
             plt.axis('off')
             
             if save_path:
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return
@@ -636,12 +727,12 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
-    def plot_keyword_weights(keywords, title='關鍵詞權重', save_path=None, figsize=(12, 6)):
+    def plot_keyword_weights(keywords, title='關鍵詞權重', save_path=None, figsize=(12, 6), dpi=300):
         """繪製關鍵詞權重條形圖"""
         if not keywords:
             # 如果沒有關鍵詞數據，創建一個空圖表
@@ -651,7 +742,7 @@ class Visualizer:
             plt.axis('off')
             
             if save_path:
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return
@@ -673,13 +764,13 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
     def plot_word_frequency_comparison(word_freq_list, labels, title='詞頻對比', 
-                                      save_path=None, figsize=(14, 8), top_n=20):
+                                      save_path=None, figsize=(14, 8), top_n=20, dpi=300):
         """比較多個文本的詞頻"""
         if not word_freq_list or len(word_freq_list) < 2:
             # 至少需要兩個詞頻分布來進行比較
@@ -689,7 +780,7 @@ class Visualizer:
             plt.axis('off')
             
             if save_path:
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return
@@ -728,13 +819,13 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
     
     @staticmethod
     def plot_word_frequency_trends(word_freq_dict, x_labels, selected_words=None, 
-                                 title='詞頻趨勢', save_path=None, figsize=(12, 6)):
+                                 title='詞頻趨勢', save_path=None, figsize=(12, 6), dpi=300):
         """繪製詞頻隨時間/順序的變化趨勢"""
         if not word_freq_dict or len(word_freq_dict) < 2:
             # 至少需要兩個時間點/順序的詞頻數據
@@ -744,7 +835,7 @@ class Visualizer:
             plt.axis('off')
             
             if save_path:
-                plt.savefig(save_path, dpi=300, bbox_inches='tight')
+                save_figure(save_path, dpi)
                 
             plt.close()
             return
@@ -776,113 +867,6 @@ class Visualizer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            save_figure(save_path, dpi)
             
         plt.close()
-    
-    @staticmethod
-    def create_visualization_report(analyzer_results, output_dir, prefix='report_', include_advanced=True):
-        """生成一個完整的可視化報告，包含多個圖表"""
-        os.makedirs(output_dir, exist_ok=True)
-        
-        viz_paths = {}
-        
-        # 詞雲
-        if 'word_frequency' in analyzer_results:
-            wc_path = os.path.join(output_dir, f"{prefix}wordcloud.png")
-            Visualizer.generate_wordcloud(
-                analyzer_results['word_frequency'], 
-                title='詞頻雲圖',
-                save_path=wc_path
-            )
-            viz_paths['wordcloud'] = wc_path
-        
-        # 詞頻分析
-        if 'word_frequency' in analyzer_results:
-            wf_path = os.path.join(output_dir, f"{prefix}word_frequency.png")
-            Visualizer.plot_word_frequency(
-                analyzer_results['word_frequency'],
-                top_n=15,
-                title='詞頻分布',
-                save_path=wf_path
-            )
-            viz_paths['word_frequency'] = wf_path
-        
-        # 詞性分析
-        if 'pos_frequency' in analyzer_results or 'pos_distribution' in analyzer_results:
-            pos_data = analyzer_results.get('pos_distribution', analyzer_results.get('pos_frequency', {}))
-            pos_path = os.path.join(output_dir, f"{prefix}pos_distribution.png")
-            Visualizer.plot_pos_distribution(
-                pos_data,
-                title='詞性分布',
-                save_path=pos_path
-            )
-            viz_paths['pos_distribution'] = pos_path
-        
-        # 情感分析
-        if 'sentiment' in analyzer_results:
-            sent_path = os.path.join(output_dir, f"{prefix}sentiment.png")
-            Visualizer.plot_sentiment_analysis(
-                analyzer_results['sentiment'],
-                title='情感分析',
-                save_path=sent_path
-            )
-            viz_paths['sentiment'] = sent_path
-        
-        # 命名實體
-        if 'entities' in analyzer_results:
-            entity_path = os.path.join(output_dir, f"{prefix}entities.png")
-            Visualizer.plot_entities(
-                analyzer_results['entities'],
-                title='命名實體統計',
-                save_path=entity_path
-            )
-            viz_paths['entities'] = entity_path
-        
-        # 進階可視化
-        if include_advanced:
-            # 進階詞頻可視化
-            if 'word_frequency' in analyzer_results:
-                # 垂直條形圖
-                wf_vertical_path = os.path.join(output_dir, f"{prefix}word_freq_vertical.png")
-                Visualizer.plot_advanced_word_frequency(
-                    analyzer_results['word_frequency'],
-                    top_n=15,
-                    title='詞頻垂直分布',
-                    save_path=wf_vertical_path,
-                    plot_type='vertical'
-                )
-                viz_paths['word_freq_vertical'] = wf_vertical_path
-                
-                # 詞頻餅圖
-                wf_pie_path = os.path.join(output_dir, f"{prefix}word_freq_pie.png")
-                Visualizer.plot_advanced_word_frequency(
-                    analyzer_results['word_frequency'],
-                    top_n=10,
-                    title='詞頻餅圖',
-                    save_path=wf_pie_path,
-                    plot_type='pie'
-                )
-                viz_paths['word_freq_pie'] = wf_pie_path
-            
-            # N-gram分析
-            if 'ngrams' in analyzer_results:
-                ngrams_path = os.path.join(output_dir, f"{prefix}ngrams.png")
-                Visualizer.plot_ngrams(
-                    analyzer_results['ngrams'],
-                    title='N-gram詞組分析',
-                    save_path=ngrams_path
-                )
-                viz_paths['ngrams'] = ngrams_path
-            
-            # 關鍵詞權重
-            if 'keywords' in analyzer_results:
-                keywords_path = os.path.join(output_dir, f"{prefix}keywords.png")
-                Visualizer.plot_keyword_weights(
-                    analyzer_results['keywords'],
-                    title='關鍵詞權重',
-                    save_path=keywords_path
-                )
-                viz_paths['keywords'] = keywords_path
-        
-        return viz_paths
\ No newline at end of file
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar Export
+列式導出：將每個文檔的詞頻、詞性和命名實體寫成語料庫級的表（Parquet、Arrow IPC或壓縮的JSON Lines），
+批量分析時逐文件追加，讀取時可內存映射，無需逐個解析成千上萬的JSON文件
+"""
+
+import os
+import json
+import gzip
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# 支持的列式導出格式
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'jsonl')
+# 表文件所在的子目錄：<輸出目錄>/tables/<表名>/part-<運行ID>.<擴展名>
+TABLES_DIRNAME = 'tables'
+# 緩衝的行數達到此值時寫出一個行組（Parquet）或記錄批（Arrow）
+ROW_BUFFER_SIZE = 64 * 1024
+# Parquet按列壓縮；Arrow IPC不壓縮，以便內存映射後零拷貝讀取
+PARQUET_COMPRESSION = 'zstd'
+JSONL_ZSTD_LEVEL = 3
+JSONL_GZIP_LEVEL = 6
+
+# json.dumps每次調用都會新建編碼器，寫出JSON Lines時復用同一個
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+# 表結構：列名和類型
+TABLE_COLUMNS = {
+    'documents': [
+        ('doc_id', 'string'),
+        ('source_path', 'string'),
+        ('total_words', 'int64'),
+        ('total_characters', 'int64'),
+        ('chinese_characters', 'int64'),
+        ('avg_word_length', 'float64'),
+        ('sentiment_label', 'string'),
+        ('sentiment_score', 'float64'),
+        ('analyzed_at', 'float64')
+    ],
+    'word_frequency': [('doc_id', 'string'), ('word', 'string'), ('frequency', 'int32')],
+    'pos': [('doc_id', 'string'), ('pos', 'string'), ('count', 'int32')],
+    'entities': [('doc_id', 'string'), ('entity_type', 'string'), ('entity', 'string')]
+}
+
+
+def _extension(fmt: str) -> str:
+    if fmt == 'parquet':
+        return '.parquet'
+    if fmt == 'arrow':
+        return '.arrow'
+    return '.jsonl.zst' if ZSTD_AVAILABLE else '.jsonl.gz'
+
+
+def _schema(table: str):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in TABLE_COLUMNS[table]])
+
+
+def document_tables(doc_id: str, results: Dict[str, Any], source_path: Optional[str] = None) -> Dict[str, Dict[str, list]]:
+    """將一個文檔的分析結果轉換為各表的列數據 {表名: {列名: [值]}}"""
+    sentiment = results.get('sentiment') or {}
+    tables = {
+        'documents': {
+            'doc_id': [doc_id],
+            'source_path': [source_path],
+            'total_words': [results.get('total_words')],
+            'total_characters': [results.get('total_characters')],
+            'chinese_characters': [results.get('chinese_characters')],
+            'avg_word_length': [results.get('avg_word_length')],
+            'sentiment_label': [sentiment.get('sentiment_label')],
+            'sentiment_score': [sentiment.get('sentiment_score')],
+            'analyzed_at': [time.time()]
+        }
+    }
+
+    word_frequency = results.get('word_frequency') or {}
+    tables['word_frequency'] = {
+        'doc_id': [doc_id] * len(word_frequency),
+        'word': list(word_frequency.keys()),
+        'frequency': list(word_frequency.values())
+    }
+
+    pos_frequency = results.get('pos_frequency') or {}
+    tables['pos'] = {
+        'doc_id': [doc_id] * len(pos_frequency),
+        'pos': list(pos_frequency.keys()),
+        'count': list(pos_frequency.values())
+    }
+
+    entity_rows = [(entity_type, entity) for entity_type, entities in (results.get('entities') or {}).items()
+                   for entity in entities]
+    tables['entities'] = {
+        'doc_id': [doc_id] * len(entity_rows),
+        'entity_type': [entity_type for entity_type, _ in entity_rows],
+        'entity': [entity for _, entity in entity_rows]
+    }
+    return tables
+
+
+class _ArrowSink:
+    """Parquet或Arrow IPC文件：先寫臨時文件，關閉時寫出文件尾再改名，讀取方不會看到殘缺文件"""
+
+    def __init__(self, path: str, table: str, fmt: str):
+        self.path = path
+        self.temp_path = f"{path}.tmp"
+        self.schema = _schema(table)
+        if fmt == 'parquet':
+            self.writer = pq.ParquetWriter(self.temp_path, self.schema, compression=PARQUET_COMPRESSION)
+        else:
+            self.writer = pa.ipc.new_file(self.temp_path, self.schema)
+
+    def write(self, columns: Dict[str, list]):
+        self.writer.write_batch(pa.record_batch(
+            [pa.array(columns[field.name], type=field.type) for field in self.schema], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.temp_path, self.path)
+
+
+class _JsonlSink:
+    """壓縮的JSON Lines文件（zstandard可用時使用zstd，否則gzip）"""
+
+    def __init__(self, path: str, table: str):
+        self.path = path
+        self.columns = [name for name, _ in TABLE_COLUMNS[table]]
+        # 每行按模板拼接已編碼的列值，比逐行編碼字典快一倍以上
+        self._template = '{' + ','.join(f'{_JSON_ENCODER.encode(name)}:%s' for name in self.columns) + '}'
+        self.temp_path = f"{path}.tmp"
+        if path.endswith('.zst'):
+            self._file = zstandard.open(self.temp_path, 'wb', cctx=zstandard.ZstdCompressor(level=JSONL_ZSTD_LEVEL))
+        else:
+            self._file = gzip.open(self.temp_path, 'wb', compresslevel=JSONL_GZIP_LEVEL)
+
+    def write(self, columns: Dict[str, list]):
+        encoded = [list(map(_JSON_ENCODER.encode, columns[name])) for name in self.columns]
+        lines = [self._template % row for row in zip(*encoded)]
+        if lines:
+            self._file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def close(self):
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+
+
+class ColumnarWriter:
+    """語料庫級列式導出
+
+    每次運行在 <output_dir>/tables/<表名>/ 下寫一個新的分片文件，多次運行（如增量批量分析）的結果並存，
+    讀取時同一文檔只保留最新一次運行的數據。行先在內存中按列緩衝，達到ROW_BUFFER_SIZE時寫出
+    """
+
+    def __init__(self, output_dir: str, fmt: str = 'parquet', run_id: Optional[str] = None):
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"不支持的列式導出格式: {fmt}")
+        if fmt in ('parquet', 'arrow') and not PYARROW_AVAILABLE:
+            raise ImportError(f"導出{fmt}需要安裝pyarrow: pip install pyarrow")
+        self.output_dir = output_dir
+        self.fmt = fmt
+        # 分片文件名按運行ID排序即為寫入順序
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+        self.documents = 0
+        self._buffers = {table: {name: [] for name, _ in columns} for table, columns in TABLE_COLUMNS.items()}
+        self._buffered_rows = {table: 0 for table in TABLE_COLUMNS}
+        self._sinks = {}
+        self._paths = {}
+
+    def part_path(self, table: str) -> str:
+        return os.path.join(self.output_dir, TABLES_DIRNAME, table, f"part-{self.run_id}{_extension(self.fmt)}")
+
+    def add(self, doc_id: str, results: Dict[str, Any], source_path: Optional[str] = None):
+        """追加一個文檔的分析結果"""
+        self.add_tables(document_tables(doc_id, results, source_path))
+
+    def add_tables(self, tables: Dict[str, Dict[str, list]]):
+        """追加document_tables生成的列數據（例如由工作進程生成後傳回）"""
+        for table, columns in tables.items():
+            buffer = self._buffers[table]
+            for name, values in columns.items():
+                buffer[name].extend(values)
+            self._buffered_rows[table] += len(columns['doc_id'])
+            if self._buffered_rows[table] >= ROW_BUFFER_SIZE:
+                self._flush(table)
+        self.documents += 1
+
+    def _flush(self, table: str):
+        if not self._buffered_rows[table]:
+            return
+        sink = self._sinks.get(table)
+        if sink is None:
+            path = self.part_path(table)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            sink = _JsonlSink(path, table) if self.fmt == 'jsonl' else _ArrowSink(path, table, self.fmt)
+            self._sinks[table] = sink
+            self._paths[table] = path
+        sink.write(self._buffers[table])
+        self._buffers[table] = {name: [] for name, _ in TABLE_COLUMNS[table]}
+        self._buffered_rows[table] = 0
+
+    def close(self) -> Dict[str, str]:
+        """寫出剩餘的行並關閉文件，返回 {表名: 文件路徑}"""
+        if self.documents:
+            for table in TABLE_COLUMNS:
+                self._flush(table)
+        for sink in self._sinks.values():
+            sink.close()
+        self._sinks = {}
+        return dict(self._paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _part_files(output_dir: str, table: str, fmt: Optional[str] = None) -> List[str]:
+    table_dir = os.path.join(output_dir, TABLES_DIRNAME, table)
+    if not os.path.isdir(table_dir):
+        return []
+    extensions = (_extension(fmt),) if fmt != 'jsonl' else ('.jsonl.zst', '.jsonl.gz')
+    return sorted(os.path.join(table_dir, name) for name in os.listdir(table_dir)
+                  if name.startswith('part-') and (fmt is None or name.endswith(extensions))
+                  and not name.endswith('.tmp'))
+
+
+def _format_of(path: str) -> str:
+    return 'jsonl' if '.jsonl' in path else os.path.splitext(path)[1][1:]
+
+
+def _run_of(path: str) -> str:
+    return os.path.basename(path).split('.', 1)[0]
+
+
+def _read_part(path: str, table: str):
+    """讀取一個分片；Parquet和Arrow文件通過內存映射讀取，JSON Lines由pyarrow按擴展名解壓並解析"""
+    if path.endswith('.parquet'):
+        return pq.read_table(path, memory_map=True)
+    if path.endswith('.arrow'):
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return pa_json.read_json(path, parse_options=pa_json.ParseOptions(explicit_schema=_schema(table)))
+
+
+def iter_jsonl_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行讀取壓縮的JSON Lines分片（不依賴pyarrow）"""
+    opener = zstandard.open if path.endswith('.zst') else gzip.open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def read_table(output_dir: str, table: str, fmt: Optional[str] = None, latest: bool = True):
+    """讀取一個表的全部分片，返回pyarrow.Table
+
+    Args:
+        fmt: 讀取哪種格式的分片（同一目錄可能同時導出了多種格式），默認為最近一次導出的格式
+        latest: 同一文檔在多次運行中都有數據的，只保留最新一次運行的行
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("讀取列式導出需要安裝pyarrow: pip install pyarrow")
+    if fmt is None:
+        documents = _part_files(output_dir, 'documents')
+        if not documents:
+            return _schema(table).empty_table()
+        fmt = _format_of(documents[-1])
+    paths = _part_files(output_dir, table, fmt)
+    if not paths:
+        return _schema(table).empty_table()
+
+    parts = [_read_part(path, table) for path in paths]
+    if latest and len(parts) > 1:
+        # 每個文檔的最新運行，以documents表的分片為準
+        latest_part = {}
+        for path in _part_files(output_dir, 'documents', fmt):
+            for doc_id in _read_part(path, 'documents').column('doc_id').to_pylist():
+                latest_part[doc_id] = _run_of(path)
+        filtered = []
+        for path, part in zip(paths, parts):
+            run = _run_of(path)
+            keep = [doc_id for doc_id, latest_run in latest_part.items() if latest_run == run]
+            filtered.append(part.filter(pc.is_in(part.column('doc_id'), value_set=pa.array(keep, pa.string()))))
+        parts = filtered
+    return pa.concat_tables([part.cast(_schema(table)) for part in parts])
+
+
+def export_document_tables(results: Dict[str, Any], output_path: str, fmt: str) -> bool:
+    """單個文檔的列式導出：寫入輸出目錄下的語料庫表，文檔ID為輸出文件名"""
+    try:
+        with ColumnarWriter(os.path.dirname(output_path) or '.', fmt) as writer:
+            writer.add(os.path.basename(output_path), results)
+        return True
+    except ImportError as e:
+        print(e)
+        return False
+    except Exception as e:
+        print(f"列式導出失敗: {e}")
+        return False
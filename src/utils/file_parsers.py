@@ -6,8 +6,15 @@ Extended File Format Parser Module
 
 import os
 import sys
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
 import requests
+from collections import OrderedDict
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # PDF parsing
 try:
@@ -24,13 +31,6 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
-# Web scraping
-try:
-    from bs4 import BeautifulSoup
-    BS4_AVAILABLE = True
-except ImportError:
-    BS4_AVAILABLE = False
-
 # File type detection
 try:
     import magic
@@ -46,11 +46,51 @@ except ImportError:
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import io
+import csv
+import json
+import shutil
+import zipfile
+import tempfile
+from src.utils.text_loader import load_text, load_text_stream, detect_file_encoding
+from src.utils.url_fetcher import URLFetcher
+from src.utils.html_extractor import extract_text
+
+# 調用方要求並行（parallel=True）且頁數達到此值時，跨進程並行提取PDF，每個進程處理一個頁塊
+PDF_PARALLEL_MIN_PAGES = 40
+PDF_PAGE_CHUNK_SIZE = 16
+
+# 自動選擇CSV文本列時採樣的行數
+RECORD_SAMPLE_SIZE = 200
+
+# 增量解碼JSON數組時每次讀取的字符數
+JSON_READ_SIZE = 64 * 1024
+
+# 文件類型檢測：擴展名可信時直接使用，只有擴展名缺失、未知或有歧義時才讀取文件頭
+AMBIGUOUS_EXTENSIONS = {'', 'doc'}
+EXTENSION_ALIASES = {'markdown': 'md', 'text': 'txt'}
+SNIFF_HEADER_SIZE = 2048
+
+# 檢測結果緩存：path -> (size, mtime_ns, file_type)
+FILE_TYPE_CACHE_SIZE = 100000
+_file_type_cache = OrderedDict()
+_file_type_cache_lock = threading.Lock()
+
+# CPU密集的格式在進程池中解析，其餘（文本、HTML、URL等I/O密集）在線程池中解析
+PROCESS_POOL_FORMATS = {'pdf', 'docx', 'doc'}
+
+# 需要隨機訪問的格式：從流解析時先寫入臨時文件，其餘格式直接從流增量解碼
+RANDOM_ACCESS_FORMATS = {'pdf', 'docx', 'doc', 'zip'}
+
+# 識別出但不支持的二進制格式（例如非Word的ZIP容器：xlsx、epub、zip），不再按文本解析
+UNSUPPORTED_BINARY_FORMATS = {'zip'}
+# 寫入臨時文件時的塊大小
+STREAM_COPY_SIZE = 1024 * 1024
 
 class ExtendedFileParser:
     """擴展文件格式解析器"""
     
-    def __init__(self):
+    def __init__(self, verbose=True, url_fetcher=None):
         self.supported_formats = {
             'txt': self.parse_text_file,
             'pdf': self.parse_pdf,
@@ -61,38 +101,107 @@ class ExtendedFileParser:
             'url': self.parse_url,
             'md': self.parse_markdown,
             'csv': self.parse_csv_as_text,
-            'json': self.parse_json_as_text
+            'json': self.parse_json_as_text,
+            'jsonl': self.parse_json_as_text
         }
         
+        # 網頁抓取器（連接池和響應緩存），首次解析URL時創建
+        self.url_fetcher = url_fetcher
+        self._url_fetcher_lock = threading.Lock()
+        
         self.capabilities = {
             'pdf': PDF_AVAILABLE,
             'docx': DOCX_AVAILABLE,
-            'web_scraping': BS4_AVAILABLE,
+            'web_scraping': True,
             'file_detection': MAGIC_AVAILABLE or MIMETYPES_AVAILABLE
         }
         
-        print("文件解析器初始化完成")
-        print("支持的功能:")
-        for feature, available in self.capabilities.items():
-            status = "✓" if available else "✗"
-            print(f"  {status} {feature}")
+        if verbose:
+            print("文件解析器初始化完成")
+            print("支持的功能:")
+            for feature, available in self.capabilities.items():
+                status = "✓" if available else "✗"
+                print(f"  {status} {feature}")
     
-    def detect_file_type(self, file_path):
-        """檢測文件類型"""
-        if MAGIC_AVAILABLE:
+    def detect_file_type(self, file_path, header=None):
+        """檢測文件類型
+        
+        優先信任擴展名；擴展名有歧義時才根據文件頭（可傳入已讀取的header）嗅探魔數。
+        結果按 (path, size, mtime) 緩存
+        """
+        # 常見路徑：擴展名可信時不構造Path、不stat、不查緩存
+        extension = os.path.splitext(file_path)[1][1:].lower()
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        if extension in self.supported_formats and extension not in AMBIGUOUS_EXTENSIONS:
+            return extension
+        
+        try:
+            stat = os.stat(file_path)
+            cache_key = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            cache_key = None
+        
+        if cache_key is not None:
+            with _file_type_cache_lock:
+                cached = _file_type_cache.get(file_path)
+                if cached and cached[:2] == cache_key:
+                    _file_type_cache.move_to_end(file_path)
+                    return cached[2]
+        
+        if header is None:
             try:
-                mime_type = magic.from_file(file_path, mime=True)
-                return self._mime_to_extension(mime_type)
-            except Exception as e:
-                print(f"魔數檢測失敗: {e}")
+                with open(file_path, 'rb') as f:
+                    header = f.read(SNIFF_HEADER_SIZE)
+            except OSError as e:
+                print(f"讀取文件頭失敗: {e}")
+                header = b''
         
-        if MIMETYPES_AVAILABLE:
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if mime_type:
-                return self._mime_to_extension(mime_type)
+        file_type = self._sniff_header(header)
+        if file_type == 'zip':
+            file_type = _zip_document_type(file_path)
+        if file_type == 'unknown':
+            if MAGIC_AVAILABLE and header:
+                try:
+                    file_type = self._mime_to_extension(magic.from_buffer(header, mime=True))
+                except Exception as e:
+                    print(f"魔數檢測失敗: {e}")
+            if file_type == 'unknown' and MIMETYPES_AVAILABLE:
+                mime_type, _ = mimetypes.guess_type(file_path)
+                if mime_type:
+                    file_type = self._mime_to_extension(mime_type)
+            if file_type == 'unknown' and extension:
+                file_type = extension
+        
+        if cache_key is not None:
+            with _file_type_cache_lock:
+                _file_type_cache[file_path] = (cache_key[0], cache_key[1], file_type)
+                _file_type_cache.move_to_end(file_path)
+                while len(_file_type_cache) > FILE_TYPE_CACHE_SIZE:
+                    _file_type_cache.popitem(last=False)
+        
+        return file_type
+    
+    def _sniff_header(self, header):
+        """根據文件頭的魔數判斷類型"""
+        if not header:
+            return 'unknown'
+        if header.startswith(b'%PDF'):
+            return 'pdf'
+        if header.startswith(b'PK\x03\x04'):
+            # ZIP容器（docx、xlsx、epub等），需要查看目錄才能區分，見_zip_document_type
+            return 'zip'
+        if header.startswith(b'\xd0\xcf\x11\xe0'):
+            # 舊版OLE格式的Word文檔
+            return 'doc'
         
-        # 回退到文件擴展名
-        return Path(file_path).suffix.lower().lstrip('.')
+        head = header.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+        if head.startswith((b'<!doctype html', b'<html')) or b'<body' in head[:512]:
+            return 'html'
+        if head[:1] in (b'{', b'['):
+            return 'json'
+        if b'\x00' not in header:
+            return 'txt'
+        return 'unknown'
     
     def _mime_to_extension(self, mime_type):
         """MIME類型轉文件擴展名"""
@@ -103,6 +212,7 @@ class ExtendedFileParser:
             'application/msword': 'doc',
             'text/html': 'html',
             'text/markdown': 'md',
+            'text/x-markdown': 'md',
             'text/csv': 'csv',
             'application/json': 'json'
         }
@@ -120,6 +230,8 @@ class ExtendedFileParser:
         parser_func = self.supported_formats.get(file_type)
         
         if parser_func is None:
+            if file_type in UNSUPPORTED_BINARY_FORMATS:
+                raise ValueError(f"不支持的文件格式: {file_type}")
             # 嘗試作為文本文件處理
             try:
                 return self.parse_text_file(file_path)
@@ -136,75 +248,160 @@ class ExtendedFileParser:
             except Exception as text_error:
                 raise ValueError(f"無法解析文件: {e}")
     
+    def parse_stream(self, stream, filename, spool_dir=None):
+        """從字節流（例如上傳請求體）解析文件
+        
+        文本類格式（txt、md、html、csv、json）直接從流增量解碼，不寫臨時文件；
+        PDF/Word需要隨機訪問，先分塊寫入spool_dir中的臨時文件，解析後刪除
+        """
+        header = stream.read(SNIFF_HEADER_SIZE) or b''
+        extension = Path(filename or '').suffix.lower().lstrip('.')
+        file_type = EXTENSION_ALIASES.get(extension, extension)
+        if file_type in AMBIGUOUS_EXTENSIONS or file_type not in self.supported_formats:
+            file_type = self._sniff_header(header)
+        body = _PrefixedStream(header, stream)
+        
+        if file_type in RANDOM_ACCESS_FORMATS:
+            if spool_dir:
+                os.makedirs(spool_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=spool_dir, suffix=f".{file_type}", delete=False) as spool:
+                shutil.copyfileobj(body, spool, STREAM_COPY_SIZE)
+            try:
+                result = self.parse_file(spool.name)
+            finally:
+                os.remove(spool.name)
+            result['metadata']['file_path'] = filename
+            return result
+        
+        content, encoding = load_text_stream(body)
+        metadata = {
+            'file_type': 'text',
+            'file_path': filename,
+            'encoding': encoding
+        }
+        
+        try:
+            if file_type in ('html', 'htm'):
+                extracted = extract_text(content)
+                metadata.update(file_type='html', title=extracted['title'],
+                                main_content_detected=extracted['main_content_detected'])
+                content = extracted['content']
+            elif file_type == 'md':
+                metadata['file_type'] = 'markdown'
+                content = _strip_markdown(content)
+            elif file_type == 'csv':
+                records = self.iter_csv_records(io.StringIO(content, newline=''))
+                lines = [record['text'] for record in records if record['text']]
+                metadata.update(file_type='csv', records_count=len(lines), text_columns=records.text_columns)
+                content = '\n'.join(lines)
+            elif file_type in ('json', 'jsonl'):
+                lines = [record['text'] for record in self.iter_json_records(io.StringIO(content))
+                         if record['text']]
+                metadata.update(file_type='json', records_count=len(lines))
+                content = '\n'.join(lines)
+        except Exception as e:
+            # 回退到文本解析
+            print(f"解析 {filename} 失敗，按文本處理: {e}")
+            metadata = {'file_type': 'text', 'file_path': filename, 'encoding': encoding}
+        
+        return {
+            'content': content,
+            'metadata': metadata
+        }
+    
     def parse_text_file(self, file_path):
         """解析純文本文件"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            try:
-                with open(file_path, 'r', encoding='gbk') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
+        content, encoding = load_text(file_path)
         
         return {
             'content': content,
             'metadata': {
                 'file_type': 'text',
                 'file_path': file_path,
-                'encoding': 'auto-detected'
+                'encoding': encoding
             }
         }
     
-    def parse_pdf(self, file_path):
-        """解析PDF文件"""
+    def parse_pdf(self, file_path, page_range=None, parallel=False):
+        """解析PDF文件
+        
+        Args:
+            page_range: 頁碼範圍 (start, end)，從1開始且包含兩端；None表示全部頁
+            parallel: 頁數達到PDF_PARALLEL_MIN_PAGES時跨進程並行提取；在工作進程中調用時
+                （如批量分析或並行解析的進程池）自動改為逐頁提取
+        """
         if not PDF_AVAILABLE:
             raise ImportError("PDF解析庫不可用，請安裝 PyPDF2 和 pdfplumber")
         
-        content = ""
+        total_pages = _pdf_page_count(file_path)
+        page_texts = []
+        parsers = set()
+        failed_pages = []
+        
+        for record in self._iter_pdf_page_records(file_path, page_range, parallel, total_pages):
+            if record['parser']:
+                parsers.add(record['parser'])
+            else:
+                failed_pages.append(record['page'])
+            if record['text']:
+                page_texts.append(record['text'])
+        
+        if total_pages and not parsers:
+            raise ValueError("PDF解析失敗: 所有頁面均無法提取")
+        
         metadata = {
             'file_type': 'pdf',
             'file_path': file_path,
-            'total_pages': 0,
-            'parser': 'unknown'
+            'total_pages': total_pages,
+            # pdfplumber（更好的表格和佈局支持）優先，失敗的頁面才使用PyPDF2
+            'parser': '+'.join(sorted(parsers, reverse=True)) if parsers else 'unknown',
+            'page_range': list(page_range) if page_range else None,
+            'failed_pages': failed_pages
         }
         
-        # 嘗試使用pdfplumber（更好的表格和佈局支持）
-        try:
-            with pdfplumber.open(file_path) as pdf:
-                metadata['total_pages'] = len(pdf.pages)
-                metadata['parser'] = 'pdfplumber'
-                
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        content += page_text + "\n"
-                        
-        except Exception as e:
-            print(f"pdfplumber解析失敗，嘗試PyPDF2: {e}")
-            
-            # 回退到PyPDF2
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    metadata['total_pages'] = len(pdf_reader.pages)
-                    metadata['parser'] = 'PyPDF2'
-                    
-                    for page in pdf_reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            content += page_text + "\n"
-                            
-            except Exception as pdf2_error:
-                raise ValueError(f"PDF解析失敗: {pdf2_error}")
-        
         return {
-            'content': content.strip(),
+            'content': "\n".join(page_texts).strip(),
             'metadata': metadata
         }
     
+    def iter_pdf_pages(self, file_path, page_range=None, parallel=False):
+        """逐頁產出PDF文本 (page_number, text)，頁碼從1開始
+        
+        可直接用於分塊分析，例如：
+            analyzer.analyze_chunks(text for _, text in parser.iter_pdf_pages(path))
+        """
+        if not PDF_AVAILABLE:
+            raise ImportError("PDF解析庫不可用，請安裝 PyPDF2 和 pdfplumber")
+        
+        for record in self._iter_pdf_page_records(file_path, page_range, parallel):
+            yield record['page'], record['text']
+    
+    def _iter_pdf_page_records(self, file_path, page_range=None, parallel=False, total_pages=None):
+        """逐頁產出提取記錄，要求並行時大文件按頁塊分配到多個進程"""
+        if total_pages is None:
+            total_pages = _pdf_page_count(file_path)
+        page_numbers = _resolve_page_range(page_range, total_pages)
+        if not page_numbers:
+            return
+        
+        if not parallel or len(page_numbers) < PDF_PARALLEL_MIN_PAGES or not _can_start_processes():
+            yield from _extract_pdf_pages(file_path, page_numbers)
+            return
+        
+        chunks = [page_numbers[i:i + PDF_PAGE_CHUNK_SIZE]
+                  for i in range(0, len(page_numbers), PDF_PAGE_CHUNK_SIZE)]
+        try:
+            executor = ProcessPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 1))
+        except (OSError, NotImplementedError) as e:
+            print(f"進程池不可用，改為逐頁提取: {e}")
+            yield from _extract_pdf_pages(file_path, page_numbers)
+            return
+        
+        with executor:
+            # map按頁塊順序返回，前面的頁塊完成後即可開始產出
+            for records in executor.map(_extract_pdf_page_chunk, [file_path] * len(chunks), chunks):
+                yield from records
+    
     def parse_docx(self, file_path):
         """解析Word文檔"""
         if not DOCX_AVAILABLE:
@@ -244,153 +441,130 @@ class ExtendedFileParser:
         except Exception as e:
             raise ValueError(f"Word文檔解析失敗: {e}")
     
-    def parse_html(self, file_path):
-        """解析HTML文件"""
-        if not BS4_AVAILABLE:
-            raise ImportError("HTML解析庫不可用，請安裝 beautifulsoup4")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-        except UnicodeDecodeError:
-            try:
-                with open(file_path, 'r', encoding='gbk') as f:
-                    html_content = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 移除script和style標籤
-        for script in soup(["script", "style"]):
-            script.decompose()
+    def parse_html(self, file_path, main_content=True):
+        """解析HTML文件
         
-        # 提取文本
-        text = soup.get_text()
+        main_content=True時去除導航、頁腳等模板內容，只保留正文
+        """
+        html_content, encoding = load_text(file_path)
         
-        # 清理文本
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        content = '\n'.join(chunk for chunk in chunks if chunk)
+        extracted = extract_text(html_content, main_content)
         
         metadata = {
             'file_type': 'html',
             'file_path': file_path,
-            'title': soup.title.string if soup.title else None
+            'encoding': encoding,
+            'title': extracted['title'],
+            'main_content_detected': extracted['main_content_detected']
         }
         
         return {
-            'content': content,
+            'content': extracted['content'],
             'metadata': metadata
         }
     
-    def parse_url(self, url):
-        """解析網頁URL"""
-        if not BS4_AVAILABLE:
-            raise ImportError("網頁解析庫不可用，請安裝 beautifulsoup4")
+    def parse_url(self, url, main_content=True, acquired=False):
+        """解析網頁URL
         
+        acquired為True表示已通過抓取器的try_acquire佔用了該主機的並發名額
+        """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=30)
-            response.encoding = response.apparent_encoding
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 移除script和style標籤
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # 提取文本
-            text = soup.get_text()
-            
-            # 清理文本
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            content = '\n'.join(chunk for chunk in chunks if chunk)
+            response = self.get_url_fetcher().fetch(url, acquired=acquired)
+        except requests.RequestException as e:
+            raise ValueError(f"網頁獲取失敗: {e}")
+        except Exception as e:
+            raise ValueError(f"網頁解析失敗: {e}")
+        return self._parse_url_response(url, response, main_content)
+    
+    def _parse_url_response(self, url, response, main_content=True):
+        """從抓取結果提取網頁正文"""
+        try:
+            extracted = extract_text(response.text, main_content)
             
             metadata = {
                 'file_type': 'web_page',
                 'url': url,
-                'title': soup.title.string if soup.title else None,
+                'title': extracted['title'],
                 'status_code': response.status_code,
-                'content_type': response.headers.get('content-type', 'unknown')
+                'content_type': response.content_type,
+                'encoding': response.encoding,
+                'from_cache': response.from_cache,
+                'main_content_detected': extracted['main_content_detected']
             }
             
             return {
-                'content': content,
+                'content': extracted['content'],
                 'metadata': metadata
             }
             
-        except requests.RequestException as e:
-            raise ValueError(f"網頁獲取失敗: {e}")
         except Exception as e:
             raise ValueError(f"網頁解析失敗: {e}")
     
+    def get_url_fetcher(self):
+        """獲取共用的URL抓取器"""
+        if self.url_fetcher is None:
+            with self._url_fetcher_lock:
+                if self.url_fetcher is None:
+                    self.url_fetcher = URLFetcher()
+        return self.url_fetcher
+    
+    def parse_urls(self, urls, max_workers=None, main_content=True):
+        """並發解析多個URL，返回與輸入順序一致的結果
+        
+        抓取由URLFetcher.fetch_many按主機排隊調度，每個主機的並發受抓取器限制，
+        單個主機達到上限時不會佔住其他主機的工作線程
+        """
+        urls = list(urls)
+        results = {}
+        for url, response in self.get_url_fetcher().fetch_many(urls, max_workers=max_workers):
+            try:
+                if isinstance(response, Exception):
+                    if isinstance(response, requests.RequestException):
+                        raise ValueError(f"網頁獲取失敗: {response}")
+                    raise ValueError(f"網頁解析失敗: {response}")
+                results[url] = self._parse_url_response(url, response, main_content)
+            except Exception as e:
+                print(f"解析文件 {url} 失敗: {e}")
+                results[url] = _error_result(url, e)
+        return {url: results[url] for url in urls}
+    
     def parse_markdown(self, file_path):
         """解析Markdown文件"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            try:
-                with open(file_path, 'r', encoding='gbk') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-        
-        # 簡單的Markdown標記清理
-        import re
-        
-        # 移除標題標記
-        content = re.sub(r'^#+\s*', '', content, flags=re.MULTILINE)
-        
-        # 移除鏈接語法，保留文本
-        content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)
-        
-        # 移除圖片語法
-        content = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', r'\1', content)
-        
-        # 移除粗體和斜體標記
-        content = re.sub(r'\*\*([^\*]+)\*\*', r'\1', content)
-        content = re.sub(r'\*([^\*]+)\*', r'\1', content)
-        
-        # 移除代碼塊
-        content = re.sub(r'```[\s\S]*?```', '', content)
-        content = re.sub(r'`([^`]+)`', r'\1', content)
+        content, encoding = load_text(file_path)
         
         metadata = {
             'file_type': 'markdown',
-            'file_path': file_path
+            'file_path': file_path,
+            'encoding': encoding
         }
         
         return {
-            'content': content.strip(),
+            'content': _strip_markdown(content),
             'metadata': metadata
         }
     
-    def parse_csv_as_text(self, file_path):
-        """解析CSV文件為文本"""
+    def parse_csv_as_text(self, file_path, text_columns=None):
+        """解析CSV文件為文本
+        
+        只拼接文本列（未指定時自動選擇），每條記錄一行，不再輸出填充對齊的表格
+        """
         try:
-            import pandas as pd
-            df = pd.read_csv(file_path)
-            content = df.to_string(index=False)
-        except ImportError:
-            # 如果沒有pandas，簡單處理CSV
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            records = self.iter_csv_records(file_path, text_columns)
+            lines = []
+            for record in records:
+                if record['text']:
+                    lines.append(record['text'])
+            content = '\n'.join(lines)
         except Exception as e:
             # 回退到文本解析
+            print(f"CSV解析失敗，按文本處理: {e}")
             return self.parse_text_file(file_path)
         
         metadata = {
             'file_type': 'csv',
-            'file_path': file_path
+            'file_path': file_path,
+            'records_count': len(lines),
+            'text_columns': records.text_columns
         }
         
         return {
@@ -398,24 +572,24 @@ class ExtendedFileParser:
             'metadata': metadata
         }
     
-    def parse_json_as_text(self, file_path):
-        """解析JSON文件為文本"""
-        import json
+    def parse_json_as_text(self, file_path, text_fields=None):
+        """解析JSON文件為文本
         
+        支持JSON、JSON數組和JSON Lines，只提取文本字段（未指定時提取所有字符串值）
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 將JSON轉換為可讀文本
-            content = json.dumps(data, ensure_ascii=False, indent=2)
-            
+            lines = [record['text'] for record in self.iter_json_records(file_path, text_fields)
+                     if record['text']]
+            content = '\n'.join(lines)
         except Exception as e:
             # 回退到文本解析
+            print(f"JSON解析失敗，按文本處理: {e}")
             return self.parse_text_file(file_path)
         
         metadata = {
             'file_type': 'json',
-            'file_path': file_path
+            'file_path': file_path,
+            'records_count': len(lines)
         }
         
         return {
@@ -423,26 +597,221 @@ class ExtendedFileParser:
             'metadata': metadata
         }
     
-    def batch_parse_files(self, file_paths):
-        """批量解析多個文件"""
+    def iter_csv_records(self, file_path, text_columns=None, sample_rows=RECORD_SAMPLE_SIZE):
+        """逐行讀取CSV記錄，產出 {'index', 'text', 'record'}
+        
+        text_columns為None時根據前sample_rows行自動選擇文本列；
+        選中的列可通過返回的迭代器的text_columns屬性獲取
+        """
+        return _CSVRecordIterator(file_path, text_columns, sample_rows)
+    
+    def iter_json_records(self, file_path, text_fields=None):
+        """增量讀取JSON記錄，產出 {'index', 'text', 'record'}
+        
+        頂層為數組時逐個解碼元素，否則按JSON Lines逐行解碼；
+        兩者都不是時（例如格式化的單個對象）作為一條記錄讀取。
+        text_fields支持點號分隔的嵌套字段，例如 'user.comment'
+        """
+        if hasattr(file_path, 'read'):
+            # 已打開的可定位文本文件對象
+            yield from _iter_json_records(file_path, text_fields)
+            return
+        
+        # 編碼只從開頭採樣檢測，後面的個別無效字節替換為U+FFFD，不中斷整個文件
+        encoding = detect_file_encoding(file_path)
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            yield from _iter_json_records(f, text_fields)
+    
+    def batch_parse_files(self, file_paths, parallel=False, max_workers=None, timeout=None):
+        """批量解析多個文件
+        
+        parallel=True時並行解析（見iter_parse_files），返回結果的順序與輸入一致
+        """
+        if parallel:
+            return dict(self.iter_parse_files(file_paths, max_workers=max_workers,
+                                              timeout=timeout, ordered=True))
+        
         results = {}
         
         for file_path in file_paths:
             try:
-                result = self.parse_file(file_path)
+                result = self.parse_source(file_path)
                 results[file_path] = result
             except Exception as e:
-                results[file_path] = {
-                    'content': '',
-                    'metadata': {
-                        'error': str(e),
-                        'file_path': file_path
-                    }
-                }
+                results[file_path] = _error_result(file_path, e)
                 print(f"解析文件 {file_path} 失敗: {e}")
         
         return results
     
+    def parse_source(self, source):
+        """解析文件路徑或http(s) URL"""
+        if _is_url(source):
+            return self.parse_url(source)
+        return self.parse_file(source)
+    
+    def iter_parse_files(self, file_paths, max_workers=None, timeout=None, ordered=True,
+                         max_in_flight=None):
+        """並行解析文件，逐個產出 (file_path, result)
+        
+        Args:
+            file_paths: 文件路徑或URL列表（可以是生成器）
+            max_workers: 每個池的工作者數量，默認為CPU核心數
+            timeout: 單個文件的解析超時（秒），從工作者真正開始處理該文件時計時（不含排隊時間），
+                每0.5秒檢查一次；超時的文件返回錯誤結果。
+                進程池中的任務超時會終止並重建進程池，其他未完成的進程任務重新提交；
+                線程池（URL和輕量格式）中的超時僅為建議性的：線程無法中斷，超時任務
+                繼續佔用工作者並計入max_in_flight窗口，直到自行結束
+            ordered: True按輸入順序產出，False按完成順序產出
+            max_in_flight: 已提交但尚未產出的文件數上限（含超時後仍在運行的線程任務），
+                限制內存佔用，默認為工作者數的4倍
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        max_in_flight = max(1, max_in_flight or max_workers * 4)
+        
+        thread_pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            process_pool, started_queue = _create_parse_process_pool(max_workers)
+        except (OSError, NotImplementedError) as e:
+            print(f"進程池不可用，改用線程池: {e}")
+            process_pool, started_queue = None, None
+        
+        sources = iter(file_paths)
+        exhausted = False
+        next_index = 0
+        next_yield = 0
+        pending = {}
+        finished = {}
+        # 每次提交的編號及工作者開始處理的時間（time.time()），進程任務通過started_queue回報
+        tokens = {}
+        started = {}
+        token_counter = itertools.count()
+        # 已超時但仍在運行的線程任務
+        abandoned = set()
+        # 等待主機並發名額的URL
+        deferred = []
+        
+        def run_in_thread(token, func, *args):
+            started[token] = time.time()
+            return func(*args)
+        
+        def submit(index, source, kind):
+            token = next(token_counter)
+            if kind == 'process':
+                future = process_pool.submit(_parse_in_worker, source, token)
+            elif kind == 'url':
+                future = thread_pool.submit(run_in_thread, token, self.parse_url, source, True, True)
+            else:
+                future = thread_pool.submit(run_in_thread, token, self.parse_file, source)
+            pending[future] = (index, source, kind)
+            tokens[future] = token
+        
+        def forget(future):
+            started.pop(tokens.pop(future, None), None)
+            return pending.pop(future)
+        
+        try:
+            while True:
+                # 在窗口內提交新任務
+                while not exhausted and next_index - next_yield + len(abandoned) < max_in_flight:
+                    try:
+                        source = next(sources)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if process_pool is not None and not _is_url(source) and \
+                            Path(source).suffix.lower().lstrip('.') in PROCESS_POOL_FORMATS:
+                        submit(next_index, source, 'process')
+                    elif _is_url(source):
+                        deferred.append((next_index, source))
+                    else:
+                        submit(next_index, source, 'thread')
+                    next_index += 1
+                
+                # URL在主機有空閒名額時才提交，已滿的主機排隊等待，不佔住工作線程；
+                # 線程池共用當前解析器，URL抓取共享連接池
+                if deferred:
+                    fetcher = self.get_url_fetcher()
+                    waiting = []
+                    for index, source in deferred:
+                        if fetcher.try_acquire(source):
+                            submit(index, source, 'url')
+                        else:
+                            waiting.append((index, source))
+                    deferred = waiting
+                
+                if not pending and not finished and not deferred:
+                    if exhausted:
+                        break
+                    if not abandoned:
+                        continue
+                
+                if pending or abandoned or deferred:
+                    # 有排隊的URL時定期重試（名額可能被其他調用方佔用）
+                    poll = 0.05 if deferred else (0.5 if timeout else None)
+                    done, _ = wait(list(pending) + list(abandoned), timeout=poll,
+                                   return_when=FIRST_COMPLETED)
+                    
+                    for future in done:
+                        if future in abandoned:
+                            abandoned.discard(future)
+                            continue
+                        index, source, _ = forget(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            print(f"解析文件 {source} 失敗: {e}")
+                            result = _error_result(source, e)
+                        finished[index] = (source, result)
+                    
+                    if timeout:
+                        _drain_started(started_queue, started)
+                        now = time.time()
+                        restart_process_pool = False
+                        for future in list(pending):
+                            start = started.get(tokens[future])
+                            if start is not None and not future.done() and now - start > timeout:
+                                index, source, kind = forget(future)
+                                print(f"解析文件 {source} 超時")
+                                finished[index] = (source, _error_result(
+                                    source, TimeoutError(f"解析超時 ({timeout} 秒)")))
+                                if kind == 'process':
+                                    restart_process_pool = True
+                                else:
+                                    abandoned.add(future)
+                        
+                        if restart_process_pool:
+                            # 卡住的工作進程無法單獨中斷：終止整個進程池後重建，
+                            # 重新提交其餘未完成的進程任務
+                            unfinished = [f for f, item in pending.items()
+                                          if item[2] == 'process' and not f.done()]
+                            _terminate_process_pool(process_pool, started_queue)
+                            process_pool, started_queue = _create_parse_process_pool(max_workers)
+                            for future in unfinished:
+                                submit(*forget(future))
+                
+                # 產出結果
+                if ordered:
+                    while next_yield in finished:
+                        yield finished.pop(next_yield)
+                        next_yield += 1
+                else:
+                    for index in sorted(finished):
+                        yield finished.pop(index)
+                        next_yield += 1
+        finally:
+            for future, (_, source, kind) in pending.items():
+                # 未開始的URL任務歸還已佔用的主機名額
+                if future.cancel() and kind == 'url':
+                    self.get_url_fetcher().release(source)
+            thread_pool.shutdown(wait=False, cancel_futures=True)
+            if process_pool is not None:
+                if any(kind == 'process' and not future.done() for future, (_, _, kind) in pending.items()):
+                    # 提前關閉時回收仍在運行的工作進程，避免退出時等待
+                    _terminate_process_pool(process_pool, started_queue)
+                else:
+                    process_pool.shutdown(wait=False, cancel_futures=True)
+                    _close_queue(started_queue)
+    
     def get_supported_extensions(self):
         """獲取支持的文件擴展名列表"""
         return list(self.supported_formats.keys())
@@ -450,4 +819,425 @@ class ExtendedFileParser:
     def is_supported(self, file_path):
         """檢查文件是否支持"""
         extension = Path(file_path).suffix.lower().lstrip('.')
-        return extension in self.supported_formats 
\ No newline at end of file
+        extension = EXTENSION_ALIASES.get(extension, extension)
+        return extension in self.supported_formats 
+
+
+def _zip_document_type(file_path):
+    """ZIP容器中有word/目錄時為Word文檔（docx），否則為不支持的zip"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            if any(name.startswith('word/') for name in archive.namelist()):
+                return 'docx'
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"讀取ZIP目錄失敗: {e}")
+    return 'zip'
+
+
+def _is_url(source):
+    """是否為http(s) URL"""
+    return isinstance(source, str) and source.startswith(('http://', 'https://'))
+
+
+def _error_result(file_path, error):
+    """解析失敗時的結果"""
+    return {
+        'content': '',
+        'metadata': {
+            'error': str(error),
+            'file_path': file_path
+        }
+    }
+
+
+def _create_parse_process_pool(max_workers):
+    """創建解析進程池及工作者回報開始時間的隊列；每個池使用自己的隊列，終止池後隊列隨之丟棄"""
+    started_queue = mp.Queue()
+    pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_parse_worker,
+                               initargs=(started_queue,))
+    return pool, started_queue
+
+
+def _drain_started(started_queue, started):
+    """讀取工作進程回報的 (提交編號, 開始時間)"""
+    if started_queue is None:
+        return
+    while True:
+        try:
+            token, start = started_queue.get_nowait()
+        except (queue.Empty, OSError, ValueError):
+            return
+        started[token] = start
+
+
+def _close_queue(started_queue):
+    """關閉隊列，不等待後台寫入線程（退出時不阻塞）"""
+    if started_queue is not None:
+        started_queue.close()
+        started_queue.cancel_join_thread()
+
+
+def _terminate_process_pool(pool, started_queue=None):
+    """終止進程池的全部工作進程，回收卡住的工作者"""
+    if hasattr(pool, 'terminate_workers'):
+        pool.terminate_workers()
+    else:
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join(timeout=1)
+    # 被終止的進程可能正在寫入隊列，隊列不再使用
+    _close_queue(started_queue)
+
+
+# 每個工作進程/線程共用的解析器，避免重複初始化
+_worker_parser = None
+
+
+# 工作進程回報任務開始時間的隊列（iter_parse_files據此計算超時）
+_worker_started_queue = None
+
+
+def _init_parse_worker(started_queue=None):
+    """工作進程初始化"""
+    global _worker_parser, _worker_started_queue
+    _worker_parser = ExtendedFileParser(verbose=False)
+    _worker_started_queue = started_queue
+
+
+def _parse_in_worker(source, token=None):
+    """在工作者中解析單個文件，token不為None時先回報開始時間"""
+    global _worker_parser
+    if _worker_started_queue is not None and token is not None:
+        _worker_started_queue.put((token, time.time()))
+    if _worker_parser is None:
+        _worker_parser = ExtendedFileParser(verbose=False)
+    return _worker_parser.parse_source(source)
+
+
+def _can_start_processes():
+    """當前進程能否再創建進程池：守護進程（multiprocessing.Pool的工作進程）不能創建子進程，
+    其他工作進程中再開進程池會使進程數成倍增長"""
+    return not mp.current_process().daemon and mp.parent_process() is None
+
+
+def _pdf_page_count(file_path):
+    """獲取PDF頁數"""
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"pdfplumber讀取頁數失敗，嘗試PyPDF2: {e}")
+    try:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        raise ValueError(f"PDF解析失敗: {e}")
+
+
+def _resolve_page_range(page_range, total_pages):
+    """將頁碼範圍 (start, end) 轉換為頁碼列表"""
+    if page_range is None:
+        return list(range(1, total_pages + 1))
+    start, end = page_range
+    start = max(1, start or 1)
+    end = min(total_pages, end or total_pages)
+    return list(range(start, end + 1))
+
+
+def _extract_pdf_pages(file_path, page_numbers):
+    """逐頁提取文本：優先pdfplumber，單頁失敗時只對該頁使用PyPDF2"""
+    plumber_doc = None
+    fallback_reader = None
+    fallback_file = None
+    fallback_unavailable = False
+    
+    try:
+        try:
+            plumber_doc = pdfplumber.open(file_path)
+        except Exception as e:
+            print(f"pdfplumber打開失敗，改用PyPDF2: {e}")
+        
+        for page_number in page_numbers:
+            text = None
+            parser = None
+            
+            if plumber_doc is not None:
+                try:
+                    text = plumber_doc.pages[page_number - 1].extract_text() or ''
+                    parser = 'pdfplumber'
+                except Exception as e:
+                    print(f"pdfplumber解析第 {page_number} 頁失敗，嘗試PyPDF2: {e}")
+            
+            if parser is None and not fallback_unavailable:
+                try:
+                    if fallback_reader is None:
+                        fallback_file = open(file_path, 'rb')
+                        fallback_reader = PyPDF2.PdfReader(fallback_file)
+                    text = fallback_reader.pages[page_number - 1].extract_text() or ''
+                    parser = 'PyPDF2'
+                except Exception as e:
+                    print(f"PyPDF2解析第 {page_number} 頁失敗: {e}")
+                    # 無法打開文檔時不再對後續頁面重試
+                    fallback_unavailable = fallback_reader is None
+            
+            text = text or ''
+            
+            yield {'page': page_number, 'text': text.strip(), 'parser': parser}
+    finally:
+        if plumber_doc is not None:
+            plumber_doc.close()
+        if fallback_file is not None:
+            fallback_file.close()
+
+
+def _extract_pdf_page_chunk(file_path, page_numbers):
+    """在工作進程中提取一個頁塊"""
+    return list(_extract_pdf_pages(file_path, page_numbers))
+
+
+class _CSVRecordIterator:
+    """CSV記錄迭代器：採樣確定文本列後流式讀取其餘行"""
+    
+    def __init__(self, source, text_columns=None, sample_rows=RECORD_SAMPLE_SIZE):
+        # source可以是文件路徑或已打開的文本文件對象
+        if hasattr(source, 'read'):
+            self._file = source
+        else:
+            # 與load_text_stream一致：採樣檢測的編碼遇到後面的無效字節時替換，不中斷讀取
+            encoding = detect_file_encoding(source)
+            self._file = open(source, 'r', encoding=encoding, errors='replace', newline='')
+        self._reader = csv.DictReader(self._file)
+        self._sample = []
+        self._index = 0
+        
+        if text_columns:
+            self.text_columns = list(text_columns)
+        else:
+            for row in self._reader:
+                self._sample.append(row)
+                if len(self._sample) >= sample_rows:
+                    break
+            self.text_columns = _pick_text_columns(self._reader.fieldnames or [], self._sample)
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._sample:
+            row = self._sample.pop(0)
+        else:
+            try:
+                row = next(self._reader)
+            except StopIteration:
+                self.close()
+                raise
+        
+        record = {
+            'index': self._index,
+            'text': ' '.join((row.get(column) or '').strip() for column in self.text_columns).strip(),
+            'record': row
+        }
+        self._index += 1
+        return record
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def _pick_text_columns(fieldnames, rows):
+    """選擇文本列：非數字且平均長度較長，或包含中文的列"""
+    columns = []
+    for column in fieldnames:
+        values = [(row.get(column) or '').strip() for row in rows]
+        values = [value for value in values if value]
+        if not values:
+            continue
+        
+        numeric = 0
+        for value in values:
+            try:
+                float(value.replace(',', ''))
+                numeric += 1
+            except ValueError:
+                pass
+        if numeric / len(values) > 0.5:
+            continue
+        
+        has_chinese = any('\u4e00' <= char <= '\u9fff' for value in values for char in value)
+        avg_length = sum(len(value) for value in values) / len(values)
+        if has_chinese or avg_length >= 20:
+            columns.append(column)
+    
+    # 沒有明顯的文本列時使用所有列
+    return columns or list(fieldnames)
+
+
+def _peek_non_whitespace(f):
+    """讀取第一個非空白字符後將文件位置復原"""
+    position = f.tell()
+    while True:
+        char = f.read(1)
+        if not char or not char.isspace() and char != '\ufeff':
+            f.seek(position)
+            return char
+
+
+def _iter_json_records(f, text_fields=None):
+    first = _peek_non_whitespace(f)
+    if first == '[':
+        values = _iter_json_array(f)
+    else:
+        values = _iter_json_lines(f)
+    
+    for index, value in enumerate(values):
+        yield {
+            'index': index,
+            'text': _extract_json_text(value, text_fields),
+            'record': value
+        }
+
+
+def _iter_json_array(f):
+    """增量解碼頂層JSON數組的元素"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    
+    def read_more():
+        nonlocal buffer, position, eof
+        chunk = f.read(JSON_READ_SIZE)
+        if not chunk:
+            eof = True
+        # 丟棄已解碼的部分，緩衝區只保留當前元素
+        buffer = buffer[position:] + chunk
+        position = 0
+    
+    while True:
+        # 跳過空白和分隔符
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] in ',\ufeff'):
+            position += 1
+        
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("JSON數組未正確結束")
+            read_more()
+            continue
+        
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError("JSON頂層不是數組")
+            started = True
+            position += 1
+            continue
+        
+        if buffer[position] == ']':
+            return
+        
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise ValueError("JSON數組格式錯誤")
+            read_more()
+            continue
+        
+        if end == len(buffer) and not eof:
+            # 數字等標量可能在緩衝區末尾被截斷，讀取更多後重新解碼
+            read_more()
+            continue
+        
+        yield value
+        position = end
+
+
+def _iter_json_lines(f):
+    """逐行解碼JSON Lines；第一條記錄無法解碼時整體讀取為單個JSON值"""
+    position = f.tell()
+    first_line = True
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError:
+            if not first_line:
+                raise
+            f.seek(position)
+            data = json.load(f)
+            if isinstance(data, list):
+                yield from data
+            else:
+                yield data
+            return
+        first_line = False
+        yield value
+
+
+def _extract_json_text(value, text_fields=None):
+    """提取JSON值中的文本"""
+    if text_fields:
+        parts = []
+        for field in text_fields:
+            current = value
+            for key in field.split('.'):
+                current = current.get(key) if isinstance(current, dict) else None
+            if current is not None:
+                parts.append(current if isinstance(current, str) else _extract_json_text(current))
+        return ' '.join(part for part in parts if part).strip()
+    
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        value = value.values()
+    if isinstance(value, (list, tuple)) or hasattr(value, '__iter__'):
+        return ' '.join(part for part in (_extract_json_text(item) for item in value) if part)
+    return ''
+
+
+def _strip_markdown(content):
+    """簡單的Markdown標記清理"""
+    import re
+    
+    # 移除標題標記
+    content = re.sub(r'^#+\s*', '', content, flags=re.MULTILINE)
+    
+    # 移除鏈接語法，保留文本
+    content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)
+    
+    # 移除圖片語法
+    content = re.sub(r'!\[([^\]]*)\]\([^\)]+\)', r'\1', content)
+    
+    # 移除粗體和斜體標記
+    content = re.sub(r'\*\*([^\*]+)\*\*', r'\1', content)
+    content = re.sub(r'\*([^\*]+)\*', r'\1', content)
+    
+    # 移除代碼塊
+    content = re.sub(r'```[\s\S]*?```', '', content)
+    content = re.sub(r'`([^`]+)`', r'\1', content)
+    
+    return content.strip()
+
+
+class _PrefixedStream:
+    """在已讀取的文件頭之後接上原始字節流，供嗅探類型後繼續順序讀取"""
+    
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+    
+    def read(self, size=-1):
+        if self._prefix:
+            if size is None or size < 0:
+                data, self._prefix = self._prefix + self._stream.read(), b''
+                return data
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+            return data
+        return self._stream.read(size)
@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
 import os
+import sys
 import json
 import csv
 import shutil
+import fnmatch
+import hashlib
+
+# Add the project root to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.text_loader import load_text, detect_file_encoding
+from src.utils.columnar_export import COLUMNAR_FORMATS, export_document_tables
 
 class FileUtils:
     @staticmethod
-    def read_file(file_path, encoding='utf-8'):
-        """讀取文本文件"""
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                return f.read()
-        except UnicodeDecodeError:
-            with open(file_path, 'r', encoding='gbk') as f:
-                return f.read()
+    def read_file(file_path, encoding=None):
+        """讀取文本文件（未指定編碼時自動檢測）"""
+        text, _ = load_text(file_path, encoding)
+        return text
     
     @staticmethod
     def save_results(results, output_path):
@@ -44,7 +48,7 @@ class FileUtils:
                 writer.writerow([])
                 writer.writerow(['Metric', 'Value'])
                 for key, value in results.items():
-                    if key not in ['word_frequency', 'pos_frequency', 'pos_word_mapping']:
+                    if key not in ['word_frequency', 'pos_frequency', 'pos_word_mapping', 'cooccurrence']:
                         writer.writerow([key, value])
             
             return True
@@ -121,7 +125,8 @@ class FileUtils:
         Args:
             results: 分析結果字典
             output_path: 輸出文件路徑（不包含擴展名）
-            formats: 導出格式列表，例如 ['json', 'csv', 'excel']
+            formats: 導出格式列表，例如 ['json', 'csv', 'excel']；parquet、arrow、jsonl（壓縮的JSON Lines）
+                將詞頻、詞性和命名實體追加到輸出目錄下的語料庫表（tables/）中，文檔ID為輸出文件名
         """
         if formats is None:
             formats = ['json']
@@ -147,6 +152,8 @@ class FileUtils:
             elif fmt == 'excel':
                 excel_path = f"{output_path}.xlsx"
                 success['excel'] = FileUtils.save_results_as_excel(results, excel_path)
+            elif fmt in COLUMNAR_FORMATS:
+                success[fmt] = export_document_tables(results, output_path, fmt)
         
         return success
     
@@ -161,15 +168,9 @@ class FileUtils:
     
     @staticmethod
     def get_file_encoding(file_path):
-        """檢測文件編碼"""
+        """檢測文件編碼（只讀取文件開頭的樣本）"""
         try:
-            import chardet
-            with open(file_path, 'rb') as f:
-                result = chardet.detect(f.read())
-            return result['encoding']
-        except ImportError:
-            print("檢測編碼需要安裝chardet: pip install chardet")
-            return None
+            return detect_file_encoding(file_path)
         except Exception as e:
             print(f"檢測文件編碼時出錯: {e}")
             return None
@@ -177,5 +178,67 @@ class FileUtils:
     @staticmethod
     def get_file_list(folder_path, extensions=['.txt', '.csv']):
         """獲取文件夾中指定擴展名的文件列表"""
-        return [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                if os.path.splitext(f)[1].lower() in extensions]
\ No newline at end of file
+        return list(FileUtils.iter_files(folder_path, extensions=extensions, recursive=False))
+    
+    @staticmethod
+    def iter_files(root, extensions=None, include=None, exclude=None, recursive=True, shard=None):
+        """逐個產出目錄中的文件路徑（使用os.scandir，不預先構建完整列表）
+        
+        Args:
+            root: 根目錄
+            extensions: 擴展名列表，例如 ['.txt', '.md']，None表示不限
+            include: glob模式列表，文件的相對路徑或文件名匹配其一才產出
+            exclude: glob模式列表，匹配的文件或目錄（及其子目錄）被跳過
+            recursive: 是否遞歸子目錄
+            shard: (index, count)，按相對路徑哈希把文件確定性地分配到count個分片，只產出第index個
+        """
+        if extensions:
+            extensions = {ext.lower() if ext.startswith('.') else f'.{ext.lower()}' for ext in extensions}
+        if shard:
+            shard_index, shard_count = shard
+            if not 0 <= shard_index < shard_count:
+                raise ValueError(f"無效的分片: {shard_index}/{shard_count}")
+        
+        def matches(patterns, rel_path, name):
+            return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern)
+                       for pattern in patterns)
+        
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(root, rel_dir)) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                print(f"無法讀取目錄 {os.path.join(root, rel_dir)}: {e}")
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if exclude and matches(exclude, rel_path, entry.name):
+                    continue
+                
+                try:
+                    if entry.is_dir():
+                        if recursive:
+                            subdirs.append(rel_path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                
+                if extensions and os.path.splitext(entry.name)[1].lower() not in extensions:
+                    continue
+                if include and not matches(include, rel_path, entry.name):
+                    continue
+                if shard:
+                    digest = hashlib.md5(rel_path.encode('utf-8')).digest()
+                    if int.from_bytes(digest[:8], 'big') % shard_count != shard_index:
+                        continue
+                
+                yield entry.path
+            
+            # 按名稱順序深度優先遍歷子目錄
+            stack.extend(reversed(subdirs))
\ No newline at end of file
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+HTML Text Extractor
+流式HTML文本提取：基於HTMLParser逐標籤處理，不構建DOM樹；跳過腳本樣式，識別導航等模板內容並檢測正文
+"""
+
+import re
+from html.parser import HTMLParser
+
+# 內容完全跳過的標籤
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object', 'canvas', 'select'}
+
+# 模板區域標籤（導航、頁腳、側欄等）；不含form：不少ASP.NET/CMS頁面用<form>包裹整個頁面
+BOILERPLATE_TAGS = {'nav', 'footer', 'aside', 'menu'}
+
+# 正文容器標籤
+MAIN_TAGS = {'article', 'main'}
+
+# 塊級標籤：開始和結束時切分文本塊
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'tr', 'td', 'th', 'table',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'main', 'header',
+    'footer', 'nav', 'aside', 'blockquote', 'pre', 'figure', 'figcaption', 'hr', 'title', 'body'
+}
+
+# 沒有結束標籤的空元素
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+             'source', 'track', 'wbr'}
+
+# class/id中表示模板或正文的關鍵詞
+BOILERPLATE_PATTERN = re.compile(
+    r'(^|[\s_-])(nav|navbar|menu|footer|sidebar|side-bar|breadcrumb|comment|share|social|'
+    r'advert|ads?|banner|related|recommend|copyright|login|toolbar|pagination)([\s_-]|$)',
+    re.IGNORECASE
+)
+MAIN_PATTERN = re.compile(
+    r'(^|[\s_-])(article|content|post|entry|main|story|text|body)([\s_-]|$)',
+    re.IGNORECASE
+)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 正文檢測：鏈接文本佔比超過此值的塊視為導航
+# 不按長度過濾：中文詩詞、對話等正文常由很短的段落組成
+MAX_LINK_DENSITY = 0.5
+
+
+class _Block:
+    """文本塊"""
+    __slots__ = ('parts', 'link_length', 'in_main', 'in_boilerplate')
+
+    def __init__(self, in_main, in_boilerplate):
+        self.parts = []
+        self.link_length = 0
+        self.in_main = in_main
+        self.in_boilerplate = in_boilerplate
+
+    @property
+    def text(self):
+        return WHITESPACE_PATTERN.sub(' ', ''.join(self.parts)).strip()
+
+
+class HTMLTextExtractor(HTMLParser):
+    """HTML文本提取器
+
+    逐標籤維護上下文（跳過、模板、正文、鏈接），把可見文本切分為塊
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.blocks = []
+        self._stack = []
+        self._skip_depth = 0
+        # 嵌套的模板/正文區域，最內層決定文本塊是否為模板（True）
+        self._regions = []
+        self._main_depth = 0
+        self._link_depth = 0
+        self._in_title = False
+        self._title_parts = []
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._end_block()
+            return
+
+        hints = ' '.join(value for name, value in attrs if name in ('class', 'id', 'role') and value)
+        is_skip = tag in SKIP_TAGS
+        is_boilerplate = tag in BOILERPLATE_TAGS or bool(hints and BOILERPLATE_PATTERN.search(hints))
+        is_main = tag in MAIN_TAGS or bool(hints and MAIN_PATTERN.search(hints)) or \
+            any(name == 'itemprop' and value == 'articleBody' for name, value in attrs)
+        # 同時命中兩種提示時（例如class="main-nav"），只有article/main標籤按正文處理
+        if is_main and is_boilerplate:
+            if tag in MAIN_TAGS:
+                is_boilerplate = False
+            else:
+                is_main = False
+
+        self._stack.append((tag, is_skip, is_boilerplate, is_main))
+        self._skip_depth += is_skip
+        if is_boilerplate or is_main:
+            self._regions.append(is_boilerplate)
+        self._main_depth += is_main
+        if tag == 'a':
+            self._link_depth += 1
+        if tag == 'title':
+            self._in_title = True
+
+        if tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        # 容錯：彈出到匹配的開始標籤，未匹配的結束標籤忽略
+        if not any(open_tag == tag for open_tag, *_ in self._stack):
+            return
+        while self._stack:
+            open_tag, is_skip, is_boilerplate, is_main = self._stack.pop()
+            self._skip_depth -= is_skip
+            if is_boilerplate or is_main:
+                self._regions.pop()
+            self._main_depth -= is_main
+            if open_tag == 'a':
+                self._link_depth -= 1
+            if open_tag == 'title':
+                self._in_title = False
+                self.title = WHITESPACE_PATTERN.sub(' ', ''.join(self._title_parts)).strip() or None
+            if open_tag in BLOCK_TAGS:
+                self._end_block()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip_depth:
+            return
+        if self._current is None:
+            if not data.strip():
+                return
+            # 正文容器可覆蓋外層的模板區域，正文中嵌套的導航仍按模板處理
+            self._current = _Block(self._main_depth > 0, bool(self._regions) and self._regions[-1])
+        self._current.parts.append(data)
+        if self._link_depth:
+            self._current.link_length += len(data.strip())
+
+    def _end_block(self):
+        if self._current is not None:
+            self.blocks.append(self._current)
+            self._current = None
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+
+def _is_content_block(block, text):
+    """判斷塊是否為正文：非模板且鏈接佔比低，短塊同樣保留"""
+    if block.in_boilerplate:
+        return False
+    return not text or block.link_length / len(text) <= MAX_LINK_DENSITY
+
+
+def extract_text(html, main_content=True):
+    """從HTML提取文本
+
+    Args:
+        html: HTML字符串
+        main_content: True時去除導航、頁腳等模板內容並優先使用正文容器（article/main等）；
+            檢測不到正文時回退到全部可見文本
+
+    Returns:
+        {'title', 'content', 'main_content_detected'}
+    """
+    extractor = HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+
+    blocks = [(block, block.text) for block in extractor.blocks]
+    blocks = [(block, text) for block, text in blocks if text]
+    all_text = [text for _, text in blocks]
+
+    selected = []
+    if main_content:
+        main_blocks = [(block, text) for block, text in blocks if block.in_main]
+        candidates = main_blocks if any(_is_content_block(block, text) for block, text in main_blocks) else blocks
+        selected = [text for block, text in candidates if _is_content_block(block, text)]
+
+    detected = bool(selected)
+    content = '\n'.join(selected if detected else all_text)
+
+    return {
+        'title': extractor.title,
+        'content': content,
+        'main_content_detected': detected
+    }
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis Manifest
+增量分析清單：在輸出目錄中用SQLite記錄已分析文件（路徑、大小、修改時間、內容哈希）和詞典/停用詞指紋，
+重新運行時跳過未變更的文件，並增量更新語料庫級匯總
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+MANIFEST_FILENAME = '.analysis_manifest.sqlite3'
+CORPUS_SUMMARY_FILENAME = 'corpus_summary.json'
+
+# 清單結構或分析結果格式變化時遞增，使舊清單失效
+MANIFEST_VERSION = 1
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """計算文件內容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_config_fingerprint(analyzer) -> str:
+    """根據分析器使用的詞典、停用詞和情感詞典內容計算指紋"""
+    digest = hashlib.sha256(f"v{MANIFEST_VERSION}".encode('utf-8'))
+    resource_paths = [
+        analyzer.custom_dict_path,
+        analyzer.stopwords_path,
+        os.path.join(analyzer.resources_path, 'positive_words.txt'),
+        os.path.join(analyzer.resources_path, 'negative_words.txt'),
+    ]
+    for path in resource_paths:
+        digest.update(b'\0')
+        if path and os.path.exists(path):
+            digest.update(file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+class AnalysisManifest:
+    """已分析文件清單
+
+    Args:
+        output_dir: 輸出目錄，清單文件保存在其中
+        fingerprint: 分析配置指紋；與清單記錄不同的文件都會重新分析
+    """
+
+    def __init__(self, output_dir: str, fingerprint: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.fingerprint = fingerprint
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                output_base TEXT,
+                total_words INTEGER NOT NULL DEFAULT 0,
+                word_frequency TEXT NOT NULL DEFAULT '{}',
+                analyzed_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS corpus_words (
+                word TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+        ''')
+        # 本次運行中已計算的文件狀態，記錄結果時復用，避免重複計算哈希
+        self._pending = {}
+
+    def needs_analysis(self, file_path: str) -> bool:
+        """文件是否需要（重新）分析
+
+        大小和修改時間都未變時直接跳過；否則比較內容哈希，內容未變時只更新時間戳
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, sha256, fingerprint FROM files WHERE path = ?', (file_path,)
+        ).fetchone()
+
+        if row and row[3] == self.fingerprint and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return False
+
+        sha256 = file_sha256(file_path)
+        if row and row[3] == self.fingerprint and row[2] == sha256:
+            self.conn.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?',
+                              (stat.st_size, stat.st_mtime_ns, file_path))
+            self.conn.commit()
+            return False
+
+        self._pending[file_path] = (stat.st_size, stat.st_mtime_ns, sha256)
+        return True
+
+    def filter_changed(self, file_paths: Iterable[str]) -> List[str]:
+        """返回需要分析的文件"""
+        return [path for path in file_paths if self.needs_analysis(path)]
+
+    def record(self, file_path: str, result: Dict, output_base: Optional[str] = None):
+        """記錄文件的分析結果，並增量更新語料庫詞頻"""
+        file_path = os.path.abspath(file_path)
+        if 'error' in result:
+            # 失敗的文件不記錄，下次運行重試
+            self._pending.pop(file_path, None)
+            return
+
+        state = self._pending.pop(file_path, None)
+        if state is None:
+            stat = os.stat(file_path)
+            state = (stat.st_size, stat.st_mtime_ns, file_sha256(file_path))
+
+        word_frequency = result.get('word_frequency', {})
+        with self.conn:
+            self._subtract_corpus_words(file_path)
+            self.conn.executemany(
+                'INSERT INTO corpus_words (word, count) VALUES (?, ?) '
+                'ON CONFLICT(word) DO UPDATE SET count = count + excluded.count',
+                word_frequency.items()
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256, fingerprint, output_base, '
+                'total_words, word_frequency, analyzed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_path, state[0], state[1], state[2], self.fingerprint, output_base,
+                 result.get('total_words', 0), json.dumps(word_frequency, ensure_ascii=False),
+                 datetime.now().isoformat())
+            )
+
+    def prune(self, existing_paths: Iterable[str]) -> List[str]:
+        """移除磁盤上已不存在的文件記錄，返回被移除的路徑
+
+        existing_paths為本次掃描到的文件（無需再檢查）；不在其中的記錄只有文件確實被刪除才移除，
+        使用--include/--exclude/--extensions過濾或分片運行時，未掃描到的文件記錄得以保留
+        """
+        existing = {os.path.abspath(path) for path in existing_paths}
+        removed = [path for (path,) in self.conn.execute('SELECT path FROM files')
+                   if path not in existing and not os.path.exists(path)]
+        with self.conn:
+            for path in removed:
+                self._subtract_corpus_words(path)
+                self.conn.execute('DELETE FROM files WHERE path = ?', (path,))
+        return removed
+
+    def _subtract_corpus_words(self, file_path: str):
+        """從語料庫詞頻中減去文件舊結果的貢獻"""
+        row = self.conn.execute('SELECT word_frequency FROM files WHERE path = ?', (file_path,)).fetchone()
+        if not row:
+            return
+        old_frequency = json.loads(row[0])
+        self.conn.executemany('UPDATE corpus_words SET count = count - ? WHERE word = ?',
+                              [(count, word) for word, count in old_frequency.items()])
+        self.conn.execute('DELETE FROM corpus_words WHERE count <= 0')
+
+    def corpus_summary(self, top_n: int = 200) -> Dict:
+        """語料庫級匯總"""
+        files_count, total_words = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(total_words), 0) FROM files'
+        ).fetchone()
+        vocabulary_size = self.conn.execute('SELECT COUNT(*) FROM corpus_words').fetchone()[0]
+        top_words = self.conn.execute(
+            'SELECT word, count FROM corpus_words ORDER BY count DESC, word LIMIT ?', (top_n,)
+        ).fetchall()
+        return {
+            'files_count': files_count,
+            'total_words': total_words,
+            'vocabulary_size': vocabulary_size,
+            'word_frequency': dict(top_words),
+            'fingerprint': self.fingerprint,
+            'updated_at': datetime.now().isoformat()
+        }
+
+    def write_corpus_summary(self, top_n: int = 200) -> str:
+        """將語料庫匯總寫入輸出目錄，返回文件路徑"""
+        summary_path = os.path.join(self.output_dir, CORPUS_SUMMARY_FILENAME)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.corpus_summary(top_n), f, ensure_ascii=False, indent=2)
+        return summary_path
+
+    def close(self):
+        self.conn.close()
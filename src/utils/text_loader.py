@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Text Loader
+文本文件載入：只讀取一次文件字節，基於有限樣本檢測編碼（BOM、UTF-8、GB18030、Big5），只解碼一次
+"""
+
+import os
+import mmap
+import codecs
+
+try:
+    import chardet
+    CHARDET_AVAILABLE = True
+except ImportError:
+    CHARDET_AVAILABLE = False
+
+# 編碼檢測的樣本大小
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+# 從字節流增量解碼時每次讀取的塊大小
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# 超過此大小的文件使用mmap讀取，避免額外的緩衝區複製
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# 按順序檢查的BOM（UTF-32需在UTF-16之前檢查）
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# 簡繁體常用字，用於區分GB18030和Big5（兩者常可互相「成功」解碼，但只有正確的編碼會產生大量常用字）
+COMMON_HANZI = set(
+    "的一是不了在人有我他这這个個们們中来來上大为為和国國地到以说說时時要就出会會可也你对對生能而子"
+    "那得于於着著下自之年过過发發后後作里裡用道行所然家种種事成方多经經么麼去法学學如都同现現当當没沒"
+    "动動面起看定天分还還进進好小部其些主样樣理心她本前开開但因只从從想实實日者意无無力与與长長把机機"
+)
+
+# 候選中文多字節編碼
+CJK_CANDIDATES = ['gb18030', 'big5']
+
+
+def _decodes(sample, encoding):
+    """樣本能否用指定編碼解碼（允許樣本末尾截斷的多字節字符）"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        return decoder.decode(sample, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+def detect_encoding(sample):
+    """根據字節樣本檢測編碼"""
+    sample = bytes(sample)
+
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    if not sample:
+        return 'utf-8'
+
+    # UTF-8（包括純ASCII）
+    if _decodes(sample, 'utf-8') is not None:
+        return 'utf-8'
+
+    if CHARDET_AVAILABLE:
+        try:
+            guess = (chardet.detect(sample).get('encoding') or '').lower()
+            if guess in ('gb2312', 'gbk', 'gb18030'):
+                return 'gb18030'
+            if guess in ('big5', 'big5hkscs', 'cp950'):
+                return 'big5'
+        except Exception as e:
+            print(f"chardet檢測編碼失敗: {e}")
+
+    # 比較候選編碼解碼後的常用字數量
+    best_encoding = None
+    best_score = -1
+    for encoding in CJK_CANDIDATES:
+        decoded = _decodes(sample, encoding)
+        if decoded is None:
+            continue
+        score = sum(1 for char in decoded if char in COMMON_HANZI)
+        if score > best_score:
+            best_encoding, best_score = encoding, score
+
+    return best_encoding or 'latin-1'
+
+
+def decode_bytes(data, encoding=None, sample_size=DEFAULT_SAMPLE_SIZE):
+    """解碼字節數據，返回 (文本, 實際使用的編碼)
+
+    data可以是bytes或任何支持緩衝區協議的對象（例如mmap）
+    """
+    if encoding is None:
+        encoding = detect_encoding(data[:sample_size])
+
+    try:
+        return str(data, encoding), encoding
+    except (UnicodeDecodeError, LookupError) as e:
+        # 樣本之後出現無效字節時才會走到這裡
+        print(f"使用 {encoding} 解碼失敗，嘗試其他編碼: {e}")
+
+    for fallback in ['utf-8', 'gb18030', 'big5']:
+        if fallback == encoding:
+            continue
+        try:
+            return str(data, fallback), fallback
+        except UnicodeDecodeError:
+            continue
+
+    return str(data, 'latin-1'), 'latin-1'
+
+
+def load_text(file_path, encoding=None, sample_size=DEFAULT_SAMPLE_SIZE):
+    """讀取文本文件，返回 (文本, 實際使用的編碼)
+
+    文件只讀取一次：大文件使用mmap，編碼檢測只使用開頭的樣本
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return '', encoding or 'utf-8'
+
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return decode_bytes(mm, encoding, sample_size)
+
+        return decode_bytes(f.read(), encoding, sample_size)
+
+
+def detect_file_encoding(file_path, sample_size=DEFAULT_SAMPLE_SIZE):
+    """只讀取文件開頭的樣本檢測編碼"""
+    with open(file_path, 'rb') as f:
+        return detect_encoding(f.read(sample_size))
+
+
+def load_text_stream(stream, encoding=None, sample_size=DEFAULT_SAMPLE_SIZE, chunk_size=STREAM_CHUNK_SIZE):
+    """從字節流（例如上傳請求體）讀取文本，返回 (文本, 實際使用的編碼)
+
+    不落盤也不保留完整的字節數據：根據開頭的樣本檢測編碼後逐塊增量解碼。
+    流無法回退，樣本之後出現無效字節時以替換字符繼續解碼
+    """
+    sample = bytearray()
+    while len(sample) < sample_size:
+        chunk = stream.read(sample_size - len(sample))
+        if not chunk:
+            break
+        sample.extend(chunk)
+
+    if encoding is None:
+        encoding = detect_encoding(sample)
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parts = []
+    chunk = bytes(sample)
+    while chunk:
+        # 上一塊末尾未解碼完的多字節字符
+        pending = decoder.getstate()[0]
+        try:
+            parts.append(decoder.decode(chunk))
+        except UnicodeDecodeError as e:
+            print(f"使用 {encoding} 解碼失敗，無效字節以替換字符代替: {e}")
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            parts.append(decoder.decode(pending + chunk))
+        chunk = stream.read(chunk_size)
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts), encoding
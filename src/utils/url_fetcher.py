@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+URL Fetcher
+網頁抓取：連接池複用、按主機限制並發、基於ETag/Last-Modified的磁盤緩存，響應內容只解碼一次
+"""
+
+import os
+import re
+import sys
+import json
+import codecs
+import hashlib
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.text_loader import decode_bytes
+
+DEFAULT_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'url_cache'
+)
+
+# 在HTML開頭查找<meta charset>聲明的字節數
+META_CHARSET_SCAN_SIZE = 4096
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-]+)', re.IGNORECASE)
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    text: str
+    encoding: str
+    content_type: str = 'unknown'
+    from_cache: bool = False
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class URLFetcher:
+    """URL抓取器
+
+    Args:
+        cache_dir: 響應緩存目錄，None表示不使用磁盤緩存
+        pool_size: 連接池大小
+        per_host_limit: 每個主機的最大並發請求數
+        timeout: 請求超時（秒）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, pool_size: int = 32,
+                 per_host_limit: int = 4, timeout: float = 30, user_agent: str = DEFAULT_USER_AGENT):
+        self.cache_dir = cache_dir
+        self.pool_size = pool_size
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = user_agent
+
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fetch(self, url: str, acquired: bool = False) -> FetchResult:
+        """抓取單個URL，緩存命中且未修改時使用緩存內容
+
+        acquired為True表示調用方已通過try_acquire佔用了該主機的並發名額，請求結束後釋放；
+        否則在名額可用前阻塞
+        """
+        semaphore = self._host_semaphore(url)
+        if not acquired:
+            semaphore.acquire()
+        try:
+            return self._fetch(url)
+        finally:
+            semaphore.release()
+
+    def _fetch(self, url: str) -> FetchResult:
+        """抓取單個URL（調用方已佔用主機並發名額）"""
+        cached = self._load_cache(url)
+        headers = {}
+        if cached:
+            meta = cached[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and cached:
+            meta, body = cached
+            text, encoding = decode_bytes(body, meta.get('encoding'))
+            return FetchResult(
+                url=url,
+                status_code=meta.get('status_code', 200),
+                text=text,
+                encoding=encoding,
+                content_type=meta.get('content_type', 'unknown'),
+                from_cache=True,
+                headers=meta.get('headers', {})
+            )
+
+        response.raise_for_status()
+
+        body = response.content
+        content_type = response.headers.get('content-type', 'unknown')
+        text, encoding = decode_bytes(body, self._declared_encoding(content_type, body))
+
+        if 'no-store' not in response.headers.get('cache-control', '').lower() and \
+                (response.headers.get('etag') or response.headers.get('last-modified')):
+            self._save_cache(url, {
+                'url': url,
+                'status_code': response.status_code,
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'content_type': content_type,
+                'encoding': encoding,
+                'headers': dict(response.headers)
+            }, body)
+
+        return FetchResult(
+            url=url,
+            status_code=response.status_code,
+            text=text,
+            encoding=encoding,
+            content_type=content_type,
+            headers=dict(response.headers)
+        )
+
+    def fetch_many(self, urls: Iterable[str], max_workers: Optional[int] = None,
+                   max_in_flight: Optional[int] = None) -> Iterator[Tuple[str, Union[FetchResult, Exception]]]:
+        """並發抓取多個URL，按完成順序產出 (url, 結果或異常)
+
+        總並發受max_workers限制，單個主機的並發受per_host_limit限制。按主機排隊調度：
+        只有主機有空閒名額時才提交到線程池，工作線程不會阻塞在已滿的主機上；
+        urls可以是生成器，已讀入但尚未產出的URL數不超過max_in_flight（默認為工作者數的4倍）
+        """
+        max_workers = max_workers or self.pool_size
+        max_in_flight = max(max_workers, max_in_flight or max_workers * 4)
+
+        sources = iter(urls)
+        exhausted = False
+        waiting = {}
+        waiting_count = 0
+        futures = {}
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while True:
+                while not exhausted and waiting_count + len(futures) < max_in_flight:
+                    try:
+                        url = next(sources)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    waiting.setdefault(self._host_key(url), deque()).append(url)
+                    waiting_count += 1
+
+                # 為有空閒名額的主機提交任務
+                for host in list(waiting):
+                    queue = waiting[host]
+                    while queue and len(futures) < max_workers and self.try_acquire(queue[0]):
+                        url = queue.popleft()
+                        waiting_count -= 1
+                        futures[executor.submit(self.fetch, url, True)] = url
+                    if not queue:
+                        del waiting[host]
+
+                if not futures and not waiting:
+                    break
+
+                # 名額可能被其他調用方佔用，有排隊的URL時定期重試
+                done, _ = wait(list(futures), timeout=0.05 if waiting else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    try:
+                        yield url, future.result()
+                    except Exception as e:
+                        yield url, e
+        finally:
+            for future, url in futures.items():
+                if future.cancel():
+                    self.release(url)
+            executor.shutdown(wait=False)
+
+    def try_acquire(self, url: str) -> bool:
+        """嘗試佔用URL所屬主機的一個並發名額，不阻塞；成功後用fetch(url, acquired=True)抓取"""
+        return self._host_semaphore(url).acquire(blocking=False)
+
+    def release(self, url: str):
+        """歸還try_acquire佔用但未用於抓取的名額"""
+        self._host_semaphore(url).release()
+
+    def close(self):
+        """關閉連接池"""
+        self.session.close()
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """獲取URL所屬主機的並發信號量"""
+        host = self._host_key(url)
+        with self._host_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        """按主機（含端口）區分並發限制"""
+        return urlsplit(url).netloc.lower()
+
+    @staticmethod
+    def _declared_encoding(content_type: str, body: bytes) -> Optional[str]:
+        """從Content-Type或HTML的<meta charset>獲取聲明的編碼，未聲明時返回None（由樣本檢測）"""
+        match = re.search(r'charset\s*=\s*["\']?([A-Za-z0-9_\-]+)', content_type or '', re.IGNORECASE)
+        if match:
+            return URLFetcher._normalize_encoding(match.group(1))
+
+        match = META_CHARSET_PATTERN.search(body[:META_CHARSET_SCAN_SIZE])
+        if match:
+            return URLFetcher._normalize_encoding(match.group(1).decode('ascii', 'ignore'))
+        return None
+
+    @staticmethod
+    def _normalize_encoding(encoding: str) -> Optional[str]:
+        """規範化編碼名稱，GB2312/GBK按超集GB18030解碼"""
+        encoding = encoding.lower()
+        if encoding in ('gb2312', 'gbk'):
+            return 'gb18030'
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            return None
+        return encoding
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        """緩存文件路徑（元數據, 響應體）"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, digest[:2])
+        return os.path.join(directory, f"{digest}.json"), os.path.join(directory, f"{digest}.body")
+
+    def _load_cache(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+        """讀取緩存條目"""
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            return meta, body
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"讀取URL緩存失敗: {e}")
+            return None
+
+    def _save_cache(self, url: str, meta: Dict, body: bytes):
+        """原子地寫入緩存條目"""
+        if not self.cache_dir:
+            return
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            # 先寫響應體再寫元數據，元數據存在即表示條目完整
+            for path, data, mode in [(body_path, body, 'wb'),
+                                     (meta_path, json.dumps(meta, ensure_ascii=False), 'w')]:
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                if mode == 'wb':
+                    with open(tmp_path, 'wb') as f:
+                        f.write(data)
+                else:
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        f.write(data)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"保存URL緩存失敗: {e}")
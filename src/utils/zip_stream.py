@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming ZIP
+流式ZIP打包：邊寫邊產出壓縮包字節（內存佔用與文件大小無關），已壓縮格式直接存儲不再deflate，
+並可同時寫入緩存文件，同一組文件再次下載時直接發送緩存
+"""
+
+import os
+import io
+import time
+import uuid
+import hashlib
+import zipfile
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# 讀取源文件的塊大小
+ZIP_CHUNK_SIZE = 256 * 1024
+
+# 已經壓縮的格式，deflate幾乎不能再縮小，只浪費CPU
+STORED_EXTENSIONS = ('.png', '.webp', '.jpg', '.jpeg', '.gif', '.gz', '.zip', '.pdf', '.docx', '.xlsx')
+
+# 緩存的壓縮包文件名前綴，後接內容指紋
+CACHE_PREFIX = '.bundle-'
+
+
+class _ChunkSink:
+    """只追加的輸出緩衝區，zipfile寫入後由生成器取走已寫出的字節
+
+    不提供seek/tell，zipfile會以流模式寫入（數據描述符在條目之後）
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type_for(filename: str) -> int:
+    """按擴展名選擇壓縮方式"""
+    return zipfile.ZIP_STORED if filename.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+
+
+def bundle_fingerprint(entries: Iterable[Tuple[str, str]]) -> str:
+    """根據條目的名稱、大小和修改時間計算指紋，文件變化時緩存失效"""
+    digest = hashlib.sha1()
+    for file_path, arcname in entries:
+        stat = os.stat(file_path)
+        digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def iter_zip(entries: Iterable[Tuple[str, str]], tee_path: Optional[str] = None) -> Iterator[bytes]:
+    """逐塊產出ZIP壓縮包內容
+
+    Args:
+        entries: (源文件路徑, 包內名稱)；源也可以是返回bytes的函數，寫到該條目時才調用（用於需要改寫的內容）
+        tee_path: 同時寫入的緩存文件路徑；全部寫完後才原子地放到該路徑，中途中斷不留下殘缺文件
+    """
+    sink = _ChunkSink()
+    tee = None
+    temp_path = None
+    if tee_path:
+        temp_path = f"{tee_path}.{uuid.uuid4().hex}.tmp"
+        tee = open(temp_path, 'wb')
+
+    def emit():
+        data = sink.drain()
+        if data and tee:
+            tee.write(data)
+        return data
+
+    completed = False
+    try:
+        with zipfile.ZipFile(sink, 'w') as zf:
+            for file_path, arcname in entries:
+                if callable(file_path):
+                    content = file_path()
+                    source_file = io.BytesIO(content)
+                    mtime, size = time.time(), len(content)
+                else:
+                    stat = os.stat(file_path)
+                    source_file = open(file_path, 'rb')
+                    mtime, size = stat.st_mtime, stat.st_size
+                info = zipfile.ZipInfo(arcname, datetime.fromtimestamp(mtime).timetuple()[:6])
+                info.compress_type = compress_type_for(arcname)
+                # 預先給出大小，zipfile據此決定是否需要ZIP64擴展
+                info.file_size = size
+                with source_file as source, zf.open(info, 'w') as target:
+                    for block in iter(lambda: source.read(ZIP_CHUNK_SIZE), b''):
+                        target.write(block)
+                        data = emit()
+                        if data:
+                            yield data
+                data = emit()
+                if data:
+                    yield data
+        # 中央目錄在關閉時寫出
+        data = emit()
+        if data:
+            yield data
+        completed = True
+    finally:
+        if tee:
+            tee.close()
+            if completed:
+                os.replace(temp_path, tee_path)
+            else:
+                os.remove(temp_path)
+
+
+def cached_bundle_path(directory: str, fingerprint: str) -> str:
+    return os.path.join(directory, f"{CACHE_PREFIX}{fingerprint}.zip")
+
+
+def remove_stale_bundles(directory: str, keep: Optional[str] = None) -> List[str]:
+    """刪除目錄中指紋已過期的緩存壓縮包，返回被刪除的路徑"""
+    removed = []
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if filename.startswith(CACHE_PREFIX) and filename.endswith('.zip') and path != keep:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+    return removed
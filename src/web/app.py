@@ -1,20 +1,38 @@
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, request, jsonify, render_template, send_file, Response, stream_with_context
 import os
 import uuid
 import json
+import shutil
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from flask_cors import CORS  # Add CORS support
+from werkzeug.exceptions import RequestEntityTooLarge
 from src.core.analyzer import ChineseTextAnalyzer
-from src.core.visualization import Visualizer
+from src.core.visualization import Visualizer, RENDER_PROFILES, resolve_render_profile
+from src.core.render_scheduler import ChartJob, RenderScheduler
 from src.core.similarity import TextSimilarityAnalyzer
-from src.core.advanced_visualization import AdvancedVisualizer
+from src.core.advanced_visualization import AdvancedVisualizer, bundle_html, plotly_js_path
 from src.core.task_queue import TaskQueue
+from src.core.task_events import format_sse
+from src.utils.zip_stream import iter_zip, bundle_fingerprint, cached_bundle_path, remove_stale_bundles
+from src.web.uploads import ChunkedUploadStore, UploadError, copy_stream, safe_filename
+from src.web.results_store import ResultsStore, ResultsJanitor, RESULTS_TTL, RESULTS_MAX_BYTES
+from src.web.report_writer import generate_html_report, generate_comprehensive_html_report, write_json_sidecar
 from src.utils.file_parsers import ExtendedFileParser
 from src.utils.convert_chinese import convert_text
 
-app = Flask(__name__)
+# Cache lifetime for vendored static assets such as plotly.js (seconds)
+VENDOR_ASSET_MAX_AGE = 365 * 24 * 3600
+
+class AnalysisApp(Flask):
+    def get_send_file_max_age(self, filename):
+        """Vendored assets have versioned file names, so browsers may cache them for a year"""
+        if filename and filename.replace('\\', '/').startswith('js/vendor/'):
+            return VENDOR_ASSET_MAX_AGE
+        return super().get_send_file_max_age(filename)
+
+app = AnalysisApp(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Initialize advanced components
@@ -46,6 +64,38 @@ INPUT_FOLDER = os.path.join(project_root, 'data', 'input')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(RESULTS_FOLDER, exist_ok=True)
 
+# Largest request body accepted in one request; bigger files use the chunked upload endpoints
+MAX_UPLOAD_SIZE = 64 * 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_SIZE
+
+# Resumable chunked uploads and files uploaded for batch tasks
+upload_store = ChunkedUploadStore(os.path.join(UPLOAD_FOLDER, 'chunked'))
+BATCH_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'batches')
+
+# Sharded result directories with TTL/size-cap eviction and PNG deduplication;
+# the janitor also expires old batch upload directories
+results_store = ResultsStore(
+    RESULTS_FOLDER,
+    ttl=float(os.environ.get('RESULTS_TTL', RESULTS_TTL)),
+    max_bytes=int(os.environ.get('RESULTS_MAX_BYTES', RESULTS_MAX_BYTES))
+)
+results_janitor = ResultsJanitor(results_store, extra_dirs=[BATCH_UPLOAD_FOLDER])
+# The janitor thread starts on the first request, so importing the app (CLI tools, task workers,
+# the debug reloader's parent process) spawns nothing; RESULTS_JANITOR=0 disables it
+RESULTS_JANITOR_ENABLED = os.environ.get('RESULTS_JANITOR', '1') != '0'
+
+@app.before_request
+def start_results_janitor():
+    """Start the background results janitor once"""
+    if RESULTS_JANITOR_ENABLED:
+        results_janitor.start()
+
+# File types included in the visualization ZIP bundle
+VISUALIZATION_BUNDLE_EXTENSIONS = ('.png', '.webp', '.svg', '.html')
+
+# Charts in the web UI are displayed scaled down, so render them at screen resolution by default
+WEB_RENDER_PROFILE = 'web'
+
 # Initialize analyzer
 analyzer = ChineseTextAnalyzer()
 
@@ -75,14 +125,17 @@ def analyze_text():
             
             if not text:
                 return jsonify({'error': '未提供文本'}), 400
+            
+            # Render profile: preview (72dpi WebP), web (110dpi PNG), print (300dpi PNG) or svg
+            render_profile = (data or request.form).get('render_profile', WEB_RENDER_PROFILE)
+            if render_profile not in RENDER_PROFILES:
+                return jsonify({'error': f"未知的圖表輸出配置: {render_profile}"}), 400
                 
             # Generate a unique ID for this analysis
-            analysis_id = str(uuid.uuid4())
-            result_dir = os.path.join(RESULTS_FOLDER, analysis_id)
-            os.makedirs(result_dir, exist_ok=True)
+            analysis_id, result_dir = results_store.create()
             
-            # Perform analysis
-            analyzer_results = analyzer.analyze_text(text)
+            # Perform analysis; co-occurrence feeds the word network in advanced visualizations
+            analyzer_results = analyzer.analyze_text(text, cooccurrence=True)
             
             # Store the original text for report generation
             analyzer_results['original_text'] = text
@@ -108,110 +161,55 @@ def analyze_text():
             if 'pos_frequency' in analyzer_results:
                 analyzer_results['pos_distribution'] = analyzer_results['pos_frequency']
             
-            # Generate visualizations
-            viz_paths = {}
-            
-            # Generate wordcloud (basic)
-            wc_path = os.path.join(result_dir, 'wordcloud.png')
-            Visualizer.generate_wordcloud(
-                analyzer_results['word_frequency'], 
-                title='詞頻雲圖',
-                save_path=wc_path
-            )
-            viz_paths['wordcloud'] = f"/static/results/{analysis_id}/wordcloud.png"
+            # Generate visualizations with the requested render profile
+            dpi, file_format = resolve_render_profile(render_profile)
             
-            # Generate word frequency chart (basic)
-            wf_path = os.path.join(result_dir, 'word_freq.png')
-            Visualizer.plot_word_frequency(
-                analyzer_results['word_frequency'],
-                top_n=15,
-                title='詞頻分布',
-                save_path=wf_path
-            )
-            viz_paths['word_frequency'] = f"/static/results/{analysis_id}/word_freq.png"
+            def chart_job(key, filename, method, **kwargs):
+                kwargs.update(save_path=os.path.join(result_dir, f"{filename}.{file_format}"), dpi=dpi)
+                return ChartJob(key, method, kwargs)
             
-            # Generate POS distribution chart (basic)
-            pos_path = os.path.join(result_dir, 'pos_distribution.png')
-            Visualizer.plot_pos_distribution(
-                analyzer_results['pos_distribution'],
-                title='詞性分布',
-                save_path=pos_path
-            )
-            viz_paths['pos_distribution'] = f"/static/results/{analysis_id}/pos_distribution.png"
+            chart_jobs = [
+                # Basic charts
+                chart_job('wordcloud', 'wordcloud', 'generate_wordcloud',
+                          word_freq=analyzer_results['word_frequency'], title='詞頻雲圖'),
+                chart_job('word_frequency', 'word_freq', 'plot_word_frequency',
+                          word_freq=analyzer_results['word_frequency'], top_n=15, title='詞頻分布'),
+                chart_job('pos_distribution', 'pos_distribution', 'plot_pos_distribution',
+                          pos_freq=analyzer_results['pos_distribution'], title='詞性分布'),
+                chart_job('sentiment', 'sentiment', 'plot_sentiment_analysis',
+                          sentiment_data=analyzer_results['sentiment'], title='情感分析'),
+            ]
+            if any(analyzer_results['entities'].values()):
+                chart_jobs.append(chart_job('entities', 'entities', 'plot_entities',
+                                            entity_data=analyzer_results['entities'], title='命名實體統計'))
             
-            # Generate sentiment chart (basic)
-            if 'sentiment' in analyzer_results:
-                sent_path = os.path.join(result_dir, 'sentiment.png')
-                Visualizer.plot_sentiment_analysis(
-                    analyzer_results['sentiment'],
-                    title='情感分析',
-                    save_path=sent_path
-                )
-                viz_paths['sentiment'] = f"/static/results/{analysis_id}/sentiment.png"
+            # Advanced charts
+            if analyzer_results['ngrams']:
+                chart_jobs.append(chart_job('ngrams', 'ngrams', 'plot_ngrams',
+                                            ngram_freq=analyzer_results['ngrams'], title='常見詞組 (Bigrams)'))
+            if analyzer_results['keywords']:
+                chart_jobs.append(chart_job('keywords', 'keywords', 'plot_keyword_weights',
+                                            keywords=analyzer_results['keywords'], title='關鍵詞權重'))
+            chart_jobs.extend([
+                chart_job('word_frequency_vertical', 'word_freq_vertical', 'plot_advanced_word_frequency',
+                          word_freq=analyzer_results['word_frequency'], top_n=15,
+                          title='詞頻統計 (垂直條形圖)', plot_type='vertical'),
+                chart_job('word_frequency_pie', 'word_freq_pie', 'plot_advanced_word_frequency',
+                          word_freq=analyzer_results['word_frequency'], top_n=10,
+                          title='詞頻統計 (餅圖)', plot_type='pie'),
+                chart_job('word_by_length', 'word_by_length', 'plot_advanced_word_frequency',
+                          word_freq=analyzer_results['word_frequency'], top_n=15,
+                          title='詞頻統計 (按詞長排序)', sort_by='length'),
+            ])
             
-            # Generate entity chart (basic)
-            if 'entities' in analyzer_results and any(analyzer_results['entities'].values()):
-                entity_path = os.path.join(result_dir, 'entities.png')
-                Visualizer.plot_entities(
-                    analyzer_results['entities'],
-                    title='命名實體統計',
-                    save_path=entity_path
-                )
-                viz_paths['entities'] = f"/static/results/{analysis_id}/entities.png"
-            
-            # Generate n-gram chart (advanced)
-            if 'ngrams' in analyzer_results and analyzer_results['ngrams']:
-                ngrams_path = os.path.join(result_dir, 'ngrams.png')
-                Visualizer.plot_ngrams(
-                    analyzer_results['ngrams'],
-                    title='常見詞組 (Bigrams)',
-                    save_path=ngrams_path
-                )
-                viz_paths['ngrams'] = f"/static/results/{analysis_id}/ngrams.png"
-            
-            # Generate keyword weights chart (advanced)
-            if 'keywords' in analyzer_results and analyzer_results['keywords']:
-                keywords_path = os.path.join(result_dir, 'keywords.png')
-                Visualizer.plot_keyword_weights(
-                    analyzer_results['keywords'],
-                    title='關鍵詞權重',
-                    save_path=keywords_path
-                )
-                viz_paths['keywords'] = f"/static/results/{analysis_id}/keywords.png"
-            
-            # Generate advanced word frequency visualizations (advanced)
-            # 1. Vertical bar chart
-            adv_vertical_path = os.path.join(result_dir, 'word_freq_vertical.png')
-            Visualizer.plot_advanced_word_frequency(
-                analyzer_results['word_frequency'],
-                top_n=15,
-                title='詞頻統計 (垂直條形圖)',
-                save_path=adv_vertical_path,
-                plot_type='vertical'
-            )
-            viz_paths['word_frequency_vertical'] = f"/static/results/{analysis_id}/word_freq_vertical.png"
-            
-            # 2. Pie chart
-            adv_pie_path = os.path.join(result_dir, 'word_freq_pie.png')
-            Visualizer.plot_advanced_word_frequency(
-                analyzer_results['word_frequency'],
-                top_n=10,  # Fewer for pie chart
-                title='詞頻統計 (餅圖)',
-                save_path=adv_pie_path,
-                plot_type='pie'
-            )
-            viz_paths['word_frequency_pie'] = f"/static/results/{analysis_id}/word_freq_pie.png"
-            
-            # 3. Words sorted by length
-            adv_length_path = os.path.join(result_dir, 'word_by_length.png')
-            Visualizer.plot_advanced_word_frequency(
-                analyzer_results['word_frequency'],
-                top_n=15,
-                title='詞頻統計 (按詞長排序)',
-                save_path=adv_length_path,
-                sort_by='length'
-            )
-            viz_paths['word_by_length'] = f"/static/results/{analysis_id}/word_by_length.png"
+            scheduler = RenderScheduler(processes=1)
+            chart_paths = scheduler.render(chart_jobs)
+            viz_paths = {
+                key: results_store.url_for(analysis_id, os.path.basename(path))
+                for key, path in chart_paths.items()
+            }
+            analyzer_results['render_profile'] = render_profile
+            analyzer_results['render_stats'] = scheduler.stats.summary()
             
             # Add visualization paths to results
             analyzer_results['visualizations'] = viz_paths
@@ -220,7 +218,7 @@ def analyze_text():
             with open(os.path.join(result_dir, 'results.json'), 'w', encoding='utf-8') as f:
                 json.dump(analyzer_results, f, ensure_ascii=False, indent=2)
             
-            viz_paths['results_json'] = f"/static/results/{analysis_id}/results.json"
+            viz_paths['results_json'] = results_store.url_for(analysis_id, 'results.json')
             
             return jsonify(analyzer_results)
         except Exception as e:
@@ -284,6 +282,13 @@ def download_file(filename):
         print(f"Error in download_file: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def bundle_entries(entries):
+    """Rewrite plotly.js references in bundled HTML pages; other files are copied as-is"""
+    if not advanced_visualizer:
+        return entries
+    return [((lambda path=file_path: bundle_html(path)) if arcname.endswith('.html') else file_path, arcname)
+            for file_path, arcname in entries]
+
 @app.route('/api/download_all_visualizations', methods=['POST'])
 def download_all_visualizations():
     """Download all visualizations for an analysis as a zip file"""
@@ -292,29 +297,35 @@ def download_all_visualizations():
         if not analysis_id:
             return jsonify({'error': 'No analysis ID provided'}), 400
         
-        result_dir = os.path.join(RESULTS_FOLDER, analysis_id)
-        if not os.path.exists(result_dir):
+        result_dir = results_store.result_dir(analysis_id)
+        if not result_dir:
             return jsonify({'error': 'Analysis results not found'}), 404
-        
-        # Create a zip file with all visualizations
-        import zipfile
-        from io import BytesIO
-        
-        memory_file = BytesIO()
-        with zipfile.ZipFile(memory_file, 'w') as zf:
-            # Add all png and html files from the results directory
-            for filename in os.listdir(result_dir):
-                if filename.endswith(('.png', '.html')):
-                    file_path = os.path.join(result_dir, filename)
-                    zf.write(file_path, filename)
-        
-        memory_file.seek(0)
-        
-        return send_file(
-            memory_file,
+        results_store.touch(analysis_id)
+        
+        # Collect all chart images and html files from the results directory
+        entries = [(os.path.join(result_dir, filename), filename)
+                   for filename in sorted(os.listdir(result_dir))
+                   if filename.endswith(VISUALIZATION_BUNDLE_EXTENSIONS)]
+        download_name = f'chinese_text_analysis_{analysis_id}.zip'
+        
+        # Interactive pages load plotly.js from the static folder; ship it in the archive
+        # and point the bundled pages at it so they render when opened offline
+        if advanced_visualizer and any(filename.endswith('.html') for _, filename in entries):
+            asset_path = plotly_js_path()
+            entries.append((asset_path, os.path.basename(asset_path)))
+        
+        # Serve the cached archive if none of the files changed since it was built
+        cache_path = cached_bundle_path(result_dir, bundle_fingerprint(entries))
+        if os.path.exists(cache_path):
+            return send_file(os.path.abspath(cache_path), mimetype='application/zip', as_attachment=True,
+                             download_name=download_name, conditional=True)
+        
+        # Otherwise stream the archive as it is written and keep a copy for later requests
+        remove_stale_bundles(result_dir)
+        return Response(
+            stream_with_context(iter_zip(bundle_entries(entries), tee_path=cache_path)),
             mimetype='application/zip',
-            as_attachment=True,
-            attachment_filename=f'chinese_text_analysis_{analysis_id}.zip'
+            headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
         )
     except Exception as e:
         print(f"Error in download_all_visualizations: {str(e)}")
@@ -335,12 +346,10 @@ def generate_report():
             return jsonify({'error': 'No text provided'}), 400
         
         # Generate a unique ID for this report
-        report_id = str(uuid.uuid4())
-        report_dir = os.path.join(RESULTS_FOLDER, report_id)
-        os.makedirs(report_dir, exist_ok=True)
+        report_id, report_dir = results_store.create()
         
-        # Perform complete analysis
-        analyzer_results = analyzer.analyze_text(text)
+        # Perform complete analysis, including co-occurrence for the report's word network
+        analyzer_results = analyzer.analyze_text(text, cooccurrence=True)
         
         # Store the original text for report generation
         analyzer_results['original_text'] = text
@@ -380,7 +389,7 @@ def generate_report():
                 title='詞頻雲圖',
                 save_path=wc_path
             )
-            viz_paths['wordcloud'] = f"/static/results/{report_id}/wordcloud.png"
+            viz_paths['wordcloud'] = results_store.url_for(report_id, 'wordcloud.png')
             
             # Generate word frequency chart
             wf_path = os.path.join(report_dir, 'word_freq.png')
@@ -390,7 +399,7 @@ def generate_report():
                 title='詞頻分布',
                 save_path=wf_path
             )
-            viz_paths['word_frequency'] = f"/static/results/{report_id}/word_freq.png"
+            viz_paths['word_frequency'] = results_store.url_for(report_id, 'word_freq.png')
             
             # Generate POS distribution chart
             pos_path = os.path.join(report_dir, 'pos_distribution.png')
@@ -399,7 +408,7 @@ def generate_report():
                 title='詞性分布',
                 save_path=pos_path
             )
-            viz_paths['pos_distribution'] = f"/static/results/{report_id}/pos_distribution.png"
+            viz_paths['pos_distribution'] = results_store.url_for(report_id, 'pos_distribution.png')
             
             # Generate sentiment chart
             sent_path = os.path.join(report_dir, 'sentiment.png')
@@ -408,7 +417,7 @@ def generate_report():
                 title='情感分析',
                 save_path=sent_path
             )
-            viz_paths['sentiment'] = f"/static/results/{report_id}/sentiment.png"
+            viz_paths['sentiment'] = results_store.url_for(report_id, 'sentiment.png')
             
             # Generate entities chart
             entity_path = os.path.join(report_dir, 'entities.png')
@@ -417,7 +426,7 @@ def generate_report():
                 title='命名實體統計',
                 save_path=entity_path
             )
-            viz_paths['entities'] = f"/static/results/{report_id}/entities.png"
+            viz_paths['entities'] = results_store.url_for(report_id, 'entities.png')
         
         # Advanced visualizations
         if options.get('advanced', True):
@@ -430,7 +439,7 @@ def generate_report():
                 save_path=wf_vertical_path,
                 plot_type='vertical'
             )
-            viz_paths['word_freq_vertical'] = f"/static/results/{report_id}/word_freq_vertical.png"
+            viz_paths['word_freq_vertical'] = results_store.url_for(report_id, 'word_freq_vertical.png')
             
             wf_pie_path = os.path.join(report_dir, 'word_freq_pie.png')
             Visualizer.plot_advanced_word_frequency(
@@ -440,7 +449,7 @@ def generate_report():
                 save_path=wf_pie_path,
                 plot_type='pie'
             )
-            viz_paths['word_freq_pie'] = f"/static/results/{report_id}/word_freq_pie.png"
+            viz_paths['word_freq_pie'] = results_store.url_for(report_id, 'word_freq_pie.png')
             
             # Generate n-grams chart
             ngrams_path = os.path.join(report_dir, 'ngrams.png')
@@ -449,7 +458,7 @@ def generate_report():
                 title='N-gram詞組分析',
                 save_path=ngrams_path
             )
-            viz_paths['ngrams'] = f"/static/results/{report_id}/ngrams.png"
+            viz_paths['ngrams'] = results_store.url_for(report_id, 'ngrams.png')
             
             # Generate keywords chart
             keywords_path = os.path.join(report_dir, 'keywords.png')
@@ -458,7 +467,7 @@ def generate_report():
                 title='關鍵詞權重',
                 save_path=keywords_path
             )
-            viz_paths['keywords'] = f"/static/results/{report_id}/keywords.png"
+            viz_paths['keywords'] = results_store.url_for(report_id, 'keywords.png')
         
         # Generate interactive visualizations if advanced visualizer is available
         if options.get('interactive', True) and advanced_visualizer:
@@ -470,8 +479,8 @@ def generate_report():
                 )
                 if single_heatmap:
                     heatmap_path = os.path.join(report_dir, 'interactive_heatmap.html')
-                    single_heatmap.write_html(heatmap_path)
-                    viz_paths['interactive_heatmap'] = f"/static/results/{report_id}/interactive_heatmap.html"
+                    advanced_visualizer.write_figure_html(single_heatmap, heatmap_path)
+                    viz_paths['interactive_heatmap'] = results_store.url_for(report_id, 'interactive_heatmap.html')
                 
                 # Generate single-text interactive network
                 single_network = advanced_visualizer.plot_single_text_network(
@@ -480,8 +489,8 @@ def generate_report():
                 )
                 if single_network:
                     network_path = os.path.join(report_dir, 'interactive_network.html')
-                    single_network.write_html(network_path)
-                    viz_paths['interactive_network'] = f"/static/results/{report_id}/interactive_network.html"
+                    advanced_visualizer.write_figure_html(single_network, network_path)
+                    viz_paths['interactive_network'] = results_store.url_for(report_id, 'interactive_network.html')
                 
                 # Generate treemap
                 treemap = advanced_visualizer.plot_word_frequency_treemap(
@@ -489,8 +498,8 @@ def generate_report():
                 )
                 if treemap:
                     treemap_path = os.path.join(report_dir, 'treemap.html')
-                    treemap.write_html(treemap_path)
-                    viz_paths['treemap'] = f"/static/results/{report_id}/treemap.html"
+                    advanced_visualizer.write_figure_html(treemap, treemap_path)
+                    viz_paths['treemap'] = results_store.url_for(report_id, 'treemap.html')
                 
                 # Generate interactive word analysis
                 word_analysis = advanced_visualizer.plot_interactive_word_cloud_data(
@@ -498,8 +507,8 @@ def generate_report():
                 )
                 if word_analysis:
                     word_analysis_path = os.path.join(report_dir, 'interactive_word_analysis.html')
-                    word_analysis.write_html(word_analysis_path)
-                    viz_paths['interactive_word_analysis'] = f"/static/results/{report_id}/interactive_word_analysis.html"
+                    advanced_visualizer.write_figure_html(word_analysis, word_analysis_path)
+                    viz_paths['interactive_word_analysis'] = results_store.url_for(report_id, 'interactive_word_analysis.html')
                 
                 # Generate dashboard with all interactive visualizations
                 figures = {}
@@ -515,7 +524,7 @@ def generate_report():
                 if figures:
                     dashboard_path = os.path.join(report_dir, 'dashboard.html')
                     advanced_visualizer.create_dashboard_html(figures, dashboard_path)
-                    viz_paths['dashboard'] = f"/static/results/{report_id}/dashboard.html"
+                    viz_paths['dashboard'] = results_store.url_for(report_id, 'dashboard.html')
                     
             except Exception as e:
                 print(f"Interactive visualization generation failed in report: {e}")
@@ -530,10 +539,8 @@ def generate_report():
         include_summary = options.get('summary', True)
         include_interactive = options.get('interactive', True)
         
-        # Save the report data to a JSON file
-        json_path = os.path.join(report_dir, 'report_data.json')
-        with open(json_path, 'w', encoding='utf-8') as json_file:
-            json.dump(analyzer_results, json_file, ensure_ascii=False, indent=2)
+        # Save the report data as a compressed JSON sidecar linked from the report
+        write_json_sidecar(analyzer_results, report_dir)
         
         # Generate HTML report
         html_path = os.path.join(report_dir, 'report.html')
@@ -550,7 +557,7 @@ def generate_report():
         return jsonify({
             'success': True,
             'report_id': report_id,
-            'report_path': f"/static/results/{report_id}/report.html"
+            'report_path': results_store.url_for(report_id, 'report.html')
         })
     except Exception as e:
         print(f"Error in generate_report: {str(e)}")
@@ -573,9 +580,7 @@ def generate_comprehensive_report():
             return jsonify({'error': 'No analysis data provided'}), 400
         
         # Generate a unique ID for this comprehensive report
-        report_id = str(uuid.uuid4())
-        report_dir = os.path.join(RESULTS_FOLDER, report_id)
-        os.makedirs(report_dir, exist_ok=True)
+        report_id, report_dir = results_store.create()
         
         # Combine all data
         comprehensive_data = analysis_data.copy()
@@ -606,7 +611,7 @@ def generate_comprehensive_report():
                         title='詞頻雲圖',
                         save_path=wc_path
                     )
-                    viz_paths['wordcloud'] = f"/static/results/{report_id}/wordcloud.png"
+                    viz_paths['wordcloud'] = results_store.url_for(report_id, 'wordcloud.png')
                 except Exception as e:
                     print(f"Error generating wordcloud: {e}")
                 
@@ -619,7 +624,7 @@ def generate_comprehensive_report():
                         title='詞頻分布',
                         save_path=wf_path
                     )
-                    viz_paths['word_frequency'] = f"/static/results/{report_id}/word_freq.png"
+                    viz_paths['word_frequency'] = results_store.url_for(report_id, 'word_freq.png')
                 except Exception as e:
                     print(f"Error generating word frequency chart: {e}")
             
@@ -632,7 +637,7 @@ def generate_comprehensive_report():
                         title='詞性分布',
                         save_path=pos_path
                     )
-                    viz_paths['pos_distribution'] = f"/static/results/{report_id}/pos_distribution.png"
+                    viz_paths['pos_distribution'] = results_store.url_for(report_id, 'pos_distribution.png')
                 except Exception as e:
                     print(f"Error generating POS distribution chart: {e}")
             
@@ -645,7 +650,7 @@ def generate_comprehensive_report():
                         title='情感分析',
                         save_path=sent_path
                     )
-                    viz_paths['sentiment'] = f"/static/results/{report_id}/sentiment.png"
+                    viz_paths['sentiment'] = results_store.url_for(report_id, 'sentiment.png')
                 except Exception as e:
                     print(f"Error generating sentiment chart: {e}")
             
@@ -658,7 +663,7 @@ def generate_comprehensive_report():
                         title='命名實體統計',
                         save_path=entity_path
                     )
-                    viz_paths['entities'] = f"/static/results/{report_id}/entities.png"
+                    viz_paths['entities'] = results_store.url_for(report_id, 'entities.png')
                 except Exception as e:
                     print(f"Error generating entities chart: {e}")
             
@@ -675,13 +680,12 @@ def generate_comprehensive_report():
                         # Extract analysis ID from path
                         source_analysis_id = viz_path.split('/')[-2]
                         source_file = viz_path.split('/')[-1]
-                        source_path = os.path.join(RESULTS_FOLDER, source_analysis_id, source_file)
+                        source_path = results_store.result_path(source_analysis_id, source_file)
                         
-                        if os.path.exists(source_path):
-                            dest_path = os.path.join(report_dir, source_file)
-                            import shutil
-                            shutil.copy2(source_path, dest_path)
-                            all_visualizations[viz_key] = f"/static/results/{report_id}/{source_file}"
+                        if source_path and os.path.exists(source_path):
+                            # Hard-link instead of copying so the report shares the chart files
+                            results_store.link_file(source_path, os.path.join(report_dir, source_file))
+                            all_visualizations[viz_key] = results_store.url_for(report_id, source_file)
                     except Exception as e:
                         print(f"Error copying visualization {viz_key}: {e}")
         
@@ -692,13 +696,11 @@ def generate_comprehensive_report():
                     try:
                         source_analysis_id = viz_path.split('/')[-2]
                         source_file = viz_path.split('/')[-1]
-                        source_path = os.path.join(RESULTS_FOLDER, source_analysis_id, source_file)
+                        source_path = results_store.result_path(source_analysis_id, source_file)
                         
-                        if os.path.exists(source_path):
-                            dest_path = os.path.join(report_dir, source_file)
-                            import shutil
-                            shutil.copy2(source_path, dest_path)
-                            all_visualizations[viz_key] = f"/static/results/{report_id}/{source_file}"
+                        if source_path and os.path.exists(source_path):
+                            results_store.link_file(source_path, os.path.join(report_dir, source_file))
+                            all_visualizations[viz_key] = results_store.url_for(report_id, source_file)
                     except Exception as e:
                         print(f"Error copying similarity visualization {viz_key}: {e}")
         
@@ -709,13 +711,11 @@ def generate_comprehensive_report():
                     try:
                         source_analysis_id = viz_path.split('/')[-2]
                         source_file = viz_path.split('/')[-1]
-                        source_path = os.path.join(RESULTS_FOLDER, source_analysis_id, source_file)
+                        source_path = results_store.result_path(source_analysis_id, source_file)
                         
-                        if os.path.exists(source_path):
-                            dest_path = os.path.join(report_dir, source_file)
-                            import shutil
-                            shutil.copy2(source_path, dest_path)
-                            all_visualizations[viz_key] = f"/static/results/{report_id}/{source_file}"
+                        if source_path and os.path.exists(source_path):
+                            results_store.link_file(source_path, os.path.join(report_dir, source_file))
+                            all_visualizations[viz_key] = results_store.url_for(report_id, source_file)
                     except Exception as e:
                         print(f"Error copying interactive visualization {viz_key}: {e}")
         
@@ -730,10 +730,8 @@ def generate_comprehensive_report():
         include_interactive = options.get('interactive', True)
         include_similarity = bool(similarity_data)
         
-        # Save the comprehensive data to a JSON file
-        json_path = os.path.join(report_dir, 'report_data.json')
-        with open(json_path, 'w', encoding='utf-8') as json_file:
-            json.dump(comprehensive_data, json_file, ensure_ascii=False, indent=2)
+        # Save the comprehensive data as a compressed JSON sidecar linked from the report
+        write_json_sidecar(comprehensive_data, report_dir)
         
         # Generate comprehensive HTML report
         html_path = os.path.join(report_dir, 'report.html')
@@ -751,7 +749,7 @@ def generate_comprehensive_report():
         return jsonify({
             'success': True,
             'report_id': report_id,
-            'report_path': f"/static/results/{report_id}/report.html"
+            'report_path': results_store.url_for(report_id, 'report.html')
         })
         
     except Exception as e:
@@ -762,627 +760,21 @@ def generate_comprehensive_report():
 def download_report(report_id):
     """Download a generated report"""
     try:
-        report_path = os.path.join(RESULTS_FOLDER, report_id, 'report.html')
-        if not os.path.exists(report_path):
+        report_path = results_store.result_path(report_id, 'report.html')
+        if not report_path or not os.path.exists(report_path):
             return jsonify({'error': 'Report not found'}), 404
+        results_store.touch(report_id)
         
         return send_file(
-            report_path,
+            os.path.abspath(report_path),
             mimetype='text/html',
             as_attachment=True,
-            attachment_filename='chinese_text_analysis_report.html'
+            download_name='chinese_text_analysis_report.html'
         )
     except Exception as e:
         print(f"Error in download_report: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def generate_html_report(data, output_path, title='中文文本分析報告', include_json=True, include_data=True, include_summary=True, include_interactive=True):
-    """Generate an HTML report with all visualizations and data"""
-    html = f"""<!DOCTYPE html>
-<html lang="zh">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'PingFang SC', 'Hiragino Sans GB', 
-                        'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        h1, h2, h3 {{
-            color: #0066cc;
-        }}
-        .content-section {{
-            margin-bottom: 40px;
-            padding: 20px;
-            background-color: #fff;
-            border-radius: 5px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }}
-        .visualizations-container {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 20px;
-            justify-content: center;
-        }}
-        .visualization-card {{
-            flex: 0 0 calc(50% - 20px);
-            max-width: 600px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-            border-radius: 4px;
-            overflow: hidden;
-            margin-bottom: 20px;
-        }}
-        .visualization-card h3 {{
-            padding: 10px 15px;
-            margin: 0;
-            background-color: #f5f5f5;
-            border-bottom: 1px solid #ddd;
-            font-size: 16px;
-        }}
-        .visualization-card img {{
-            width: 100%;
-            display: block;
-        }}
-        .data-table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin-bottom: 20px;
-        }}
-        .data-table th, .data-table td {{
-            padding: 8px 12px;
-            border: 1px solid #ddd;
-            text-align: left;
-        }}
-        .data-table th {{
-            background-color: #f5f5f5;
-        }}
-        .summary-box {{
-            background-color: #f8f9fa;
-            padding: 15px;
-            border-left: 4px solid #0066cc;
-            margin-bottom: 20px;
-        }}
-        pre {{
-            background-color: #f5f5f5;
-            padding: 15px;
-            overflow-x: auto;
-            border-radius: 4px;
-            font-size: 14px;
-        }}
-        footer {{
-            margin-top: 50px;
-            text-align: center;
-            color: #777;
-            font-size: 14px;
-        }}
-        .entity-tag {{
-            display: inline-block;
-            padding: 2px 8px;
-            margin: 2px;
-            border-radius: 12px;
-            font-size: 14px;
-        }}
-        .entity-person {{
-            background-color: #ffcccc;
-        }}
-        .entity-location {{
-            background-color: #ccffcc;
-        }}
-        .entity-organization {{
-            background-color: #ccccff;
-        }}
-    </style>
-</head>
-<body>
-    <h1>{title}</h1>
-    
-    <div class="content-section">
-        <h2>文本內容</h2>
-        <div class="text-content">
-            <p>{data.get('original_text', '未提供原始文本')}</p>
-        </div>
-    </div>
-    """
-    
-    # Add summary section if requested
-    if include_summary and 'summary' in data:
-        html += f"""
-    <div class="content-section">
-        <h2>文本摘要</h2>
-        <div class="summary-box">
-            <p>{data.get('summary', '無法生成摘要')}</p>
-        </div>
-    </div>
-        """
-    
-    # Add basic statistics
-    html += f"""
-    <div class="content-section">
-        <h2>基本統計</h2>
-        <ul>
-            <li><strong>總詞數:</strong> {data.get('total_words', 0)}</li>
-            <li><strong>平均詞長:</strong> {data.get('avg_word_length', 0)} 字</li>
-            <li><strong>情感傾向:</strong> {data.get('sentiment', {}).get('sentiment_label', '未知')}</li>
-            <li><strong>正面詞數量:</strong> {data.get('sentiment', {}).get('positive_count', 0)}</li>
-            <li><strong>負面詞數量:</strong> {data.get('sentiment', {}).get('negative_count', 0)}</li>
-        </ul>
-    </div>
-    """
-    
-    # Add visualizations section
-    if 'visualizations' in data and data['visualizations']:
-        html += """
-    <div class="content-section">
-        <h2>視覺化分析</h2>
-        <div class="visualizations-container">
-        """
-        
-        # Map of visualization types to display names
-        viz_names = {
-            'wordcloud': '詞頻雲圖',
-            'word_frequency': '詞頻分布',
-            'pos_distribution': '詞性分布',
-            'sentiment': '情感分析',
-            'entities': '命名實體統計',
-            'ngrams': 'N-gram詞組分析',
-            'keywords': '關鍵詞權重',
-            'word_freq_vertical': '詞頻垂直分布',
-            'word_freq_pie': '詞頻餅圖'
-        }
-        
-        for viz_type, viz_path in data['visualizations'].items():
-            if viz_type in viz_names:
-                # Extract just the filename from the full path for relative linking
-                filename = viz_path.split('/')[-1] if viz_path else ''
-                html += f"""
-            <div class="visualization-card">
-                <h3>{viz_names[viz_type]}</h3>
-                <img src="{filename}" alt="{viz_names[viz_type]}">
-            </div>
-                """
-        
-        html += """
-        </div>
-    </div>
-        """
-    
-    # Add interactive visualizations section
-    if include_interactive and 'visualizations' in data and data['visualizations']:
-        # Check if there are any interactive visualizations
-        interactive_viz = {k: v for k, v in data['visualizations'].items() 
-                          if k in ['interactive_heatmap', 'interactive_network', 'treemap', 'interactive_word_analysis', 'dashboard']}
-        
-        if interactive_viz:
-            html += """
-    <div class="content-section">
-        <h2>交互式圖表</h2>
-        <div class="visualizations-container">
-            """
-            
-            # Map of interactive visualization types to display names
-            interactive_viz_names = {
-                'interactive_heatmap': '交互式詞性-詞頻熱力圖',
-                'interactive_network': '交互式詞語關聯網絡圖',
-                'treemap': '詞頻樹狀圖',
-                'interactive_word_analysis': '交互式詞頻分析',
-                'dashboard': '綜合分析儀表板'
-            }
-            
-            for viz_type, viz_path in interactive_viz.items():
-                viz_name = interactive_viz_names.get(viz_type, viz_type)
-                filename = viz_path.split('/')[-1] if viz_path else ''
-                html += f"""
-            <div class="visualization-card" style="flex: 0 0 100%; max-width: 100%;">
-                <h3>{viz_name}</h3>
-                <iframe src="{filename}" width="100%" height="600" frameborder="0"></iframe>
-            </div>
-                """
-            
-            html += """
-        </div>
-    </div>
-            """
-    
-    # Add data tables if requested
-    if include_data:
-        html += """
-    <div class="content-section">
-        <h2>詳細數據</h2>
-        """
-        
-        # Word frequency table
-        if 'word_frequency' in data:
-            html += """
-        <h3>詞頻統計</h3>
-        <table class="data-table">
-            <thead>
-                <tr>
-                    <th>詞語</th>
-                    <th>頻率</th>
-                </tr>
-            </thead>
-            <tbody>
-            """
-            
-            # Get top 30 words by frequency
-            top_words = sorted(data['word_frequency'].items(), key=lambda x: x[1], reverse=True)[:30]
-            
-            for word, freq in top_words:
-                html += f"""
-                <tr>
-                    <td>{word}</td>
-                    <td>{freq}</td>
-                </tr>
-                """
-            
-            html += """
-            </tbody>
-        </table>
-            """
-        
-        # POS distribution table
-        if 'pos_distribution' in data:
-            html += """
-        <h3>詞性分布</h3>
-        <table class="data-table">
-            <thead>
-                <tr>
-                    <th>詞性</th>
-                    <th>數量</th>
-                </tr>
-            </thead>
-            <tbody>
-            """
-            
-            pos_items = sorted(data['pos_distribution'].items(), key=lambda x: x[1], reverse=True)
-            
-            for pos, count in pos_items:
-                html += f"""
-                <tr>
-                    <td>{pos}</td>
-                    <td>{count}</td>
-                </tr>
-                """
-            
-            html += """
-            </tbody>
-        </table>
-            """
-        
-        # Named entities
-        if 'entities' in data:
-            html += """
-        <h3>命名實體</h3>
-            """
-            
-            entity_types = {
-                'person': '人名',
-                'location': '地名',
-                'organization': '機構名'
-            }
-            
-            for entity_type, entities in data['entities'].items():
-                if entities:
-                    entity_type_display = entity_types.get(entity_type, entity_type)
-                    html += f"""
-        <h4>{entity_type_display}</h4>
-        <div>
-            """
-                    
-                    for entity in entities:
-                        html += f"""
-            <span class="entity-tag entity-{entity_type}">{entity}</span>
-                        """
-                    
-                    html += """
-        </div>
-                    """
-        
-        html += """
-    </div>
-        """
-    
-    # Add JSON data if requested
-    if include_json:
-        import json
-        
-        # Create a copy of data without original_text to avoid excessive size
-        json_data = {k: v for k, v in data.items() if k != 'original_text'}
-        # Remove image paths as they won't be valid outside the server context
-        if 'visualizations' in json_data:
-            # Use relative paths for the report
-            json_data['visualizations'] = {k: '.' + v for k, v in json_data['visualizations'].items()}
-        
-        html += """
-    <div class="content-section">
-        <h2>JSON 數據</h2>
-        <pre>""" + json.dumps(json_data, ensure_ascii=False, indent=2) + """</pre>
-    </div>
-        """
-    
-    # Add footer
-    from datetime import datetime
-    
-    html += f"""
-    <footer>
-        <p>生成時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        <p>Chinese Text Analyzer © {datetime.now().year}</p>
-    </footer>
-</body>
-</html>
-    """
-    
-    # Write the HTML to the output file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-
-def generate_comprehensive_html_report(data, output_path, title='中文文本分析完整報告', include_json=True, include_data=True, include_summary=True, include_interactive=True, include_similarity=True):
-    """Generate a comprehensive HTML report with all visualizations, interactive charts, and similarity analysis"""
-    html = f"""<!DOCTYPE html>
-<html lang="zh">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'PingFang SC', 'Hiragino Sans GB', 
-                        'Microsoft YaHei', 'Helvetica Neue', Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        h1, h2, h3 {{
-            color: #0066cc;
-        }}
-        .content-section {{
-            margin-bottom: 40px;
-            padding: 20px;
-            background-color: #fff;
-            border-radius: 5px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-        }}
-        .visualizations-container {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 20px;
-            justify-content: center;
-        }}
-        .visualization-card {{
-            flex: 0 0 calc(50% - 20px);
-            max-width: 600px;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-            border-radius: 4px;
-            overflow: hidden;
-            margin-bottom: 20px;
-        }}
-        .visualization-card.full-width {{
-            flex: 0 0 100%;
-            max-width: 100%;
-        }}
-        .visualization-card h3 {{
-            padding: 10px 15px;
-            margin: 0;
-            background-color: #f5f5f5;
-            border-bottom: 1px solid #ddd;
-            font-size: 16px;
-        }}
-        .visualization-card img {{
-            width: 100%;
-            display: block;
-        }}
-        .visualization-card iframe {{
-            width: 100%;
-            border: none;
-            display: block;
-        }}
-        .nav-tabs {{
-            border-bottom: 2px solid #0066cc;
-            margin-bottom: 20px;
-        }}
-        .nav-tab {{
-            display: inline-block;
-            padding: 10px 20px;
-            background-color: #f5f5f5;
-            border: 1px solid #ddd;
-            border-bottom: none;
-            margin-right: 5px;
-            cursor: pointer;
-            text-decoration: none;
-            color: #333;
-        }}
-        .nav-tab.active {{
-            background-color: #0066cc;
-            color: white;
-        }}
-        .tab-content {{
-            display: none;
-        }}
-        .tab-content.active {{
-            display: block;
-        }}
-    </style>
-    <script>
-        function showTab(tabId) {{
-            // Hide all tab contents
-            document.querySelectorAll('.tab-content').forEach(tab => {{
-                tab.classList.remove('active');
-            }});
-            
-            // Remove active class from all nav tabs
-            document.querySelectorAll('.nav-tab').forEach(tab => {{
-                tab.classList.remove('active');
-            }});
-            
-            // Show selected tab content
-            document.getElementById(tabId).classList.add('active');
-            
-            // Add active class to clicked nav tab
-            event.target.classList.add('active');
-        }}
-    </script>
-</head>
-<body>
-    <h1>{title}</h1>
-    
-    <div class="content-section">
-        <h2>文本內容</h2>
-        <div class="text-content">
-            <p>{data.get('original_text', '未提供原始文本')}</p>
-        </div>
-    </div>
-    
-    <div class="content-section">
-        <h2>視覺化分析</h2>
-        
-        <div class="nav-tabs">
-            <a href="#" class="nav-tab active" onclick="showTab('basic-viz')">基礎分析圖表</a>
-            <a href="#" class="nav-tab" onclick="showTab('interactive-viz')">交互式圖表</a>
-            <a href="#" class="nav-tab" onclick="showTab('similarity-viz')">相似度分析</a>
-        </div>
-        
-        <div id="basic-viz" class="tab-content active">
-            <h3>基礎分析圖表</h3>
-            <div class="visualizations-container">
-    """
-    
-    # Add basic visualizations
-    basic_viz_count = 0
-    if 'visualizations' in data and data['visualizations']:
-        basic_viz_names = {
-            'wordcloud': '詞頻雲圖',
-            'word_frequency': '詞頻分布',
-            'pos_distribution': '詞性分布',
-            'sentiment': '情感分析',
-            'entities': '命名實體統計',
-            'ngrams': 'N-gram詞組分析',
-            'keywords': '關鍵詞權重',
-            'word_freq_vertical': '詞頻垂直分布',
-            'word_freq_pie': '詞頻餅圖'
-        }
-        
-        for viz_type, viz_path in data['visualizations'].items():
-            if viz_type in basic_viz_names:
-                filename = viz_path.split('/')[-1] if viz_path else ''
-                html += f"""
-                <div class="visualization-card">
-                    <h3>{basic_viz_names[viz_type]}</h3>
-                    <img src="{filename}" alt="{basic_viz_names[viz_type]}">
-                </div>
-                """
-                basic_viz_count += 1
-    
-    if basic_viz_count == 0:
-        html += '<p class="text-muted">暫無基礎分析圖表</p>'
-    
-    html += """
-            </div>
-        </div>
-        
-        <div id="interactive-viz" class="tab-content">
-            <h3>交互式圖表</h3>
-            <div class="visualizations-container">
-    """
-    
-    # Add interactive visualizations
-    interactive_viz_count = 0
-    if 'visualizations' in data:
-        interactive_viz = {k: v for k, v in data['visualizations'].items() 
-                          if k in ['interactive_heatmap', 'interactive_network', 'treemap', 'interactive_word_analysis', 'dashboard']}
-        
-        interactive_viz_names = {
-            'interactive_heatmap': '交互式詞性-詞頻熱力圖',
-            'interactive_network': '交互式詞語關聯網絡圖',
-            'treemap': '詞頻樹狀圖',
-            'interactive_word_analysis': '交互式詞頻分析',
-            'dashboard': '綜合分析儀表板'
-        }
-        
-        for viz_type, viz_path in interactive_viz.items():
-            viz_name = interactive_viz_names.get(viz_type, viz_type)
-            # For interactive visualizations, use the filename only since they're copied to the same directory
-            filename = viz_path.split('/')[-1] if viz_path else ''
-            html += f"""
-            <div class="visualization-card full-width">
-                <h3>{viz_name}</h3>
-                <iframe src="{filename}" height="600"></iframe>
-            </div>
-            """
-            interactive_viz_count += 1
-    
-    if interactive_viz_count == 0:
-        html += '<p class="text-muted">暫無交互式圖表</p>'
-    
-    html += """
-            </div>
-        </div>
-        
-        <div id="similarity-viz" class="tab-content">
-            <h3>相似度分析</h3>
-    """
-    
-    # Add similarity analysis section
-    if 'similarity_analysis' in data:
-        similarity_data = data['similarity_analysis']
-        
-        # Add similarity visualizations
-        if 'visualizations' in similarity_data:
-            html += '<div class="visualizations-container">'
-            
-            similarity_viz_names = {
-                'similarity_heatmap': '相似度熱力圖',
-                'similarity_network': '相似度網絡圖',
-                'interactive_heatmap': '交互式相似度熱力圖',
-                'interactive_network': '交互式相似度網絡圖'
-            }
-            
-            for viz_type, viz_path in similarity_data['visualizations'].items():
-                if viz_type in similarity_viz_names:
-                    viz_name = similarity_viz_names[viz_type]
-                    filename = viz_path.split('/')[-1] if viz_path else ''
-                    
-                    if filename.endswith('.html'):
-                        html += f"""
-                        <div class="visualization-card full-width">
-                            <h3>{viz_name}</h3>
-                            <iframe src="{filename}" height="600"></iframe>
-                        </div>
-                        """
-                    else:
-                        html += f"""
-                        <div class="visualization-card">
-                            <h3>{viz_name}</h3>
-                            <img src="{filename}" alt="{viz_name}">
-                        </div>
-                        """
-            
-            html += '</div>'
-    else:
-        html += '<p class="text-muted">未進行相似度分析</p>'
-    
-    html += """
-        </div>
-    </div>
-    
-    <footer>
-        <p>Chinese Text Analyzer 完整報告</p>
-    </footer>
-</body>
-</html>
-    """
-    
-    # Write the HTML to file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-
 # Add new endpoint for system capabilities
 @app.route('/api/system/capabilities', methods=['GET'])
 def get_system_capabilities():
@@ -1397,6 +789,20 @@ def get_system_capabilities():
     }
     return jsonify(capabilities)
 
+@app.route('/api/system/storage', methods=['GET', 'POST'])
+def results_storage():
+    """Result storage usage and the last janitor report (GET), or run the janitor now (POST)"""
+    if request.method == 'POST':
+        report = results_janitor.run_once()
+        if report is None:
+            return jsonify({'error': 'Cleanup already running'}), 409
+    return jsonify({
+        'total_bytes': results_store.usage(),
+        'max_bytes': results_store.max_bytes,
+        'ttl': results_store.ttl,
+        'last_cleanup': results_janitor.last_report
+    })
+
 # Add new endpoint for text similarity analysis
 @app.route('/api/similarity/analyze', methods=['POST'])
 def analyze_similarity():
@@ -1412,9 +818,7 @@ def analyze_similarity():
             return jsonify({'error': 'At least 2 texts are required for similarity analysis'}), 400
         
         # Generate analysis ID
-        analysis_id = str(uuid.uuid4())
-        result_dir = os.path.join(RESULTS_FOLDER, analysis_id)
-        os.makedirs(result_dir, exist_ok=True)
+        analysis_id, result_dir = results_store.create()
         
         # Perform similarity analysis
         similarity_results = similarity_analyzer.comprehensive_similarity_analysis(texts)
@@ -1433,7 +837,7 @@ def analyze_similarity():
                 labels=similarity_results['labels'],
                 save_path=heatmap_path
             )
-            viz_paths['similarity_heatmap'] = f"/static/results/{analysis_id}/similarity_heatmap.png"
+            viz_paths['similarity_heatmap'] = results_store.url_for(analysis_id, 'similarity_heatmap.png')
             
             # Interactive heatmap
             try:
@@ -1442,8 +846,8 @@ def analyze_similarity():
                     labels=similarity_results['labels']
                 )
                 heatmap_html_path = os.path.join(result_dir, 'interactive_heatmap.html')
-                interactive_heatmap.write_html(heatmap_html_path)
-                viz_paths['interactive_heatmap'] = f"/static/results/{analysis_id}/interactive_heatmap.html"
+                advanced_visualizer.write_figure_html(interactive_heatmap, heatmap_html_path)
+                viz_paths['interactive_heatmap'] = results_store.url_for(analysis_id, 'interactive_heatmap.html')
             except:
                 pass
             
@@ -1454,7 +858,7 @@ def analyze_similarity():
                 labels=similarity_results['labels'],
                 save_path=network_path
             )
-            viz_paths['similarity_network'] = f"/static/results/{analysis_id}/similarity_network.png"
+            viz_paths['similarity_network'] = results_store.url_for(analysis_id, 'similarity_network.png')
             
             # Interactive network
             try:
@@ -1463,8 +867,8 @@ def analyze_similarity():
                     labels=similarity_results['labels']
                 )
                 network_html_path = os.path.join(result_dir, 'interactive_network.html')
-                interactive_network.write_html(network_html_path)
-                viz_paths['interactive_network'] = f"/static/results/{analysis_id}/interactive_network.html"
+                advanced_visualizer.write_figure_html(interactive_network, network_html_path)
+                viz_paths['interactive_network'] = results_store.url_for(analysis_id, 'interactive_network.html')
             except:
                 pass
             
@@ -1498,92 +902,40 @@ def generate_advanced_visualizations():
         analysis_data = data.get('analysis_data', {})
         
         # Generate analysis ID
-        analysis_id = str(uuid.uuid4())
-        result_dir = os.path.join(RESULTS_FOLDER, analysis_id)
-        os.makedirs(result_dir, exist_ok=True)
+        analysis_id, result_dir = results_store.create()
         
         viz_paths = {}
         
-        # Generate word frequency treemap
+        # Build each figure once; the same objects are written to their own files and to the dashboard
+        figure_builders = []
         if 'word_frequency' in analysis_data:
+            figure_builders.append(('treemap', 'Word Frequency Treemap',
+                                    lambda: advanced_visualizer.plot_word_frequency_treemap(analysis_data['word_frequency'])))
+            figure_builders.append(('interactive_word_analysis', 'Interactive Word Analysis',
+                                    lambda: advanced_visualizer.plot_interactive_word_cloud_data(analysis_data['word_frequency'])))
+        figure_builders.append(('interactive_heatmap', 'POS-Word Frequency Heatmap',
+                                lambda: advanced_visualizer.plot_single_text_heatmap(analysis_data, title='詞性-詞頻分布熱力圖')))
+        figure_builders.append(('interactive_network', 'Word Association Network',
+                                lambda: advanced_visualizer.plot_single_text_network(analysis_data, title='詞語關聯網絡圖')))
+        
+        figures = {}
+        for key, dashboard_title, build in figure_builders:
             try:
-                treemap = advanced_visualizer.plot_word_frequency_treemap(
-                    analysis_data['word_frequency']
-                )
-                treemap_path = os.path.join(result_dir, 'treemap.html')
-                treemap.write_html(treemap_path)
-                viz_paths['treemap'] = f"/static/results/{analysis_id}/treemap.html"
+                fig = build()
+                if not fig:
+                    continue
+                advanced_visualizer.write_figure_html(fig, os.path.join(result_dir, f'{key}.html'))
+                viz_paths[key] = results_store.url_for(analysis_id, f"{key}.html")
+                figures[dashboard_title] = fig
             except Exception as e:
-                print(f"Treemap generation failed: {e}")
-        
-        # Generate interactive word cloud data
-        if 'word_frequency' in analysis_data:
-            try:
-                word_analysis = advanced_visualizer.plot_interactive_word_cloud_data(
-                    analysis_data['word_frequency']
-                )
-                word_analysis_path = os.path.join(result_dir, 'interactive_word_analysis.html')
-                word_analysis.write_html(word_analysis_path)
-                viz_paths['interactive_word_analysis'] = f"/static/results/{analysis_id}/interactive_word_analysis.html"
-            except Exception as e:
-                print(f"Interactive word analysis generation failed: {e}")
-        
-        # Generate single-text interactive heatmap
-        try:
-            single_heatmap = advanced_visualizer.plot_single_text_heatmap(
-                analysis_data,
-                title='詞性-詞頻分布熱力圖'
-            )
-            if single_heatmap:
-                heatmap_path = os.path.join(result_dir, 'interactive_heatmap.html')
-                single_heatmap.write_html(heatmap_path)
-                viz_paths['interactive_heatmap'] = f"/static/results/{analysis_id}/interactive_heatmap.html"
-        except Exception as e:
-            print(f"Single text heatmap generation failed: {e}")
-        
-        # Generate single-text interactive network
-        try:
-            single_network = advanced_visualizer.plot_single_text_network(
-                analysis_data,
-                title='詞語關聯網絡圖'
-            )
-            if single_network:
-                network_path = os.path.join(result_dir, 'interactive_network.html')
-                single_network.write_html(network_path)
-                viz_paths['interactive_network'] = f"/static/results/{analysis_id}/interactive_network.html"
-        except Exception as e:
-            print(f"Single text network generation failed: {e}")
+                print(f"{key} generation failed: {e}")
         
         # Generate dashboard
-        if len(viz_paths) > 0:
+        if figures:
             try:
-                figures = {}
-                if 'word_frequency' in analysis_data:
-                    figures['Word Frequency Treemap'] = advanced_visualizer.plot_word_frequency_treemap(
-                        analysis_data['word_frequency']
-                    )
-                    figures['Interactive Word Analysis'] = advanced_visualizer.plot_interactive_word_cloud_data(
-                        analysis_data['word_frequency']
-                    )
-                    
-                    # Add single-text visualizations to dashboard
-                    single_heatmap = advanced_visualizer.plot_single_text_heatmap(
-                        analysis_data,
-                        title='詞性-詞頻分布熱力圖'
-                    )
-                    if single_heatmap:
-                        figures['POS-Word Frequency Heatmap'] = single_heatmap
-                    
-                    single_network = advanced_visualizer.plot_single_text_network(
-                        analysis_data,
-                        title='詞語關聯網絡圖'
-                    )
-                    if single_network:
-                        figures['Word Association Network'] = single_network
-                
                 dashboard_path = os.path.join(result_dir, 'dashboard.html')
                 advanced_visualizer.create_dashboard_html(figures, dashboard_path)
-                viz_paths['dashboard'] = f"/static/results/{analysis_id}/dashboard.html"
+                viz_paths['dashboard'] = results_store.url_for(analysis_id, 'dashboard.html')
             except Exception as e:
                 print(f"Dashboard generation failed: {e}")
         
@@ -1593,42 +945,186 @@ def generate_advanced_visualizations():
         print(f"Error in advanced visualization: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.errorhandler(413)
+def request_too_large(e):
+    """Reject oversized request bodies with a JSON error instead of the default HTML page"""
+    return jsonify({
+        'error': f'Request too large (max {MAX_UPLOAD_SIZE} bytes); use the chunked upload API for large files',
+        'max_size': MAX_UPLOAD_SIZE
+    }), 413
+
+@app.errorhandler(UploadError)
+def upload_error(e):
+    body = {'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status
+
+def uploaded_filename():
+    """File name of a raw (non-multipart) upload, from the X-Filename header or the filename query parameter"""
+    from urllib.parse import unquote
+    return unquote(request.headers.get('X-Filename') or request.args.get('filename') or '')
+
+def parsed_upload_response(parsed_data, filename):
+    return jsonify({
+        'content': parsed_data['content'],
+        'metadata': parsed_data['metadata'],
+        'filename': filename
+    })
+
 # Add new endpoint for file upload and parsing
 @app.route('/api/file/upload', methods=['POST'])
 def upload_and_parse_file():
-    """Upload and parse various file formats"""
+    """Upload and parse various file formats
+    
+    Accepts a multipart form with a 'file' field, or the raw file as the request body
+    (file name in the X-Filename header). Text formats are decoded straight from the stream;
+    only PDF/Word files, which need random access, are spooled to a temporary file.
+    """
     if not file_parser:
         return jsonify({'error': 'File parsing not available'}), 400
     
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file uploaded'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        # Save uploaded file
-        filename = str(uuid.uuid4()) + '_' + file.filename
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        
-        # Parse file
-        parsed_data = file_parser.parse_file(file_path)
-        
-        # Clean up uploaded file
-        os.remove(file_path)
+        if request.mimetype == 'multipart/form-data':
+            if 'file' not in request.files:
+                return jsonify({'error': 'No file uploaded'}), 400
+            
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
+            filename, stream = file.filename, file.stream
+        else:
+            filename, stream = uploaded_filename(), request.stream
+            if not filename:
+                return jsonify({'error': 'No file name provided'}), 400
         
-        return jsonify({
-            'content': parsed_data['content'],
-            'metadata': parsed_data['metadata'],
-            'filename': file.filename
-        })
+        parsed_data = file_parser.parse_stream(stream, filename, spool_dir=UPLOAD_FOLDER)
+        return parsed_upload_response(parsed_data, filename)
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         print(f"Error in file parsing: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Start a resumable chunked upload; body: {"filename": ..., "size": total bytes}"""
+    data = request.json or {}
+    if not data.get('filename') or data.get('size') is None:
+        return jsonify({'error': 'filename and size are required'}), 400
+    try:
+        size = int(data['size'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'size must be an integer'}), 400
+    return jsonify(upload_store.create(data['filename'], size)), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PATCH', 'DELETE'])
+def chunked_upload(upload_id):
+    """Query (GET), append a chunk at the Upload-Offset header (PATCH) or cancel (DELETE) an upload
+    
+    After an interrupted transfer, GET returns the offset to resume from.
+    """
+    if request.method == 'GET':
+        return jsonify(upload_store.status(upload_id))
+    if request.method == 'DELETE':
+        upload_store.discard(upload_id)
+        return jsonify({'upload_id': upload_id, 'status': 'deleted'})
+    
+    offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+    if offset is None:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    try:
+        offset = int(offset)
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset must be an integer'}), 400
+    return jsonify(upload_store.append(upload_id, offset, request.stream))
+
+@app.route('/api/uploads/<upload_id>/parse', methods=['POST'])
+def parse_chunked_upload(upload_id):
+    """Parse a completed chunked upload and delete it"""
+    if not file_parser:
+        return jsonify({'error': 'File parsing not available'}), 400
+    
+    file_path = upload_store.claim(upload_id, UPLOAD_FOLDER)
+    filename = os.path.basename(file_path).split('_', 1)[-1]
+    try:
+        with open(file_path, 'rb') as stream:
+            parsed_data = file_parser.parse_stream(stream, filename, spool_dir=UPLOAD_FOLDER)
+        return parsed_upload_response(parsed_data, filename)
+    except Exception as e:
+        print(f"Error in file parsing: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        os.remove(file_path)
+
+@app.route('/api/file/upload_batch', methods=['POST'])
+def upload_batch():
+    """Upload several files and process them as one batch task
+    
+    Files come from the multipart 'files' field and/or completed chunked uploads listed in
+    'upload_ids'. They are streamed into a batch directory that the task workers read from.
+    """
+    if not task_queue:
+        return jsonify({'error': 'Task queue not available'}), 400
+    
+    if request.mimetype == 'multipart/form-data':
+        upload_ids = request.form.getlist('upload_ids')
+        analysis_options = json.loads(request.form.get('analysis_options') or '{}')
+        files = [file for file in request.files.getlist('files') if file.filename]
+    else:
+        data = request.json or {}
+        upload_ids = data.get('upload_ids', [])
+        analysis_options = data.get('analysis_options', {})
+        files = []
+    
+    if not files and not upload_ids:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    # Check every chunked upload before claiming any, so one bad ID cannot discard the others
+    for upload_id in upload_ids:
+        status = upload_store.status(upload_id)
+        if not status['complete']:
+            raise UploadError('Upload is not complete', 409, status['offset'])
+    
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(BATCH_UPLOAD_FOLDER, batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    
+    file_paths = []
+    claimed = []
+    try:
+        for index, file in enumerate(files):
+            file_path = os.path.join(batch_dir, f"{index:04d}_{safe_filename(file.filename)}")
+            with open(file_path, 'wb') as target:
+                copy_stream(file.stream, target)
+            file_paths.append(file_path)
+        for upload_id in upload_ids:
+            file_path = upload_store.claim(upload_id, batch_dir)
+            claimed.append((upload_id, file_path))
+            file_paths.append(file_path)
+    except Exception:
+        # Give finished chunked uploads back so the client can retry without re-uploading them
+        for upload_id, file_path in claimed:
+            try:
+                upload_store.unclaim(upload_id, file_path)
+            except Exception as e:
+                print(f"Error restoring upload {upload_id}: {str(e)}")
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+    
+    submission = task_queue.submit_task(
+        'batch_file_processing',
+        {'file_paths': file_paths, 'analysis_options': analysis_options}
+    )
+    
+    return jsonify({
+        'task_id': submission['task_id'],
+        'status': submission['disposition'],
+        'batch_id': batch_id,
+        'files': [os.path.basename(path) for path in file_paths]
+    })
+
 # Add new endpoint for task queue operations
 @app.route('/api/tasks/create', methods=['POST'])
 def create_task():
@@ -1641,11 +1137,28 @@ def create_task():
         task_type = data.get('task_type', 'text_analysis')
         task_data = data.get('task_data', {})
         
-        task_id = task_queue.create_task(task_type, task_data)
+        # Optional idempotency: explicit key (body or header) or automatic dedupe by parameters
+        idempotency_key = data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+        dedupe = bool(data.get('dedupe', False))
+        freshness_window = data.get('freshness_window')
+        # Optional time budget (seconds); the task is stopped at the next safe point once exceeded
+        time_budget = data.get('time_budget')
+        # Optional priority 0-9 (higher runs first); defaults to the task type's queue priority
+        priority = data.get('priority')
+        
+        submission = task_queue.submit_task(
+            task_type,
+            task_data,
+            idempotency_key=idempotency_key,
+            dedupe=dedupe,
+            freshness_window=int(freshness_window) if freshness_window is not None else None,
+            time_budget=int(time_budget) if time_budget is not None else None,
+            priority=int(priority) if priority is not None else None
+        )
         
         return jsonify({
-            'task_id': task_id,
-            'status': 'created'
+            'task_id': submission['task_id'],
+            'status': submission['disposition']
         })
         
     except Exception as e:
@@ -1666,6 +1179,47 @@ def get_task_status(task_id):
         print(f"Error getting task status: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/tasks/<task_id>/resume', methods=['POST'])
+def resume_task(task_id):
+    """Resume a failed or cancelled task from its last checkpoint"""
+    if not task_queue:
+        return jsonify({'error': 'Task queue not available'}), 400
+    
+    try:
+        if not task_queue.resume_task(task_id):
+            return jsonify({'error': 'Task not found or not resumable'}), 400
+        
+        return jsonify({
+            'task_id': task_id,
+            'status': 'resumed'
+        })
+        
+    except Exception as e:
+        print(f"Error resuming task: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tasks/<task_id>/events', methods=['GET'])
+def stream_task_events(task_id):
+    """Stream task progress as Server-Sent Events"""
+    if not task_queue:
+        return jsonify({'error': 'Task queue not available'}), 400
+    
+    if not task_queue.get_task_status(task_id):
+        return jsonify({'error': 'Task not found'}), 404
+    
+    def generate():
+        for event in task_queue.iter_task_events(task_id):
+            yield format_sse(event)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Disable proxy buffering (nginx)
+        }
+    )
+
 @app.route('/api/tasks/<task_id>/result', methods=['GET'])
 def get_task_result(task_id):
     """Get task result"""
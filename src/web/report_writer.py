@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Report Writer
+HTML報告生成：基於Jinja模板逐段流式寫入文件或HTTP響應，大表格截斷顯示，
+原始文本過長時另存文本文件，完整分析數據寫入gzip壓縮的JSON附屬文件
+"""
+
+import os
+import gzip
+import json
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+REPORT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'reports')
+
+# 報告中直接顯示的原始文本字數，超出部分另存為文本文件
+REPORT_TEXT_PREVIEW_CHARS = 10000
+# 表格最多顯示的行數
+REPORT_WORD_TABLE_ROWS = 30
+REPORT_TABLE_ROWS = 100
+# 每類命名實體最多顯示的數量
+REPORT_ENTITY_LIMIT = 200
+# 流式寫出時的緩衝片段數
+REPORT_STREAM_BUFFER = 64
+
+JSON_SIDECAR_FILENAME = 'report_data.json.gz'
+TEXT_SIDECAR_FILENAME = 'original_text.txt'
+JSON_SIDECAR_COMPRESSLEVEL = 6
+
+BASIC_VIZ_NAMES = {
+    'wordcloud': '詞頻雲圖',
+    'word_frequency': '詞頻分布',
+    'pos_distribution': '詞性分布',
+    'sentiment': '情感分析',
+    'entities': '命名實體統計',
+    'ngrams': 'N-gram詞組分析',
+    'keywords': '關鍵詞權重',
+    'word_freq_vertical': '詞頻垂直分布',
+    'word_freq_pie': '詞頻餅圖'
+}
+
+INTERACTIVE_VIZ_NAMES = {
+    'interactive_heatmap': '交互式詞性-詞頻熱力圖',
+    'interactive_network': '交互式詞語關聯網絡圖',
+    'treemap': '詞頻樹狀圖',
+    'interactive_word_analysis': '交互式詞頻分析',
+    'dashboard': '綜合分析儀表板'
+}
+
+SIMILARITY_VIZ_NAMES = {
+    'similarity_heatmap': '相似度熱力圖',
+    'similarity_network': '相似度網絡圖',
+    'interactive_heatmap': '交互式相似度熱力圖',
+    'interactive_network': '交互式相似度網絡圖'
+}
+
+ENTITY_TYPE_NAMES = {
+    'person': '人名',
+    'location': '地名',
+    'organization': '機構名'
+}
+
+_environment = None
+
+
+def get_environment() -> Environment:
+    """報告模板環境（延遲創建，模板編譯結果在進程內復用）"""
+    global _environment
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(REPORT_TEMPLATE_DIR),
+            autoescape=select_autoescape(['html']),
+            trim_blocks=True,
+            lstrip_blocks=True
+        )
+        _environment.filters['basename'] = lambda path: path.split('/')[-1] if path else ''
+    return _environment
+
+
+def _format_size(size: int) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def top_rows(mapping: Optional[Dict[str, Any]], limit: int) -> Optional[Dict[str, Any]]:
+    """取數值最大的limit項（不排序整個字典），返回 {'rows': [...], 'omitted': 未顯示的項數}"""
+    if not mapping:
+        return None
+    rows = heapq.nlargest(limit, mapping.items(), key=lambda item: item[1])
+    return {'rows': rows, 'omitted': max(len(mapping) - limit, 0)}
+
+
+def select_visualizations(visualizations: Optional[Dict[str, str]], names: Dict[str, str]) -> List[Tuple[str, str]]:
+    """按名稱表篩選圖表，返回 [(顯示名稱, 路徑)]"""
+    return [(names[key], path) for key, path in (visualizations or {}).items() if key in names and path]
+
+
+def write_json_sidecar(data: Dict[str, Any], output_dir: str) -> str:
+    """將完整分析數據以緊湊格式流式寫入gzip壓縮的JSON文件，返回文件路徑"""
+    path = os.path.join(output_dir, JSON_SIDECAR_FILENAME)
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=JSON_SIDECAR_COMPRESSLEVEL) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    return path
+
+
+def _text_context(data: Dict[str, Any], output_dir: str) -> Dict[str, Any]:
+    """原始文本預覽；過長時完整文本另存為文本文件"""
+    text = data.get('original_text') or ''
+    truncated = len(text) > REPORT_TEXT_PREVIEW_CHARS
+    if truncated:
+        with open(os.path.join(output_dir, TEXT_SIDECAR_FILENAME), 'w', encoding='utf-8') as f:
+            f.write(text)
+    return {
+        'text_preview': text[:REPORT_TEXT_PREVIEW_CHARS],
+        'text_truncated': truncated,
+        'text_length': len(text),
+        'text_file': TEXT_SIDECAR_FILENAME
+    }
+
+
+def _sidecar_context(output_dir: str, include_json: bool) -> Dict[str, Any]:
+    path = os.path.join(output_dir, JSON_SIDECAR_FILENAME)
+    if not include_json or not os.path.exists(path):
+        return {'json_sidecar': None}
+    return {'json_sidecar': JSON_SIDECAR_FILENAME, 'json_sidecar_size': _format_size(os.path.getsize(path))}
+
+
+def report_context(data: Dict[str, Any], output_dir: str, title: str, include_json=True, include_data=True,
+                   include_summary=True, include_interactive=True) -> Dict[str, Any]:
+    """單文本分析報告的模板上下文"""
+    entity_groups = []
+    for entity_type, entities in (data.get('entities') or {}).items():
+        if entities:
+            entity_groups.append((entity_type, ENTITY_TYPE_NAMES.get(entity_type, entity_type),
+                                  entities[:REPORT_ENTITY_LIMIT], max(len(entities) - REPORT_ENTITY_LIMIT, 0)))
+
+    context = {
+        'title': title,
+        'data': data,
+        'generated_at': datetime.now(),
+        'include_summary': include_summary,
+        'include_interactive': include_interactive,
+        'include_data': include_data,
+        'basic_visualizations': select_visualizations(data.get('visualizations'), BASIC_VIZ_NAMES),
+        'interactive_visualizations': select_visualizations(data.get('visualizations'), INTERACTIVE_VIZ_NAMES),
+        'word_table': top_rows(data.get('word_frequency'), REPORT_WORD_TABLE_ROWS),
+        'pos_table': top_rows(data.get('pos_distribution'), REPORT_TABLE_ROWS),
+        'entity_groups': entity_groups
+    }
+    context.update(_text_context(data, output_dir))
+    context.update(_sidecar_context(output_dir, include_json))
+    return context
+
+
+def comprehensive_report_context(data: Dict[str, Any], output_dir: str, title: str, include_json=True,
+                                 include_similarity=True) -> Dict[str, Any]:
+    """完整報告（含交互式圖表和相似度分析）的模板上下文"""
+    similarity_visualizations = None
+    if include_similarity and 'similarity_analysis' in data:
+        similarity_visualizations = select_visualizations(
+            data['similarity_analysis'].get('visualizations'), SIMILARITY_VIZ_NAMES)
+
+    context = {
+        'title': title,
+        'data': data,
+        'generated_at': datetime.now(),
+        'basic_visualizations': select_visualizations(data.get('visualizations'), BASIC_VIZ_NAMES),
+        'interactive_visualizations': select_visualizations(data.get('visualizations'), INTERACTIVE_VIZ_NAMES),
+        'similarity_visualizations': similarity_visualizations
+    }
+    context.update(_text_context(data, output_dir))
+    context.update(_sidecar_context(output_dir, include_json))
+    return context
+
+
+def stream_report(template_name: str, context: Dict[str, Any]) -> Iterator[str]:
+    """逐段渲染報告，可直接用作Flask的流式響應"""
+    stream = get_environment().get_template(template_name).stream(context)
+    stream.enable_buffering(REPORT_STREAM_BUFFER)
+    return stream
+
+
+def write_report(template_name: str, context: Dict[str, Any], output_path: str) -> str:
+    """將報告逐段寫入文件，返回文件路徑"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for chunk in stream_report(template_name, context):
+            f.write(chunk)
+    return output_path
+
+
+def generate_html_report(data, output_path, title='中文文本分析報告', include_json=True, include_data=True,
+                         include_summary=True, include_interactive=True):
+    """生成單文本分析的HTML報告"""
+    context = report_context(data, os.path.dirname(output_path), title, include_json, include_data,
+                             include_summary, include_interactive)
+    return write_report('report.html', context, output_path)
+
+
+def generate_comprehensive_html_report(data, output_path, title='中文文本分析完整報告', include_json=True,
+                                       include_data=True, include_summary=True, include_interactive=True,
+                                       include_similarity=True):
+    """生成包含交互式圖表和相似度分析的完整HTML報告"""
+    context = comprehensive_report_context(data, os.path.dirname(output_path), title, include_json,
+                                           include_similarity)
+    return write_report('comprehensive_report.html', context, output_path)
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+Results Store
+分析結果存儲：結果目錄按ID前綴分片存放，內容相同的圖片通過硬鏈接共用一份數據，
+過期（TTL）或總大小超限的結果由清理線程或命令行定期刪除並報告釋放的空間
+"""
+
+import os
+import re
+import sys
+import time
+import uuid
+import shutil
+import hashlib
+import argparse
+import threading
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.zip_stream import CACHE_PREFIX
+
+# 結果保留時間（秒），從最後一次寫入或訪問算起
+RESULTS_TTL = 7 * 24 * 3600
+# 結果目錄總大小上限，超出時從最舊的結果開始刪除
+RESULTS_MAX_BYTES = 20 * 1024 * 1024 * 1024
+# 新建不久的結果不去重，也不會因大小超限被刪除（請求可能仍在寫入）
+RESULTS_MIN_AGE = 10 * 60
+# 清理線程的運行間隔（秒）
+JANITOR_INTERVAL = 3600
+
+# 分片目錄名取結果ID的前幾位
+SHARD_WIDTH = 2
+# 內容尋址的共享數據目錄
+BLOB_DIRNAME = '_blobs'
+# 參與去重的文件類型（圖表內容完全相同的情況很常見）
+DEDUPE_EXTENSIONS = ('.png', '.webp')
+HASH_CHUNK_SIZE = 1024 * 1024
+
+LOCK_FILENAME = '.janitor.lock'
+
+RESULT_ID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_files(directory: str) -> Iterator[Tuple[str, os.stat_result]]:
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                yield path, os.lstat(path)
+            except OSError:
+                continue
+
+
+def expire_directories(parent: str, ttl: float, now: Optional[float] = None, dry_run: bool = False) -> Dict[str, int]:
+    """刪除parent下超過ttl未修改的子目錄（如批量上傳目錄），返回刪除數量和釋放的字節數"""
+    now = now or time.time()
+    report = {'removed': 0, 'reclaimed_bytes': 0}
+    if not os.path.isdir(parent):
+        return report
+    for entry in os.scandir(parent):
+        try:
+            if not entry.is_dir(follow_symlinks=False) or now - entry.stat().st_mtime <= ttl:
+                continue
+            size = sum(st.st_size for _, st in _iter_files(entry.path) if st.st_nlink == 1)
+            if not dry_run:
+                shutil.rmtree(entry.path)
+        except OSError as e:
+            print(f"清理目錄失敗: {entry.path}: {e}")
+            continue
+        report['removed'] += 1
+        report['reclaimed_bytes'] += size
+    return report
+
+
+class ResultsStore:
+    """分析結果存儲
+
+    結果目錄位於 <root>/<ID前兩位>/<ID>，對應URL為 <url_prefix>/<ID前兩位>/<ID>/<文件名>；
+    舊版直接放在 <root>/<ID> 下的結果仍可讀取，到期後照常清理。
+    結果文件只寫一次不再修改，因此內容相同的文件可以安全地共用硬鏈接
+    """
+
+    def __init__(self, root: str, url_prefix: str = '/static/results', ttl: float = RESULTS_TTL,
+                 max_bytes: int = RESULTS_MAX_BYTES, min_age: float = RESULTS_MIN_AGE):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.min_age = min_age
+        self.blob_dir = os.path.join(root, BLOB_DIRNAME)
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(result_id: Optional[str]) -> bool:
+        return bool(result_id) and RESULT_ID_PATTERN.match(result_id) is not None
+
+    def _sharded_dir(self, result_id: str) -> str:
+        return os.path.join(self.root, result_id[:SHARD_WIDTH], result_id)
+
+    def create(self) -> Tuple[str, str]:
+        """創建新的結果目錄，返回 (結果ID, 目錄路徑)"""
+        result_id = str(uuid.uuid4())
+        result_dir = self._sharded_dir(result_id)
+        os.makedirs(result_dir, exist_ok=True)
+        return result_id, result_dir
+
+    def result_dir(self, result_id: Optional[str]) -> Optional[str]:
+        """查找結果目錄，ID無效或結果不存在（已過期）時返回None"""
+        if not self.is_valid_id(result_id):
+            return None
+        for path in (self._sharded_dir(result_id), os.path.join(self.root, result_id)):
+            if os.path.isdir(path):
+                return path
+        return None
+
+    def result_path(self, result_id: Optional[str], filename: str) -> Optional[str]:
+        """結果目錄中的文件路徑，文件名不能包含路徑"""
+        result_dir = self.result_dir(result_id)
+        if result_dir is None or os.path.basename(filename) != filename or filename in ('', '.', '..'):
+            return None
+        return os.path.join(result_dir, filename)
+
+    def url_for(self, result_id: str, filename: str) -> str:
+        result_dir = self.result_dir(result_id) or self._sharded_dir(result_id)
+        relative = os.path.relpath(result_dir, self.root).replace(os.sep, '/')
+        return f"{self.url_prefix}/{relative}/{filename}"
+
+    def touch(self, result_id: str):
+        """記錄一次訪問，推遲結果的過期時間"""
+        result_dir = self.result_dir(result_id)
+        if result_dir:
+            try:
+                os.utime(result_dir)
+            except OSError:
+                pass
+
+    def link_file(self, source_path: str, dest_path: str) -> str:
+        """將文件放入結果目錄：優先使用硬鏈接（不佔用額外空間），不支持時複製"""
+        temp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(source_path, temp_path)
+        except OSError:
+            shutil.copy2(source_path, temp_path)
+        os.replace(temp_path, dest_path)
+        return dest_path
+
+    def iter_results(self) -> Iterator[Tuple[str, str, float]]:
+        """遍歷所有結果目錄，產出 (結果ID, 目錄路徑, 最後修改時間)"""
+        for entry in os.scandir(self.root):
+            if not entry.is_dir(follow_symlinks=False) or entry.name == BLOB_DIRNAME:
+                continue
+            if self.is_valid_id(entry.name):
+                # 分片之前的舊版結果目錄
+                yield entry.name, entry.path, entry.stat().st_mtime
+                continue
+            for result in os.scandir(entry.path):
+                if result.is_dir(follow_symlinks=False) and self.is_valid_id(result.name):
+                    yield result.name, result.path, result.stat().st_mtime
+
+    def _blob_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.blob_dir, digest[:SHARD_WIDTH], digest + extension)
+
+    def deduplicate(self, result_dir: str) -> int:
+        """將結果目錄中的圖片換成指向共享數據的硬鏈接，返回節省的字節數
+
+        已經是硬鏈接的文件直接跳過，因此重複運行只會處理新文件
+        """
+        saved = 0
+        for path, st in _iter_files(result_dir):
+            extension = os.path.splitext(path)[1].lower()
+            if extension not in DEDUPE_EXTENSIONS or st.st_nlink > 1:
+                continue
+            try:
+                blob_path = self._blob_path(_file_digest(path), extension)
+                if os.path.exists(blob_path):
+                    self.link_file(blob_path, path)
+                    saved += st.st_size
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.link(path, blob_path)
+            except OSError as e:
+                # 文件系統不支持硬鏈接等情況，保留原文件
+                print(f"圖片去重失敗: {path}: {e}")
+                break
+        return saved
+
+    def usage(self) -> int:
+        """結果目錄實際佔用的字節數（硬鏈接的文件只計一次）"""
+        seen = {}
+        for _, st in _iter_files(self.root):
+            seen[(st.st_dev, st.st_ino)] = st.st_size
+        return sum(seen.values())
+
+    def collect(self, dry_run: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """去重新文件，刪除過期結果；總大小仍超限時先刪緩存的壓縮包，再從最舊的結果開始刪除
+
+        Returns:
+            清理報告：刪除的結果數、釋放的字節數、去重節省的字節數、清理後的佔用
+        """
+        now = now or time.time()
+        report = {'removed_results': 0, 'removed_bundles': 0, 'removed_blobs': 0,
+                  'reclaimed_bytes': 0, 'deduplicated_bytes': 0}
+
+        results = sorted(self.iter_results(), key=lambda item: item[2])
+        if not dry_run:
+            # 太新的結果可能仍在寫入，暫不去重
+            for _, result_dir, mtime in results:
+                if now - mtime >= self.min_age:
+                    report['deduplicated_bytes'] += self.deduplicate(result_dir)
+
+        # 按inode統計剩餘的鏈接數，刪除文件時只有最後一個鏈接消失才真正釋放空間
+        inodes = {}
+        result_files = {}
+        for _, result_dir, _ in results:
+            files = []
+            for path, st in _iter_files(result_dir):
+                key = (st.st_dev, st.st_ino)
+                inodes.setdefault(key, [st.st_size, st.st_nlink])
+                files.append((path, key))
+            result_files[result_dir] = files
+        blobs = {}
+        for path, st in _iter_files(self.blob_dir):
+            key = (st.st_dev, st.st_ino)
+            inodes.setdefault(key, [st.st_size, st.st_nlink])
+            blobs[key] = path
+        total = sum(size for size, _ in inodes.values())
+
+        orphan_blobs = [key for key in blobs if inodes[key][1] == 1]
+
+        def release(key) -> int:
+            entry = inodes[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                return entry[0]
+            if entry[1] == 1 and key in blobs:
+                # 只剩共享數據本身，已無結果引用
+                orphan_blobs.append(key)
+                entry[1] = 0
+                return entry[0]
+            return 0
+
+        def remove_result(result_dir):
+            nonlocal total
+            if not dry_run:
+                shutil.rmtree(result_dir, ignore_errors=True)
+            reclaimed = sum(release(key) for _, key in result_files.pop(result_dir))
+            total -= reclaimed
+            report['removed_results'] += 1
+            report['reclaimed_bytes'] += reclaimed
+
+        # 過期的結果
+        remaining = []
+        for result_id, result_dir, mtime in results:
+            if now - mtime > self.ttl:
+                remove_result(result_dir)
+            else:
+                remaining.append((result_id, result_dir, mtime))
+
+        # 緩存的壓縮包可以隨時重新生成，超限時優先刪除
+        if total > self.max_bytes:
+            bundles = [(result_dir, path, key) for _, result_dir, _ in remaining
+                       for path, key in result_files[result_dir] if os.path.basename(path).startswith(CACHE_PREFIX)]
+            bundles.sort(key=lambda item: os.path.getmtime(item[1]))
+            for result_dir, path, key in bundles:
+                if total <= self.max_bytes:
+                    break
+                if not dry_run:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                reclaimed = release(key)
+                total -= reclaimed
+                report['removed_bundles'] += 1
+                report['reclaimed_bytes'] += reclaimed
+                result_files[result_dir].remove((path, key))
+
+        # 仍然超限時刪除最舊的結果
+        for result_id, result_dir, mtime in remaining:
+            if total <= self.max_bytes or now - mtime < self.min_age:
+                break
+            remove_result(result_dir)
+
+        for key in orphan_blobs:
+            if not dry_run:
+                try:
+                    os.remove(blobs[key])
+                except OSError:
+                    continue
+            if inodes[key][1] == 1:
+                # 清理前就已無引用的共享數據
+                inodes[key][1] = 0
+                total -= inodes[key][0]
+                report['reclaimed_bytes'] += inodes[key][0]
+            report['removed_blobs'] += 1
+
+        if not dry_run:
+            self._remove_empty_shards()
+        report['total_bytes'] = total
+        return report
+
+    def _remove_empty_shards(self):
+        for parent in (self.root, self.blob_dir):
+            if not os.path.isdir(parent):
+                continue
+            for entry in os.scandir(parent):
+                if entry.is_dir(follow_symlinks=False) and len(entry.name) == SHARD_WIDTH:
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """清理報告的可讀文本"""
+    text = (f"刪除 {report['removed_results']} 個結果、{report['removed_bundles']} 個緩存壓縮包、"
+            f"{report['removed_blobs']} 個無引用的共享文件，釋放 {_format_bytes(report['reclaimed_bytes'])}；"
+            f"去重節省 {_format_bytes(report['deduplicated_bytes'])}；當前佔用 {_format_bytes(report['total_bytes'])}")
+    if report.get('expired_directories'):
+        text += f"；清理 {report['expired_directories']} 個過期上傳目錄"
+    return text
+
+
+class ResultsJanitor:
+    """後台清理線程：定期對結果存儲運行collect，並清理過期的上傳目錄
+
+    多個進程（如多個Web worker）共用同一目錄時，通過文件鎖保證同一時間只有一個進程在清理
+    """
+
+    def __init__(self, store: ResultsStore, interval: float = JANITOR_INTERVAL,
+                 extra_dirs: Sequence[str] = ()):
+        self.store = store
+        self.interval = interval
+        self.extra_dirs = list(extra_dirs)
+        self.last_report = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def run_once(self, dry_run: bool = False) -> Optional[Dict[str, Any]]:
+        """運行一次清理，其他進程正在清理時返回None"""
+        lock_file = open(os.path.join(self.store.root, LOCK_FILENAME), 'w')
+        try:
+            if FCNTL_AVAILABLE:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            started = time.time()
+            report = self.store.collect(dry_run=dry_run)
+            report['expired_directories'] = 0
+            for directory in self.extra_dirs:
+                expired = expire_directories(directory, self.store.ttl, dry_run=dry_run)
+                report['expired_directories'] += expired['removed']
+                report['reclaimed_bytes'] += expired['reclaimed_bytes']
+            report['elapsed'] = time.time() - started
+            report['finished_at'] = time.time()
+            self.last_report = report
+            return report
+        finally:
+            lock_file.close()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                report = self.run_once()
+                if report:
+                    print(f"結果目錄清理完成: {format_report(report)}")
+            except Exception as e:
+                print(f"結果目錄清理失敗: {e}")
+
+    def start(self):
+        """啟動後台線程；可重複調用（例如每個請求前），只啟動一次"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name='results-janitor', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='清理Web分析結果目錄：去重圖片、刪除過期或超出大小上限的結果')
+    parser.add_argument('--root', default=os.path.join('src', 'web', 'static', 'results'), help='結果目錄')
+    parser.add_argument('--ttl-days', type=float, default=RESULTS_TTL / 86400, help='結果保留天數')
+    parser.add_argument('--max-gb', type=float, default=RESULTS_MAX_BYTES / 1024 ** 3, help='結果目錄大小上限 (GB)')
+    parser.add_argument('--extra-dir', action='append', default=[],
+                        help='同樣按保留天數清理子目錄的目錄（如批量上傳目錄），可重複指定')
+    parser.add_argument('--dry-run', action='store_true', help='只報告將要刪除的內容，不實際刪除或去重')
+    args = parser.parse_args()
+
+    store = ResultsStore(args.root, ttl=args.ttl_days * 86400, max_bytes=int(args.max_gb * 1024 ** 3))
+    report = ResultsJanitor(store, extra_dirs=args.extra_dir).run_once(dry_run=args.dry_run)
+    if report is None:
+        print("另一個進程正在清理，已跳過")
+    else:
+        print(("[試運行] " if args.dry_run else "") + format_report(report))
+
+
+if __name__ == '__main__':
+    main()
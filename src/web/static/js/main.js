@@ -42,7 +42,7 @@ document.addEventListener('DOMContentLoaded', function() {
             e.preventDefault();
             const vizType = this.dataset.viz;
             if (imagesPaths[vizType]) {
-                downloadImage(imagesPaths[vizType], `${vizType}.png`);
+                downloadImage(imagesPaths[vizType], `${vizType}.${imageExtension(imagesPaths[vizType])}`);
             }
         });
     });
@@ -523,11 +523,17 @@ function showImageInModal(src, alt) {
     
     // Set up download button
     downloadBtn.href = src;
-    downloadBtn.download = alt ? alt.replace(/\s+/g, '_') + '.png' : 'visualization.png';
+    downloadBtn.download = (alt ? alt.replace(/\s+/g, '_') : 'visualization') + '.' + imageExtension(src);
     
     modal.show();
 }
 
+// Charts may be PNG, WebP or SVG depending on the render profile
+function imageExtension(src) {
+    const match = /\.(png|webp|svg)$/i.exec((src || '').split('?')[0]);
+    return match ? match[1].toLowerCase() : 'png';
+}
+
 function downloadImage(src, filename) {
     const a = document.createElement('a');
     a.href = src;
@@ -626,16 +632,14 @@ function generateReport() {
     })
     .then(data => {
         if (data.success) {
-            // Update the current analysis ID to the new report ID
-            const reportId = data.report_id;
     
     // Set up view report button
     const viewReportBtn = document.getElementById('viewReportBtn');
-            viewReportBtn.href = `${API_BASE_URL}/static/results/${reportId}/report.html`;
+            viewReportBtn.href = `${API_BASE_URL}${data.report_path}`;
     
     // Set up download report button
     const downloadReportBtn = document.getElementById('downloadReportBtn');
-            downloadReportBtn.href = `${API_BASE_URL}/static/results/${reportId}/report.html`;
+            downloadReportBtn.href = `${API_BASE_URL}${data.report_path}`;
     downloadReportBtn.download = `chinese_text_analysis_report.html`;
     
     // Set up download all visualizations button
@@ -811,7 +815,7 @@ function downloadSelectedVisualizations(keys) {
                     .then(response => response.blob())
                     .then(blob => {
                         // Add the blob to the zip file
-                        zip.file(`${key}.png`, blob);
+                        zip.file(`${key}.${imageExtension(visualizations[key])}`, blob);
                         
                         // If all files are added, generate the zip
                         if (Object.keys(zip.files).length === keys.filter(k => visualizations[k]).length) {
@@ -838,7 +842,7 @@ function downloadSelectedVisualizations(keys) {
         });
     } else if (keys.length === 1 && visualizations[keys[0]]) {
         // Just download the single visualization
-        downloadImage(visualizations[keys[0]], `${keys[0]}.png`);
+        downloadImage(visualizations[keys[0]], `${keys[0]}.${imageExtension(visualizations[keys[0]])}`);
     }
 }
 
@@ -943,7 +947,7 @@ function downloadSelectedVisualizations(keys) {
                     fetch(visualizations[key])
                         .then(response => response.blob())
                         .then(blob => {
-                            zip.file(`${key}.png`, blob);
+                            zip.file(`${key}.${imageExtension(visualizations[key])}`, blob);
                             fetchCount++;
                             
                             if (fetchCount === validKeys.length) {
@@ -967,7 +971,7 @@ function downloadSelectedVisualizations(keys) {
                 }
             });
         } else if (keys.length === 1 && visualizations[keys[0]]) {
-            downloadImage(visualizations[keys[0]], `${keys[0]}.png`);
+            downloadImage(visualizations[keys[0]], `${keys[0]}.${imageExtension(visualizations[keys[0]])}`);
         }
     });
 }
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Chunked Uploads
+分塊可續傳上傳：客戶端先創建上傳會話，再按偏移量逐塊追加（中斷後查詢已接收的偏移量繼續），
+完成後交給解析器或批量任務；長時間未完成的上傳自動清理
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from typing import Any, Dict, Optional
+
+# 每個分塊的建議大小（客戶端可以更小，但單個請求受MAX_CONTENT_LENGTH限制）
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# 分塊上傳的文件總大小上限
+MAX_CHUNKED_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024
+# 超過此時間（秒）未更新的未完成上傳會被清理
+UPLOAD_EXPIRY = 24 * 3600
+# 從請求流寫入文件時的塊大小
+UPLOAD_COPY_SIZE = 1024 * 1024
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+UNSAFE_FILENAME_CHARS = re.compile(r'[\x00-\x1f/\\:*?"<>|]')
+
+
+class UploadError(Exception):
+    """上傳請求無效；status為對應的HTTP狀態碼"""
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """去除路徑和不安全字符（保留中文），用於保存上傳文件"""
+    name = os.path.basename((filename or '').replace('\\', '/'))
+    name = UNSAFE_FILENAME_CHARS.sub('_', name).strip(' .')
+    return name or 'upload'
+
+
+def copy_stream(stream, target, limit: Optional[int] = None) -> int:
+    """將字節流分塊寫入文件對象，返回寫入的字節數；超過limit時拋出UploadError"""
+    written = 0
+    while True:
+        chunk = stream.read(UPLOAD_COPY_SIZE)
+        if not chunk:
+            return written
+        written += len(chunk)
+        if limit is not None and written > limit:
+            raise UploadError('Upload exceeds the declared size', 413)
+        target.write(chunk)
+
+
+class ChunkedUploadStore:
+    """分塊上傳存儲
+
+    每個上傳對應 <id>.part（已接收的數據）和 <id>.json（文件名和總大小），
+    已接收的偏移量即 .part 文件的大小，服務重啟後仍可續傳
+    """
+
+    def __init__(self, directory: str, max_size: int = MAX_CHUNKED_UPLOAD_SIZE, expiry: int = UPLOAD_EXPIRY):
+        self.directory = directory
+        self.max_size = max_size
+        self.expiry = expiry
+        os.makedirs(directory, exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _paths(self, upload_id: str):
+        if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+            raise UploadError('Invalid upload ID', 404)
+        base = os.path.join(self.directory, upload_id)
+        return base + '.part', base + '.json'
+
+    def _lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(self, filename: str, size: int) -> Dict[str, Any]:
+        """創建上傳會話"""
+        if size < 0:
+            raise UploadError('Invalid upload size')
+        if size > self.max_size:
+            raise UploadError(f'File too large (max {self.max_size} bytes)', 413)
+
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        part_path, meta_path = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'filename': safe_filename(filename), 'size': size, 'created_at': time.time()}, f,
+                      ensure_ascii=False)
+        return self.status(upload_id)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """上傳狀態：文件名、總大小、已接收的偏移量"""
+        part_path, meta_path = self._paths(upload_id)
+        if not os.path.exists(meta_path):
+            raise UploadError('Upload not found', 404)
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        offset = os.path.getsize(part_path)
+        return {
+            'upload_id': upload_id,
+            'filename': meta['filename'],
+            'size': meta['size'],
+            'offset': offset,
+            'complete': offset == meta['size'],
+            'chunk_size': UPLOAD_CHUNK_SIZE
+        }
+
+    def append(self, upload_id: str, offset: int, stream) -> Dict[str, Any]:
+        """在指定偏移量處追加一塊數據
+
+        偏移量必須等於已接收的字節數（重複或亂序的塊返回409和當前偏移量，客戶端據此續傳）
+        """
+        part_path, _ = self._paths(upload_id)
+        with self._lock(upload_id):
+            status = self.status(upload_id)
+            if offset != status['offset']:
+                raise UploadError('Offset mismatch', 409, status['offset'])
+            with open(part_path, 'ab') as f:
+                try:
+                    copy_stream(stream, f, limit=status['size'] - offset)
+                except Exception:
+                    # 不完整的塊作廢，偏移量回到本塊之前
+                    f.truncate(offset)
+                    raise
+        return self.status(upload_id)
+
+    def claim(self, upload_id: str, target_dir: str) -> str:
+        """取走已完成的上傳，移動到target_dir並返回文件路徑"""
+        part_path, meta_path = self._paths(upload_id)
+        with self._lock(upload_id):
+            status = self.status(upload_id)
+            if not status['complete']:
+                raise UploadError('Upload is not complete', 409, status['offset'])
+            os.makedirs(target_dir, exist_ok=True)
+            target_path = os.path.join(target_dir, f"{upload_id[:8]}_{status['filename']}")
+            shutil.move(part_path, target_path)
+            os.remove(meta_path)
+        with self._locks_lock:
+            self._locks.pop(upload_id, None)
+        return target_path
+
+    def unclaim(self, upload_id: str, file_path: str):
+        """把claim取走的文件放回存儲（例如批量提交失敗時），客戶端無需重新上傳"""
+        part_path, meta_path = self._paths(upload_id)
+        with self._lock(upload_id):
+            size = os.path.getsize(file_path)
+            shutil.move(file_path, part_path)
+            filename = os.path.basename(file_path)[len(upload_id[:8]) + 1:]
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'filename': filename, 'size': size, 'created_at': time.time()}, f,
+                          ensure_ascii=False)
+
+    def discard(self, upload_id: str):
+        """刪除上傳"""
+        part_path, meta_path = self._paths(upload_id)
+        for path in (part_path, meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        with self._locks_lock:
+            self._locks.pop(upload_id, None)
+
+    def cleanup_expired(self) -> int:
+        """刪除長時間未更新的未完成上傳，返回刪除的數量"""
+        removed = 0
+        now = time.time()
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            upload_id = filename[:-len('.json')]
+            part_path = os.path.join(self.directory, upload_id + '.part')
+            try:
+                last_update = os.path.getmtime(part_path if os.path.exists(part_path)
+                                               else os.path.join(self.directory, filename))
+                if now - last_update > self.expiry:
+                    self.discard(upload_id)
+                    removed += 1
+            except (OSError, UploadError):
+                continue
+        return removed
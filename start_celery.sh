@@ -1,4 +1,26 @@
 #!/bin/bash
+# 用法:
+#   ./start_celery.sh          單個worker消費所有隊列
+#   ./start_celery.sh --lanes  每個隊列啟動獨立worker（並發數見config/task_queues.json，
+#                              可用環境變量CELERY_CONCURRENCY_<QUEUE>覆蓋）
 echo "🚀 啟動 Celery Worker..."
 source venv/bin/activate
-celery -A src.core.task_queue worker --loglevel=info
+
+# 讀取隊列配置：每行「隊列名稱 並發數」
+LANES=$(python -m src.core.task_routing)
+QUEUES=$(echo "$LANES" | awk '{print $1}' | paste -sd, -)
+
+if [ "$1" == "--lanes" ]; then
+    PIDS=()
+    while read -r QUEUE CONCURRENCY; do
+        [ -z "$QUEUE" ] && continue
+        echo "  ▶ 隊列 $QUEUE (並發 $CONCURRENCY)"
+        celery -A src.core.task_queue worker --loglevel=info \
+            -Q "$QUEUE" -c "$CONCURRENCY" -n "${QUEUE}@%h" &
+        PIDS+=($!)
+    done <<< "$LANES"
+    trap 'kill "${PIDS[@]}" 2>/dev/null' INT TERM
+    wait
+else
+    celery -A src.core.task_queue worker --loglevel=info -Q "$QUEUES"
+fi